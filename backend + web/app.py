@@ -1,3 +1,5 @@
+import json
+
 from flask import Flask, request, jsonify
 from flask_socketio import SocketIO, emit
 
@@ -34,6 +36,65 @@ def receive_sensor_data():
 
     return jsonify({"message": "Data received successfully"}), 200
 
+def _validate_reading(item):
+    """Return list error untuk satu reading batch (kosong = valid)."""
+    if not isinstance(item, dict):
+        return ["reading harus berupa objek"]
+    errors = []
+    for field in ("temperature", "humidity"):
+        value = item.get(field)
+        if value is None:
+            errors.append(f"{field} wajib diisi")
+            continue
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            errors.append(f"{field} bukan angka")
+    return errors
+
+@app.route('/api/sensor/batch', methods=['POST'])
+def receive_sensor_batch():
+    """Endpoint untuk banyak reading sekaligus (JSON array atau NDJSON) dari ESP32 yang menyimpan backlog."""
+    global latest_data
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+    else:
+        items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Body harus berupa array reading atau NDJSON"}), 400
+
+    results = []
+    newest = None
+    for index, item in enumerate(items):
+        errors = _validate_reading(item)
+        if errors:
+            results.append({"index": index, "status": "error", "errors": errors})
+            continue
+        results.append({"index": index, "status": "ok"})
+        if newest is None or (item.get("ts") or 0) >= (newest.get("ts") or 0):
+            newest = item
+
+    accepted = sum(1 for r in results if r["status"] == "ok")
+    if newest is not None:
+        latest_data.update({
+            "temperature": newest.get("temperature"),
+            "humidity": newest.get("humidity"),
+            "gas": newest.get("gas"),
+            "status": newest.get("status")
+        })
+        # Satu broadcast per batch (reading terbaru), bukan per item
+        socketio.emit('update_data', latest_data)
+
+    return jsonify({"accepted": accepted, "rejected": len(items) - accepted, "results": results}), \
+        (200 if accepted else 400)
+
 @app.route('/api/latest', methods=['GET'])
 def get_latest_data():
     """Endpoint to retrieve the latest sensor data."""
@@ -8,6 +8,8 @@
  * - MQ135 (Amonia/CO2) -> Pin GPIO 32 (ADC1_CH4)
  * 
  * Data dikirim setiap 1 detik ke server Django
+ * (JSON, atau frame biner 18 byte jika USE_BINARY_FRAME = 1;
+ *  format frame: backend + web/smartfruit/monitoring/payloads.py)
  */
 
 #include <WiFi.h>
@@ -21,6 +23,25 @@ const char* password = "GANTI_PASSWORD_WIFI";     // Password WiFi
 
 // ===== KONFIGURASI SERVER =====
 const char* serverUrl = "http://103.151.63.80:8000/api/sensor/data/";
+const char* deviceId = "esp32-01";                // ID unik per ESP32 (tag "device" di InfluxDB)
+
+// ===== FORMAT PAYLOAD =====
+// 1 = kirim frame biner ringkas (Content-Type: application/vnd.smartfruit.frame)
+// 0 = kirim JSON seperti biasa
+#define USE_BINARY_FRAME 0
+
+// Frame v1, little-endian (ESP32 juga little-endian), nilai diskalakan ke integer
+struct __attribute__((packed)) SensorFrame {
+  uint8_t  version;     // = 1
+  int8_t   status;      // 0 / 1, -1 = tidak ada
+  int16_t  suhu;        // x100
+  uint16_t kelembapan;  // x100
+  uint16_t mq2;         // x10
+  uint16_t mq3;         // x10
+  uint16_t mq135;       // x10
+  int16_t  skorTotal;   // x100
+  uint32_t ts;          // epoch detik, 0 = tidak ada (server pakai waktu terima)
+};
 
 // ===== KONFIGURASI SENSOR =====
 #define DHTPIN 4           // Pin DHT22
@@ -122,7 +143,30 @@ void loop() {
     // Kirim data ke server jika WiFi terhubung
     if (WiFi.status() == WL_CONNECTED) {
       HTTPClient http;
-      
+      int httpCode;
+
+#if USE_BINARY_FRAME
+      // Frame biner: 18 byte + device id
+      uint8_t buf[sizeof(SensorFrame) + 64];
+      SensorFrame frame;
+      frame.version = 1;
+      frame.status = status;
+      frame.suhu = (int16_t)lroundf(suhu * 100);
+      frame.kelembapan = (uint16_t)lroundf(kelembapan * 100);
+      frame.mq2 = (uint16_t)(mq2 * 10);
+      frame.mq3 = (uint16_t)(mq3 * 10);
+      frame.mq135 = (uint16_t)(mq135 * 10);
+      frame.skorTotal = (int16_t)lroundf(skorTotal * 100);
+      frame.ts = 0;
+      size_t idLen = strnlen(deviceId, 64);
+      memcpy(buf, &frame, sizeof(frame));
+      memcpy(buf + sizeof(frame), deviceId, idLen);
+
+      http.begin(serverUrl);
+      http.addHeader("Content-Type", "application/vnd.smartfruit.frame");
+      http.addHeader("X-Device-Id", deviceId);
+      httpCode = http.POST(buf, sizeof(frame) + idLen);
+#else
       // Buat JSON payload
       StaticJsonDocument<300> doc;
       doc["suhu"] = suhu;
@@ -135,6 +179,7 @@ void loop() {
       doc["skorRH"] = skorRH;
       doc["skorTotal"] = skorTotal;
       doc["status"] = status;
+      doc["device_id"] = deviceId;
       
       String jsonData;
       serializeJson(doc, jsonData);
@@ -142,8 +187,10 @@ void loop() {
       // Kirim HTTP POST
       http.begin(serverUrl);
       http.addHeader("Content-Type", "application/json");
+      http.addHeader("X-Device-Id", deviceId);
       
-      int httpCode = http.POST(jsonData);
+      httpCode = http.POST(jsonData);
+#endif
       
       if (httpCode == 200) {
         Serial.println("✓ Data sent successfully!");
@@ -0,0 +1,32 @@
+"""
+Konfigurasi gunicorn (dibaca otomatis dari direktori kerja, lihat Procfile).
+
+Model ML tidak dimuat saat import aplikasi (monitoring/ml_runtime.py):
+
+- ``ML_PRELOAD=1``: aplikasi + semua model dimuat sekali di master sebelum
+  fork; worker berbagi halaman memori model secara copy-on-write. Logging
+  juga dikonfigurasi di master; ``QueueLogHandler`` memulai listener baru
+  di tiap worker setelah fork (monitoring/logs.py).
+- ``ML_WARMUP=1``: tanpa preload, tiap worker memuat model tepat setelah boot.
+
+Bandingkan memori per worker dengan ``python manage.py memory_report --pid <master>``.
+"""
+import os
+
+preload_app = os.getenv('ML_PRELOAD', '0') == '1'
+
+
+def when_ready(server):
+    # Jalan di master setelah aplikasi dimuat, sebelum worker pertama di-fork
+    if preload_app:
+        from monitoring import ml_runtime
+        ml_runtime.preload()
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if settings.ML_WARMUP:
+        from monitoring import ml_runtime
+        ml_runtime.warm_up()
+        worker.log.info('ML warm-up selesai (pid %s)', worker.pid)
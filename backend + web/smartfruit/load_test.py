@@ -0,0 +1,505 @@
+"""
+Load test ingest sensor: ribuan device virtual sekaligus.
+
+Berbeda dengan simulate_sensor_realtime.py / send_realtime_data.py (satu
+device, requests.post + time.sleep), script ini memakai asyncio dengan pool
+koneksi keep-alive (aiohttp jika terpasang, selain itu client HTTP/1.1
+bawaan di bawah) atau MQTT ke broker lokal.
+
+Profil sensor diambil dari ml/dataset_layak_tidaklayak.csv: tiap device
+mulai dari rata-rata kelas LAYAK / TIDAK LAYAK lalu bergerak acak dengan
+mean reversion (std sesuai dataset); sebagian device pelan-pelan "membusuk"
+ke profil TIDAK LAYAK (``--spoil``).
+
+Jadwal kirim open-loop: tiap device mengirim tiap 1/rate detik dan latensi
+dihitung dari waktu kirim yang dijadwalkan, jadi antrean di sisi client
+(pool penuh) ikut terukur dan tidak menyembunyikan server yang lambat.
+``ts`` tiap reading adalah waktu jadwalnya (epoch detik, presisi ms), jadi
+reading dalam satu batch tidak berbagi timestamp dan tidak dibuang server
+sebagai duplikat (device_id, timestamp). Frame biner hanya membawa ``ts``
+per detik, jadi untuk ``--format frame`` pakai rate <= 1 per device.
+
+Contoh::
+
+    python load_test.py --devices 2000 --rate 0.5 --duration 60 --endpoint data --endpoint batch
+    python load_test.py --mode mqtt --broker 127.0.0.1 --devices 1000 --rate 1 --qos 1
+    python load_test.py --devices 500 --duration 30 --report hasil.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # opsional, fallback ke HttpPool
+    aiohttp = None
+
+from monitoring import payloads
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BASE_DIR, 'ml', 'dataset_layak_tidaklayak.csv')
+FEATURES = ('mq2', 'mq3', 'mq135', 'humidity', 'temperature')
+
+# Endpoint ingest: path dan bentuk payload
+ENDPOINTS = {
+    'data': '/api/sensor/data/',      # sensor_data (JSON / frame biner)
+    'update': '/api/sensor/update/',  # update_sensor (temperature / humidity)
+    'batch': '/api/sensor/batch/',    # sensor_batch (banyak reading)
+}
+MQTT_TOPIC = 'annas/esp32/{device}/sensor'
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ----------------------------------------------------------
+# Profil sensor
+# ----------------------------------------------------------
+def load_profiles(path=DATASET_PATH):
+    """{status: {fitur: (mean, std)}} dari dataset."""
+    columns = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            by_status = columns.setdefault(row['status'], {name: [] for name in FEATURES})
+            for name in FEATURES:
+                by_status[name].append(float(row[name]))
+    return {
+        status: {name: (statistics.fmean(v), statistics.pstdev(v) or 1.0) for name, v in values.items()}
+        for status, values in columns.items()
+    }
+
+
+class VirtualDevice:
+    """Satu ESP32 virtual dengan nilai sensor yang bergerak (Ornstein-Uhlenbeck)."""
+
+    # Kekuatan tarikan ke rata-rata per langkah dan skala noise (x std)
+    REVERSION = 0.1
+    NOISE = 0.3
+
+    def __init__(self, device_id, profiles, status='Layak', spoil_steps=None, rng=None):
+        self.device_id = device_id
+        self.rng = rng or random.Random()
+        self.start = profiles.get(status) or next(iter(profiles.values()))
+        self.end = profiles.get('Tidak Layak', self.start) if spoil_steps else self.start
+        self.spoil_steps = spoil_steps
+        self.step = 0
+        self.values = {name: self.rng.gauss(mean, std * 0.5) for name, (mean, std) in self.start.items()}
+
+    def target(self, name):
+        """Rata-rata yang dituju; bergeser linear ke profil TIDAK LAYAK jika device membusuk."""
+        mean, std = self.start[name]
+        if not self.spoil_steps:
+            return mean, std
+        frac = min(1.0, self.step / self.spoil_steps)
+        end_mean, end_std = self.end[name]
+        return mean + (end_mean - mean) * frac, std + (end_std - std) * frac
+
+    def next_reading(self, ts=None):
+        """Reading berikutnya; ``ts`` = waktu ukur (epoch detik), default sekarang."""
+        self.step += 1
+        for name, value in self.values.items():
+            mean, std = self.target(name)
+            self.values[name] = value + self.REVERSION * (mean - value) + self.rng.gauss(0, std * self.NOISE)
+        v = self.values
+        return {
+            'device_id': self.device_id,
+            'suhu': round(v['temperature'], 2),
+            'kelembapan': round(min(100.0, max(0.0, v['humidity'])), 2),
+            'mq2': round(max(0.0, v['mq2']), 1),
+            'mq3': round(max(0.0, v['mq3']), 1),
+            'mq135': round(max(0.0, v['mq135']), 1),
+            'ts': round(time.time() if ts is None else ts, 3),
+        }
+
+
+def make_devices(count, profiles, spoil_fraction=0.0, spoil_steps=600, seed=None):
+    rng = random.Random(seed)
+    statuses = sorted(profiles)
+    devices = []
+    for i in range(count):
+        spoil = spoil_steps if rng.random() < spoil_fraction else None
+        devices.append(VirtualDevice(f'load-{i:05d}', profiles, status=rng.choice(statuses),
+                                     spoil_steps=spoil, rng=random.Random(rng.random())))
+    return devices
+
+
+# ----------------------------------------------------------
+# Statistik
+# ----------------------------------------------------------
+class Stats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.sent = 0
+        self.ok = 0
+        self.readings = 0
+        self.errors = {}
+
+    def record(self, latency, error=None, readings=1):
+        self.sent += 1
+        if error is None:
+            self.ok += 1
+            self.readings += readings
+            self.latencies.append(latency)
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+        return {
+            'requests': self.sent,
+            'ok': self.ok,
+            'error_rate': round((self.sent - self.ok) / self.sent, 4) if self.sent else 0.0,
+            'throughput_rps': round(self.ok / elapsed, 2) if elapsed else 0.0,
+            'readings_per_s': round(self.readings / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {f'p{p}': pct(p) for p in PERCENTILES} | {
+                'mean': round(statistics.fmean(ordered) * 1000, 2) if ordered else None,
+                'max': round(ordered[-1] * 1000, 2) if ordered else None,
+            },
+            'errors': dict(self.errors),
+        }
+
+
+# ----------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------
+class HttpError(Exception):
+    pass
+
+
+class HttpPool:
+    """
+    Pool koneksi HTTP/1.1 keep-alive minimal di atas asyncio (dipakai jika
+    aiohttp tidak terpasang). Maksimal ``size`` koneksi ke satu host.
+    """
+
+    def __init__(self, base_url, size=100, timeout=10.0):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http':
+            raise ValueError('HttpPool hanya mendukung http://')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self):
+        if self._idle:
+            return self._idle.pop() + (True,)
+        return await asyncio.open_connection(self.host, self.port) + (False,)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise HttpError('connection closed')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await reader.readline()).strip() or b'0', 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        return status, headers, body
+
+    async def post(self, path, body, content_type='application/json', headers=None):
+        """Return (status, body). Koneksi dipakai ulang kecuali server menutupnya."""
+        extra = ''.join(f'{k}: {v}\r\n' for k, v in (headers or {}).items())
+        head = (f'POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+                f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n{extra}\r\n')
+        request = head.encode('latin-1') + body
+        async with self._slots:
+            while True:
+                reader, writer, reused = await self._connect()
+                try:
+                    writer.write(request)
+                    status, resp_headers, resp_body = await asyncio.wait_for(
+                        self._read_response(reader), self.timeout)
+                    break
+                except (HttpError, ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # Koneksi idle yang sudah ditutup server: ulangi dengan koneksi lain
+                    if not reused:
+                        raise
+                except BaseException:
+                    writer.close()
+                    raise
+            if resp_headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return status, resp_body
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AiohttpPool:
+    def __init__(self, base_url, size=100, timeout=10.0):
+        self.base_url = base_url.rstrip('/')
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=size),
+            timeout=aiohttp.ClientTimeout(total=timeout))
+
+    async def post(self, path, body, content_type='application/json', headers=None):
+        async with self.session.post(self.base_url + path, data=body,
+                                     headers={'Content-Type': content_type, **(headers or {})}) as resp:
+            return resp.status, await resp.read()
+
+    async def close(self):
+        await self.session.close()
+
+
+def make_pool(base_url, size, timeout):
+    if aiohttp is not None:
+        return AiohttpPool(base_url, size, timeout)
+    return HttpPool(base_url, size, timeout)
+
+
+def encode_request(endpoint, readings, fmt='json'):
+    """Body + content type untuk satu request ke ``endpoint``."""
+    if endpoint == 'batch':
+        return json.dumps({'readings': readings, 'sent_at': time.time()}).encode(), 'application/json'
+    reading = readings[0]
+    if endpoint == 'update':
+        reading = {**reading, 'temperature': reading['suhu'], 'humidity': reading['kelembapan']}
+    if fmt == 'frame':
+        return payloads.encode_frame(reading), payloads.FRAME
+    return json.dumps(reading).encode(), 'application/json'
+
+
+async def run_http(devices, endpoints, rate, duration, pool, batch_size=10, fmt='json'):
+    """Jalankan semua device; return {endpoint: Stats}."""
+    stats = {name: Stats(name) for name in endpoints}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + duration
+    interval = 1.0 / rate
+    # loop.time() (monotonic) -> epoch untuk ts reading
+    wall = time.time() - start
+    tasks = set()
+
+    async def send(endpoint, readings, scheduled):
+        body, content_type = encode_request(endpoint, readings, fmt)
+        try:
+            status, _ = await pool.post(ENDPOINTS[endpoint], body, content_type,
+                                        headers={'X-Device-Id': readings[0]['device_id']})
+            error = None if 200 <= status < 300 else f'HTTP {status}'
+        except Exception as e:
+            error = type(e).__name__
+        stats[endpoint].record(loop.time() - scheduled, error, readings=len(readings))
+
+    async def device_loop(index, device):
+        endpoint = endpoints[index % len(endpoints)]
+        # Batch: kumpulkan batch_size reading lalu kirim sekali
+        per_request = batch_size if endpoint == 'batch' else 1
+        scheduled = start + random.uniform(0, interval * per_request)
+        while scheduled < deadline:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Reading batch diukur tiap interval selama jendela batch, dikirim di akhir jendela
+            readings = [device.next_reading(ts=wall + scheduled - (per_request - 1 - k) * interval)
+                        for k in range(per_request)]
+            task = asyncio.create_task(send(endpoint, readings, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            scheduled += interval * per_request
+
+    await asyncio.gather(*(device_loop(i, d) for i, d in enumerate(devices)))
+    if tasks:
+        await asyncio.gather(*tasks)
+    await pool.close()
+    return stats, loop.time() - start
+
+
+# ----------------------------------------------------------
+# MQTT
+# ----------------------------------------------------------
+class MqttPublisher:
+    """
+    Beberapa koneksi paho (device dibagi round-robin). Latensi = publish
+    sampai PUBACK (QoS 1) atau sampai pesan ditulis ke socket (QoS 0).
+    """
+
+    def __init__(self, broker, port, clients=10, qos=1):
+        import paho.mqtt.client as mqtt
+
+        self.qos = qos
+        self.clients = []
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._early = set()
+        for i in range(clients):
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f'load-test-{os.getpid()}-{i}')
+            client.max_inflight_messages_set(1000)
+            client.max_queued_messages_set(0)
+            client.on_publish = self._on_publish
+            client.connect(broker, port, 60)
+            client.loop_start()
+            self.clients.append(client)
+
+    def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        with self._lock:
+            done = self._pending.pop((id(client), mid), None)
+            if done is None:
+                self._early.add((id(client), mid))
+        if done is not None:
+            done()
+
+    def publish(self, index, topic, payload, done):
+        """Kirim; ``done()`` dipanggil dari thread paho saat terkirim."""
+        client = self.clients[index % len(self.clients)]
+        info = client.publish(topic, payload, qos=self.qos)
+        if info.rc != 0:
+            raise HttpError(f'MQTT rc {info.rc}')
+        key = (id(client), info.mid)
+        with self._lock:
+            if key in self._early:
+                self._early.discard(key)
+            else:
+                self._pending[key] = done
+                return
+        done()
+
+    def close(self):
+        for client in self.clients:
+            client.loop_stop()
+            client.disconnect()
+
+
+async def run_mqtt(devices, rate, duration, publisher, topic=MQTT_TOPIC, fmt='json'):
+    stats = Stats('mqtt')
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + duration
+    interval = 1.0 / rate
+    wall = time.time() - start
+    inflight = []
+
+    async def device_loop(index, device):
+        scheduled = start + random.uniform(0, interval)
+        while scheduled < deadline:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            reading = device.next_reading(ts=wall + scheduled)
+            body = payloads.encode_frame(reading) if fmt == 'frame' else json.dumps(reading).encode()
+            future = loop.create_future()
+            sent_for = scheduled
+
+            def done(future=future):
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(loop.time()))
+
+            try:
+                publisher.publish(index, topic.format(device=device.device_id), body, done)
+            except Exception as e:
+                stats.record(0, type(e).__name__)
+            else:
+                inflight.append((sent_for, future))
+            scheduled += interval
+
+    await asyncio.gather(*(device_loop(i, d) for i, d in enumerate(devices)))
+    for sent_for, future in inflight:
+        try:
+            acked = await asyncio.wait_for(future, 10)
+            stats.record(acked - sent_for)
+        except asyncio.TimeoutError:
+            stats.record(0, 'timeout')
+    publisher.close()
+    return {'mqtt': stats}, loop.time() - start
+
+
+# ----------------------------------------------------------
+# CLI
+# ----------------------------------------------------------
+def print_report(stats, elapsed):
+    print(f"\n{'endpoint':<10} {'req':>8} {'ok':>8} {'err%':>6} {'req/s':>8} {'read/s':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for name, s in stats.items():
+        r = s.summary(elapsed)
+        lat = r['latency_ms']
+        print(f"{name:<10} {r['requests']:>8} {r['ok']:>8} {r['error_rate'] * 100:>6.2f} "
+              f"{r['throughput_rps']:>8} {r['readings_per_s']:>8} "
+              + ' '.join(f"{lat[k] if lat[k] is not None else '-':>8}" for k in ('p50', 'p95', 'p99', 'max')))
+        if r['errors']:
+            print(f"{'':<10} errors: {r['errors']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--mode', choices=('http', 'mqtt'), default='http')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS),
+                        help='boleh diulang; device dibagi rata antar endpoint (default: data)')
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=1.0, help='reading per detik per device')
+    parser.add_argument('--duration', type=float, default=30.0, help='detik')
+    parser.add_argument('--connections', type=int, default=100, help='ukuran pool HTTP')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--batch-size', type=int, default=10, help='reading per request untuk endpoint batch')
+    parser.add_argument('--format', choices=('json', 'frame'), default='json')
+    parser.add_argument('--spoil', type=float, default=0.1, help='fraksi device yang bergeser ke TIDAK LAYAK')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--broker', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--mqtt-clients', type=int, default=10)
+    parser.add_argument('--qos', type=int, choices=(0, 1), default=1)
+    parser.add_argument('--topic', default=MQTT_TOPIC)
+    parser.add_argument('--report', help='simpan ringkasan JSON ke file ini')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Jalankan load test sesuai argumen; return (stats, elapsed)."""
+    devices = make_devices(args.devices, load_profiles(), args.spoil, seed=args.seed)
+    if args.mode == 'mqtt':
+        publisher = MqttPublisher(args.broker, args.port, args.mqtt_clients, args.qos)
+        return asyncio.run(run_mqtt(devices, args.rate, args.duration, publisher, args.topic, args.format))
+
+    async def main():
+        pool = make_pool(args.url, args.connections, args.timeout)
+        return await run_http(devices, args.endpoint or ['data'], args.rate, args.duration,
+                              pool, args.batch_size, args.format)
+    return asyncio.run(main())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    target = f'{args.broker}:{args.port}' if args.mode == 'mqtt' else args.url
+    print(f"🚀 Load test {args.mode} -> {target}: {args.devices} device x {args.rate}/s selama {args.duration}s")
+    stats, elapsed = run(args)
+    print_report(stats, elapsed)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'elapsed': elapsed, 'args': vars(args),
+                       'endpoints': {name: s.summary(elapsed) for name, s in stats.items()}}, f, indent=2)
+        print(f"💾 Ringkasan disimpan ke {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,9 @@
 """
 ML Module untuk Smart Beef Monitoring
+
+Fungsi ml_service dimuat saat pertama diakses (``ml.predict_status``), jadi
+``import ml.portable_forest`` tidak ikut memuat model.
 """
-from .ml_service import (
-    predict_status,
-    add_realtime_data,
-    retrain_model,
-    get_dataset_info
-)
 
 __all__ = [
     'predict_status',
@@ -14,3 +11,10 @@ __all__ = [
     'retrain_model',
     'get_dataset_info'
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import ml_service
+        return getattr(ml_service, name)
+    raise AttributeError(f"module 'ml' has no attribute {name!r}")
@@ -234,7 +234,8 @@ class SensorAIAgent:
                 center = (min_val + max_val) / 2
                 distance = abs(value - center)
                 max_distance = (max_val - min_val) / 2
-                confidence = 1 - (distance / max_distance * 0.3)  # Max 30% pengurangan
+                # Threshold adaptif bisa min == max jika data historis konstan
+                confidence = 1 - (distance / max_distance * 0.3) if max_distance else 1.0  # Max 30% pengurangan
             
             confidences.append(max(0, min(1, confidence)))
         
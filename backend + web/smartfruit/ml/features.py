@@ -0,0 +1,168 @@
+"""
+Skema fitur sensor untuk semua model (training dan inferensi).
+
+Satu tempat untuk nama kolom, urutan, satuan, rentang valid dan resolusi
+sensor. Body request (``suhu`` / ``temperature``, ...), baris Influx, kolom
+per field dan DataFrame CSV (header ``mq2,...,status`` maupun
+``MQ2,...,Label``) dikonversi ke array float32 C-contiguous dengan urutan
+kolom yang diminta model. Nama dicocokkan lewat alias, tanpa membedakan
+huruf besar/kecil.
+
+``FEATURES`` adalah urutan kanonik (urutan dataset ML Service). Model yang
+dilatih dengan skema ini menyimpan nama fiturnya (``feature_names_in_`` /
+meta ``.npz``); ``order_for()`` membaca nama itu, jadi model lama dengan
+urutan lain (``LAYOUTS``) tetap menerima kolom yang benar.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Feature = namedtuple('Feature', 'name unit low high resolution aliases')
+
+SCHEMA = (
+    Feature('mq2', 'ppm', 0, 100000, 0.01, ('gas', 'MQ2 (ppm)')),
+    Feature('mq3', 'ppm', 0, 100000, 0.01, ('MQ3 (ppm)',)),
+    Feature('mq135', 'ppm', 0, 100000, 0.01, ('MQ135 (ppm)',)),
+    Feature('humidity', '%RH', 0, 100, 0.1, ('kelembapan', 'hum')),
+    Feature('temperature', '°C', -40, 125, 0.1, ('suhu', 'temp')),
+)
+BY_NAME = {f.name: f for f in SCHEMA}
+FEATURES = tuple(BY_NAME)
+LABEL = 'status'
+LABEL_ALIASES = ('status', 'label')
+
+# Urutan kolom model yang dilatih sebelum skema ini (tanpa nama fitur)
+LAYOUTS = {
+    'beef': FEATURES,  # ml/model.pkl
+    'fruit': ('temperature', 'humidity', 'mq2', 'mq3', 'mq135'),  # models/fruit_quality_model.*
+    'fruit_legacy': ('temperature', 'humidity', 'mq2'),  # monitoring/fruit_quality_model.pkl
+}
+
+_CANONICAL = {alias.lower(): f.name for f in SCHEMA for alias in (f.name, *f.aliases)}
+# Key dict yang dicoba per fitur (urutan = prioritas)
+_KEYS = {
+    f.name: tuple(dict.fromkeys(k for alias in (f.name, *f.aliases) for k in (alias, alias.upper(), alias.title())))
+    for f in SCHEMA
+}
+
+
+def canonical(name):
+    """Nama kanonik untuk ``name`` (nama, alias, huruf besar), atau None."""
+    return _CANONICAL.get(str(name).strip().lower())
+
+
+def resolve(names):
+    """Tuple nama kanonik untuk ``names``; ValueError jika ada yang tidak dikenal."""
+    order = tuple(canonical(n) for n in names)
+    unknown = [n for n, c in zip(names, order) if c is None]
+    if unknown:
+        raise ValueError(f'fitur tidak dikenal: {unknown}')
+    return order
+
+
+def order_for(*objects, default=FEATURES):
+    """
+    Urutan fitur untuk model / scaler: ``feature_names_in_`` objek pertama
+    yang menyimpannya, selain itu ``default`` (dicek terhadap
+    ``n_features_in_``).
+    """
+    for obj in objects:
+        names = getattr(obj, 'feature_names_in_', None)
+        if names is not None:
+            return resolve(names)
+    order = tuple(default)
+    n = next((obj.n_features_in_ for obj in objects if hasattr(obj, 'n_features_in_')), len(order))
+    if n != len(order):
+        raise ValueError(f'model butuh {n} fitur, layout {order} berisi {len(order)}')
+    return order
+
+
+def resolution(order=FEATURES):
+    """Resolusi sensor per kolom ``order`` (untuk kuantisasi key cache)."""
+    return tuple(BY_NAME[name].resolution for name in order)
+
+
+def validate(X, order=FEATURES):
+    """ValueError untuk nilai kosong/NaN/inf atau di luar rentang fitur."""
+    low = np.array([BY_NAME[n].low for n in order], dtype=np.float64)
+    high = np.array([BY_NAME[n].high for n in order], dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        bad = ~np.isfinite(X) | (X < low) | (X > high)
+    if bad.any():
+        row, col = np.argwhere(bad)[0]
+        f = BY_NAME[order[col]]
+        raise ValueError(f'{f.name}={X[row, col]} di luar rentang {f.low}..{f.high} {f.unit} (baris {row})')
+
+
+def _finish(X, order, fill, check):
+    if fill is not None:
+        X = np.where(np.isnan(X), fill, X)
+    if check:
+        validate(X, order)
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def _get(record, keys):
+    for key in keys:
+        value = record.get(key)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def from_records(records, order=FEATURES, fill=0.0, check=True):
+    """
+    Array (n, len(order)) float32 dari list dict: body request, hasil
+    ``influx_client``, cache device. Field kosong = ``fill`` (None = wajib).
+    """
+    keys = [_KEYS[name] for name in order]
+    try:
+        X = np.array([[_get(r, k) for k in keys] for r in records], dtype=np.float64)
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f'reading tidak valid: {e}')
+    return _finish(X.reshape(-1, len(order)), order, fill, check)
+
+
+def from_columns(columns, order=FEATURES, fill=0.0, check=True):
+    """Seperti ``from_records`` untuk dict nama -> array kolom (Influx pivot, batch ingest)."""
+    columns = {canonical(name): values for name, values in columns.items()}
+    n = len(next(iter(columns.values()), ()))
+    missing = np.full(n, np.nan)
+    try:
+        X = np.column_stack([np.asarray(columns.get(name, missing), dtype=np.float64) for name in order])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'kolom tidak valid: {e}')
+    return _finish(X.reshape(n, len(order)), order, fill, check)
+
+
+def from_frame(df, order=FEATURES, check=True):
+    """Array float32 dari DataFrame (nama kolom boleh alias); kolom wajib ada dan terisi."""
+    columns = {canonical(c): c for c in df.columns if canonical(c)}
+    missing = [name for name in order if name not in columns]
+    if missing:
+        raise ValueError(f'kolom tidak ada: {missing}')
+    X = df[[columns[name] for name in order]].to_numpy(dtype=np.float64)
+    return _finish(X, order, None, check)
+
+
+def labels(df):
+    """Kolom label (``status`` / ``Label``) sebagai array str."""
+    for column in df.columns:
+        if str(column).strip().lower() in LABEL_ALIASES:
+            return df[column].astype(str).str.strip().to_numpy()
+    raise ValueError(f'kolom label tidak ada (salah satu dari {LABEL_ALIASES})')
+
+
+def frame(df, order=FEATURES):
+    """
+    DataFrame dengan kolom kanonik ``order`` (float32) + ``status`` jika ada,
+    untuk training yang ingin scaler/model menyimpan nama fitur.
+    """
+    import pandas as pd
+
+    out = pd.DataFrame(from_frame(df, order), columns=list(order), index=df.index)
+    try:
+        out[LABEL] = labels(df)
+    except ValueError:
+        pass
+    return out
@@ -2,17 +2,23 @@
 ML Service untuk Smart Beef Monitoring
 Continual Learning dengan RandomForestClassifier
 """
+import json
 import os
-import pandas as pd
+import threading
+from collections import OrderedDict
 import numpy as np
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
 from datetime import datetime
 import logging
 
-# Setup logging
+# pandas / scikit-learn / joblib diimport di dalam method yang memakainya:
+# dengan model portabel (model.npz) prediksi cukup NumPy
+try:
+    from . import features, portable_forest
+except ImportError:  # diimport sebagai modul top-level (ml/ di sys.path)
+    import features
+    import portable_forest
+
+# Setup logging (no-op jika handler root sudah dipasang, mis. LOGGING Django)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -23,19 +29,129 @@ logger = logging.getLogger('ML_Service')
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATASET_PATH = os.path.join(BASE_DIR, 'dataset_layak_tidaklayak.csv')
 MODEL_PATH = os.path.join(BASE_DIR, 'model.pkl')
+# Runtime model: auto (model.npz jika cocok dengan model.pkl), portable, sklearn
+RUNTIME = os.environ.get('ML_RUNTIME', 'auto')
+# Parameter RandomForest; `manage.py tune_model --save` menulis hasil
+# hyperparameter search (ml/tuning.py) ke PARAMS_PATH
+PARAMS_PATH = os.path.join(BASE_DIR, 'model_params.json')
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+# Cache prediksi (jumlah entri, 0 = mati) dan resolusi sensor per fitur
+# (urutan features.FEATURES): gas 0.01 ppm, kelembapan/suhu 0.1 (DHT22)
+CACHE_SIZE = int(os.environ.get('ML_CACHE_SIZE', '4096'))
+FEATURE_RESOLUTION = features.resolution()
+
+
+class PredictionCache:
+    """
+    LRU hasil prediksi dengan key vektor fitur yang dibulatkan ke resolusi
+    sensor. Setiap entri terikat ke versi model; saat versi berubah (load /
+    train ulang) seluruh cache dikosongkan.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, resolution=FEATURE_RESOLUTION):
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self.version = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, values):
+        """Tuple int: nilai dibagi resolusi lalu dibulatkan."""
+        return tuple(round(v / r) for v, r in zip(values, self.resolution))
+
+    def values(self, key):
+        """Nilai fitur terkuantisasi untuk ``key`` (dipakai saat prediksi)."""
+        return [k * r for k, r in zip(key, self.resolution)]
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self.version:
+                if self._data:
+                    self.invalidations += 1
+                    self._data.clear()
+                self.version = version
+            result = self._data.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, version, result):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._data[key] = result
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / total if total else 0.0,
+            'model_version': self.version,
+        }
+
+
+def load_params():
+    """Parameter RandomForest dari PARAMS_PATH, atau DEFAULT_PARAMS jika belum ada."""
+    try:
+        with open(PARAMS_PATH) as f:
+            return json.load(f)['params']
+    except (OSError, ValueError, KeyError):
+        return dict(DEFAULT_PARAMS)
+
 
 class MLService:
     """Service untuk prediksi dan continual learning"""
     
     def __init__(self):
-        self.model = None
-        self.feature_names = ['mq2', 'mq3', 'mq135', 'humidity', 'temperature']
+        self.model_version = 0
+        self._model = None
+        self.cache = PredictionCache()
+        self.feature_names = list(features.FEATURES)
+        self.feature_order = features.FEATURES
         self.load_model()
+
+    @property
+    def model(self):
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Setiap model baru = versi baru; cache prediksi lama tidak dipakai lagi
+        self._model = model
+        self.model_version += 1
+        # Urutan kolom yang diminta model (model lama bisa berbeda dari skema)
+        if model is not None:
+            self.feature_order = features.order_for(model)
     
     def load_model(self):
         """Load model dari file, jika tidak ada maka train model baru"""
         try:
-            if os.path.exists(MODEL_PATH):
+            portable = portable_forest.choose(MODEL_PATH, RUNTIME)
+            if portable:
+                self.model = portable_forest.load(portable)
+                logger.info(f"✅ Model loaded from {portable} (portable)")
+            elif os.path.exists(MODEL_PATH):
+                import joblib
+
                 self.model = joblib.load(MODEL_PATH)
                 logger.info(f"✅ Model loaded from {MODEL_PATH}")
             else:
@@ -45,9 +161,15 @@ class MLService:
             logger.error(f"❌ Error loading model: {e}")
             self.train_model()
     
-    def train_model(self):
-        """Train model dengan dataset yang ada"""
+    def train_model(self, params=None):
+        """Train model dengan dataset yang ada (``params`` default ``load_params()``)"""
         try:
+            import joblib
+            import pandas as pd
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.metrics import accuracy_score, classification_report
+            from sklearn.model_selection import train_test_split
+
             # Load dataset
             if not os.path.exists(DATASET_PATH):
                 logger.error(f"❌ Dataset not found: {DATASET_PATH}")
@@ -57,8 +179,9 @@ class MLService:
             logger.info(f"📊 Dataset loaded: {len(df)} records")
             
             # Prepare features and target
-            X = df[self.feature_names]
-            y = df['status']
+            # Header dataset boleh mq2,...,status atau MQ2,...,Label (lihat features.py)
+            X = features.from_frame(df, features.FEATURES)
+            y = features.labels(df)
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -66,12 +189,12 @@ class MLService:
             )
             
             # Train model
-            logger.info("🔄 Training RandomForestClassifier...")
+            params = params or load_params()
+            logger.info(f"🔄 Training RandomForestClassifier {params}...")
             self.model = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=10,
                 random_state=42,
-                n_jobs=-1
+                n_jobs=-1,
+                **params
             )
             self.model.fit(X_train, y_train)
             
@@ -83,9 +206,17 @@ class MLService:
             logger.info(f"📈 Accuracy: {accuracy:.2%}")
             logger.info("\n" + classification_report(y_test, y_pred))
             
-            # Save model
-            joblib.dump(self.model, MODEL_PATH)
-            logger.info(f"💾 Model saved to {MODEL_PATH}")
+            # Save model (file sementara + rename: worker lain yang sedang
+            # membaca file lama tidak melihat file setengah tertulis)
+            tmp_path = f'{MODEL_PATH}.{os.getpid()}.tmp'
+            joblib.dump(self.model, tmp_path)
+            portable_path = portable_forest.sibling(MODEL_PATH)
+            portable_tmp = f'{portable_path}.{os.getpid()}.tmp'
+            portable_forest.export(self.model, portable_tmp, feature_names=self.feature_names,
+                                   source_path=tmp_path)
+            os.replace(tmp_path, MODEL_PATH)
+            os.replace(portable_tmp, portable_path)
+            logger.info(f"💾 Model saved to {MODEL_PATH} (+ {portable_path})")
             
             return True
             
@@ -120,27 +251,37 @@ class MLService:
                     'probabilities': {}
                 }
             
-            # Prepare input
-            features = np.array([[mq2, mq3, mq135, humidity, temperature]])
-            
-            # Predict
-            prediction = self.model.predict(features)[0]
-            probabilities = self.model.predict_proba(features)[0]
+            # Kondisi yang sama (dalam resolusi sensor) cukup lookup cache
+            version = self.model_version
+            key = self.cache.key((mq2, mq3, mq135, humidity, temperature))
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return {**cached, 'probabilities': dict(cached['probabilities']),
+                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+            # Prepare input (nilai terkuantisasi: hasil sama untuk satu key),
+            # kolom diurutkan sesuai model
+            values = dict(zip(features.FEATURES, self.cache.values(key)))
+            X = features.from_records([values], self.feature_order, check=False)
             
-            # Get class labels
+            # Predict: label = kelas dengan probabilitas terbesar (sama dengan predict)
+            probabilities = self.model.predict_proba(X)[0]
             classes = self.model.classes_
+            prediction = classes[int(np.argmax(probabilities))]
             prob_dict = {classes[i]: float(probabilities[i]) for i in range(len(classes))}
             
             confidence = max(probabilities)
             
-            logger.info(f"🔮 Prediction: {prediction} (confidence: {confidence:.2%})")
+            logger.debug("🔮 Prediction: %s (confidence: %.2f%%)", prediction, confidence * 100)
             
-            return {
+            result = {
                 'status': prediction,
                 'confidence': float(confidence),
                 'probabilities': prob_dict,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
+            self.cache.put(key, version, result)
+            return {**result, 'probabilities': dict(prob_dict),
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             
         except Exception as e:
             logger.error(f"❌ Error predicting: {e}")
@@ -159,7 +300,9 @@ class MLService:
             status: Status aktual ('Layak' atau 'Tidak Layak')
         """
         try:
-            # Buat dataframe baru
+            import pandas as pd
+
+            # Buat dataframe baru (urutan kolom = features.FEATURES + status)
             new_data = pd.DataFrame([{
                 'mq2': mq2,
                 'mq3': mq3,
@@ -167,7 +310,7 @@ class MLService:
                 'humidity': humidity,
                 'temperature': temperature,
                 'status': status
-            }])
+            }], columns=[*features.FEATURES, features.LABEL])
             
             # Append ke CSV
             if os.path.exists(DATASET_PATH):
@@ -175,7 +318,7 @@ class MLService:
             else:
                 new_data.to_csv(DATASET_PATH, mode='w', header=True, index=False)
             
-            logger.info(f"📝 Data added to dataset: MQ2={mq2}, MQ3={mq3}, MQ135={mq135}, Status={status}")
+            logger.debug("📝 Data added to dataset: MQ2=%s, MQ3=%s, MQ135=%s, Status=%s", mq2, mq3, mq135, status)
             
             return True
             
@@ -195,11 +338,14 @@ class MLService:
         """Dapatkan informasi dataset"""
         try:
             if os.path.exists(DATASET_PATH):
+                import pandas as pd
+
                 df = pd.read_csv(DATASET_PATH)
+                status = features.labels(df)
                 return {
                     'total_records': len(df),
-                    'layak_count': len(df[df['status'] == 'Layak']),
-                    'tidak_layak_count': len(df[df['status'] == 'Tidak Layak']),
+                    'layak_count': int((status == 'Layak').sum()),
+                    'tidak_layak_count': int((status == 'Tidak Layak').sum()),
                     'last_updated': datetime.fromtimestamp(os.path.getmtime(DATASET_PATH)).strftime('%Y-%m-%d %H:%M:%S')
                 }
             return {}
@@ -231,3 +377,8 @@ def retrain_model():
 def get_dataset_info():
     """Wrapper function untuk info dataset"""
     return ml_service.get_dataset_info()
+
+
+def get_cache_stats():
+    """Statistik cache prediksi (hit rate, ukuran, versi model)"""
+    return ml_service.cache.stats()
@@ -0,0 +1,276 @@
+"""
+Format model portabel untuk RandomForest / DecisionTree (tanpa pickle).
+
+File ``.npz`` (``numpy.savez_compressed``, dibaca dengan
+``allow_pickle=False``) berisi array berikut. Node semua pohon disambung;
+pohon ke-i memakai node ``tree_offset[i]:tree_offset[i+1]`` dan indeks
+anak relatif terhadap awal pohonnya:
+
+==================  ===============  =========================================
+array               dtype            isi
+==================  ===============  =========================================
+``meta``            str (JSON)       ``format``, ``version``, ``classes``,
+                                     ``feature_names``, ``n_trees``,
+                                     ``max_depth``, ``source``,
+                                     ``source_sha256`` (pickle asal),
+                                     ``scaler_sha256`` (scaler yang dilipat)
+``tree_offset``     int64 (T+1,)     awal node tiap pohon
+``children_left``   int32 (N,)       anak kiri (``-1`` = daun)
+``children_right``  int32 (N,)       anak kanan (``-1`` = daun)
+``feature``         int32 (N,)       indeks fitur split (daun: ``-2``)
+``threshold``       float64 (N,)     ke kiri jika ``float32(x) <= threshold``
+``value``           float32 (N, C)   probabilitas kelas di node (sudah
+                                     dinormalisasi per node)
+``input_weight``    float64 (F,)     opsional: praproses ``x * w + b``
+``input_bias``      float64 (F,)     (scaler yang dilipat)
+==================  ===============  =========================================
+
+Prediksi = rata-rata ``value`` daun dari semua pohon, sama dengan
+``predict_proba`` scikit-learn. ``ForestModel`` hanya butuh NumPy, jadi
+model bisa dimuat tanpa scikit-learn (cold start lebih cepat, memori lebih
+kecil) dan tidak terikat versi scikit-learn yang membuat pickle.
+
+File ``.npz`` disimpan di samping pickle-nya (``model.pkl`` ->
+``model.npz``). ``choose()`` memilih file yang dimuat: mode ``auto`` memakai
+``.npz`` hanya jika ``source_sha256``-nya cocok dengan pickle saat ini (dan
+``scaler_sha256`` dengan scaler-nya, untuk model yang scaler-nya dilipat),
+jadi pickle / scaler yang dilatih ulang tanpa export tidak tertutup file lama.
+
+CLI::
+
+    python ml/portable_forest.py model.pkl [model.npz] [--scaler scaler.pkl]
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FORMAT = 'smartfruit-forest'
+VERSION = 1
+
+
+def affine(scaler, n=None):
+    """
+    (weight, bias) sehingga ``X * weight + bias`` setara ``scaler.transform``.
+
+    StandardScaler: ``1/scale_`` dan ``-mean_/scale_``; MinMaxScaler:
+    ``scale_`` dan ``min_``. ``scaler`` None = identitas ``n`` fitur;
+    (None, None) jika scaler tidak dikenal (bukan transformasi affine).
+    """
+    n = n or getattr(scaler, 'n_features_in_', None)
+    weight, bias = np.ones(n), np.zeros(n)
+    if scaler is None:
+        return weight, bias
+    if hasattr(scaler, 'min_') and hasattr(scaler, 'scale_'):  # MinMaxScaler
+        return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    if hasattr(scaler, 'mean_') or hasattr(scaler, 'scale_'):  # StandardScaler
+        if getattr(scaler, 'scale_', None) is not None and getattr(scaler, 'with_std', True):
+            weight = 1.0 / np.asarray(scaler.scale_, dtype=np.float64)
+        if getattr(scaler, 'mean_', None) is not None and getattr(scaler, 'with_mean', True):
+            bias = -np.asarray(scaler.mean_, dtype=np.float64) * weight
+        return weight, bias
+    return None, None
+
+
+def sibling(path):
+    """Path file portabel untuk pickle ``path`` (ekstensi diganti ``.npz``)."""
+    return os.path.splitext(path)[0] + '.npz'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_meta(path):
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data['meta']))
+
+
+def choose(source_path, runtime='auto', scaler_path=None):
+    """
+    File ``.npz`` yang dimuat untuk pickle ``source_path``, atau None (pakai pickle).
+
+    ``runtime``: ``sklearn`` (selalu pickle), ``portable`` (selalu ``.npz`` jika
+    ada) atau ``auto`` (``.npz`` jika diekspor dari isi pickle saat ini, dan
+    dari isi ``scaler_path`` saat ini jika model memakai scaler).
+    """
+    portable = sibling(source_path)
+    if runtime == 'sklearn' or not os.path.exists(portable):
+        return None
+    if runtime == 'portable' or not os.path.exists(source_path):
+        return portable
+    try:
+        meta = read_meta(portable)
+        current = meta.get('source_sha256') == file_digest(source_path)
+        if current and scaler_path and os.path.exists(scaler_path):
+            current = meta.get('scaler_sha256') == file_digest(scaler_path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return portable if current else None
+
+
+def _pack(model, feature_names=None, scaler=None, source_path=None, scaler_path=None):
+    """(meta, dict array) untuk ``export()`` / ``from_model()``."""
+    estimators = getattr(model, 'estimators_', None) or [model]
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError('model multi-output tidak didukung')
+    if feature_names is None:
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None and scaler is not None:
+            names = getattr(scaler, 'feature_names_in_', None)
+        feature_names = [str(n) for n in names] if names is not None else None
+
+    arrays = {k: [] for k in ('children_left', 'children_right', 'feature', 'threshold', 'value')}
+    offsets = [0]
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        value = np.asarray(tree.value, dtype=np.float64)[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        arrays['value'].append(value / np.where(totals == 0, 1, totals))
+        arrays['children_left'].append(tree.children_left)
+        arrays['children_right'].append(tree.children_right)
+        arrays['feature'].append(tree.feature)
+        arrays['threshold'].append(tree.threshold)
+        offsets.append(offsets[-1] + tree.node_count)
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    meta = {
+        'format': FORMAT,
+        'version': VERSION,
+        'classes': np.asarray(model.classes_).tolist(),
+        'feature_names': feature_names,
+        'n_features': int(model.n_features_in_),
+        'n_trees': len(estimators),
+        'max_depth': max_depth,
+        'source': f'{type(model).__module__}.{type(model).__name__}',
+        'source_sha256': file_digest(source_path) if source_path else None,
+        'scaler_sha256': file_digest(scaler_path) if scaler is not None and scaler_path else None,
+    }
+    data = {
+        'tree_offset': np.asarray(offsets, dtype=np.int64),
+        'children_left': np.concatenate(arrays['children_left']).astype(np.int32),
+        'children_right': np.concatenate(arrays['children_right']).astype(np.int32),
+        'feature': np.concatenate(arrays['feature']).astype(np.int32),
+        'threshold': np.concatenate(arrays['threshold']).astype(np.float64),
+        'value': np.concatenate(arrays['value']).astype(np.float32),
+    }
+    if scaler is not None:
+        data['input_weight'], data['input_bias'] = affine(scaler, meta['n_features'])
+        if data['input_weight'] is None:
+            raise ValueError(f'scaler {type(scaler).__name__} tidak bisa dilipat (bukan affine)')
+    return meta, data
+
+
+def export(model, path, feature_names=None, scaler=None, source_path=None, scaler_path=None):
+    """
+    Simpan RandomForestClassifier / DecisionTreeClassifier terlatih ke ``path``.
+
+    ``feature_names`` default ``model.feature_names_in_`` (atau milik
+    scaler). ``scaler`` (opsional) dilipat menjadi ``input_weight`` /
+    ``input_bias``. ``source_path`` / ``scaler_path``: file asal model dan
+    scaler, dicatat hash-nya untuk ``choose()``. Return dict ``meta``.
+    """
+    meta, data = _pack(model, feature_names, scaler, source_path, scaler_path)
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **data)
+    return meta
+
+
+def from_model(model, feature_names=None, scaler=None):
+    """``ForestModel`` langsung dari model terlatih (tanpa file), mis. untuk mengukur latensi."""
+    return ForestModel(*_pack(model, feature_names, scaler))
+
+
+class ForestModel:
+    """
+    Runtime NumPy untuk file ``export()``. Antarmuka mengikuti classifier
+    scikit-learn: ``classes_``, ``feature_names_in_``, ``n_features_in_``,
+    ``predict_proba``, ``predict``.
+    """
+
+    def __init__(self, meta, arrays):
+        if meta.get('format') != FORMAT or meta.get('version', 0) > VERSION:
+            raise ValueError(f"format model tidak dikenal: {meta.get('format')} v{meta.get('version')}")
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_features_in_ = meta['n_features']
+        if meta.get('feature_names'):
+            self.feature_names_in_ = np.asarray(meta['feature_names'], dtype=object)
+        self.input_weight = arrays.get('input_weight')
+        self.input_bias = arrays.get('input_bias')
+
+        offsets = arrays['tree_offset']
+        starts = np.repeat(offsets[:-1], np.diff(offsets)).astype(np.int64)
+        left = arrays['children_left'].astype(np.int64)
+        right = arrays['children_right'].astype(np.int64)
+        leaf = left < 0
+        node = np.arange(len(left), dtype=np.int64)
+        # Indeks anak global; daun menunjuk dirinya sendiri supaya traversal
+        # semua pohon bisa berjalan serempak sebanyak max_depth langkah
+        self.left = np.where(leaf, node, left + starts)
+        self.right = np.where(leaf, node, right + starts)
+        self.feature = np.where(leaf, 0, arrays['feature']).astype(np.int64)
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = offsets[:-1].astype(np.int64)
+        self.max_depth = meta['max_depth']
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f'butuh {self.n_features_in_} fitur, dapat {X.shape[1]}')
+        if self.input_weight is not None:
+            X = X * self.input_weight + self.input_bias
+        # Sama dengan scikit-learn: input dibandingkan sebagai float32
+        return X.astype(np.float32)
+
+    def apply(self, X):
+        """Indeks daun global, shape (n_trees, n_samples)."""
+        X = self._prepare(X)
+        rows = np.arange(len(X))
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=0, dtype=np.float64)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load(path):
+    """Muat file ``export()`` menjadi ``ForestModel`` (tanpa pickle)."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    return ForestModel(meta, arrays)
+
+
+def main(argv=None):
+    import argparse
+
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Export model scikit-learn (pickle/joblib) ke format portabel .npz')
+    parser.add_argument('model', help='file model .pkl / .joblib')
+    parser.add_argument('output', nargs='?', help='file .npz tujuan (default di samping model)')
+    parser.add_argument('--scaler', help='scaler (.pkl / .joblib) yang dilipat ke model')
+    args = parser.parse_args(argv)
+
+    output = args.output or sibling(args.model)
+    model = joblib.load(args.model)
+    scaler = joblib.load(args.scaler) if args.scaler else None
+    meta = export(model, output, scaler=scaler, source_path=args.model, scaler_path=args.scaler)
+    print(f"✅ {args.model} -> {output} ({meta['n_trees']} pohon, kelas {meta['classes']})")
+
+
+if __name__ == '__main__':
+    main()
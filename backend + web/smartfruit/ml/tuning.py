@@ -0,0 +1,236 @@
+"""
+Hyperparameter search RandomForest dengan cross-validation paralel.
+
+``search(X, y)`` mengevaluasi setiap kombinasi ``grid`` pada ``n_splits``
+fold (StratifiedKFold jika setiap kelas cukup anggota, selain itu KFold).
+Setiap pasangan (kombinasi, fold) adalah satu task di ``ProcessPoolExecutor``
+(default semua core, ``n_jobs=1`` per model supaya core tidak
+diperebutkan).
+
+Hasil per fold disimpan sebagai JSON di ``cache_dir/<hash dataset>/``,
+dengan key hash dari parameter, skema CV dan versi scikit-learn. Menjalankan
+ulang dengan dataset yang sama hanya melatih kombinasi/fold yang belum ada;
+dataset yang berubah (hash berbeda) otomatis dihitung ulang.
+
+Setiap fold mencatat akurasi, waktu fit, jumlah node dan latensi prediksi
+satu baris (median ``LATENCY_REPEAT`` panggilan) untuk runtime portabel
+(``portable_forest``, yang dipakai server) dan scikit-learn. Latensi diukur
+di worker, jadi dengan banyak worker angkanya relatif; pakai ``jobs=1`` untuk
+angka absolut. ``pareto()`` / ``select()`` membantu memilih model yang lebih
+cepat dengan akurasi yang masih bisa diterima.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from . import portable_forest
+except ImportError:  # diimport sebagai modul top-level (ml/ di sys.path)
+    import portable_forest
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get(
+    'ML_TUNING_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tuning_cache'))
+PARAM_GRID = {
+    'n_estimators': [10, 25, 50, 100],
+    'max_depth': [None, 4, 8],
+    'min_samples_leaf': [1, 3],
+}
+LATENCY_REPEAT = 200
+
+
+def expand(grid):
+    """List dict parameter (semua kombinasi ``grid``, urutan stabil)."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def dataset_hash(X, y):
+    """SHA-256 isi dataset (nilai float32 + label), tidak bergantung nama file."""
+    digest = hashlib.sha256()
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    digest.update(str(X.shape).encode())
+    digest.update(X.tobytes())
+    digest.update('\0'.join(map(str, y)).encode())
+    return digest.hexdigest()
+
+
+def _key(params, fold, cv):
+    import sklearn
+
+    payload = json.dumps({'params': params, 'fold': fold, 'cv': cv, 'sklearn': sklearn.__version__},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, result):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp, path)
+
+
+def _latency(predict, row, repeat=None):
+    """Median detik per panggilan ``predict(row)`` (``repeat`` default ``LATENCY_REPEAT``)."""
+    repeat = repeat or LATENCY_REPEAT
+    predict(row)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _evaluate(X, y, params, train, test, seed):
+    """Latih satu fold (dijalankan di worker); return dict metrik."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+    forest = portable_forest.from_model(model)
+    row = X[test[:1]]
+    return {
+        'params': params,
+        'accuracy': float(np.mean(forest.predict(X[test]) == y[test])),
+        'fit_seconds': fit_seconds,
+        'latency_us': _latency(forest.predict_proba, row) * 1e6,
+        'sklearn_latency_us': _latency(model.predict_proba, row, repeat=max(1, LATENCY_REPEAT // 10)) * 1e6,
+        'n_nodes': int(sum(e.tree_.node_count for e in model.estimators_)),
+    }
+
+
+def _splits(y, n_splits, seed):
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    _, counts = np.unique(y, return_counts=True)
+    if counts.min() >= n_splits:
+        return 'stratified', StratifiedKFold(n_splits, shuffle=True, random_state=seed).split(np.zeros(len(y)), y)
+    return 'kfold', KFold(n_splits, shuffle=True, random_state=seed).split(np.zeros(len(y)))
+
+
+def search(X, y, grid=None, n_splits=5, jobs=None, cache_dir=CACHE_DIR, seed=42):
+    """
+    Cross-validation semua kombinasi ``grid`` (default ``PARAM_GRID``).
+
+    Returns:
+        dict ``dataset``, ``results`` (satu dict per kombinasi, urut akurasi
+        menurun: rata-rata/std akurasi, fit, latensi, node) dan ``stats``
+        (jumlah fold yang dilatih vs diambil dari cache).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y).astype(str)
+    n_splits = max(2, min(n_splits, len(y)))
+    combos = expand(grid or PARAM_GRID)
+    digest = dataset_hash(X, y)
+    scheme, folds = _splits(y, n_splits, seed)
+    folds = list(folds)
+    cv = {'scheme': scheme, 'n_splits': n_splits, 'seed': seed}
+    directory = os.path.join(cache_dir, digest[:16]) if cache_dir else None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    fold_results = {}
+    pending = []
+    for i, params in enumerate(combos):
+        for fold, (train, test) in enumerate(folds):
+            path = os.path.join(directory, _key(params, fold, cv) + '.json') if directory else None
+            cached = _read(path) if path else None
+            if cached is not None:
+                fold_results[i, fold] = cached
+            else:
+                pending.append((i, fold, path, train, test))
+
+    start = time.perf_counter()
+    if pending:
+        workers = jobs or os.cpu_count() or 1
+        logger.info("🔎 %d fold dilatih di %d proses (%d dari cache)",
+                    len(pending), workers, len(fold_results))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_evaluate, X, y, combos[i], train, test, seed): (i, fold, path)
+                for i, fold, path, train, test in pending
+            }
+            for future, (i, fold, path) in futures.items():
+                fold_results[i, fold] = result = future.result()
+                if path:
+                    _write(path, result)
+
+    results = []
+    for i, params in enumerate(combos):
+        runs = [fold_results[i, fold] for fold in range(len(folds))]
+        accuracy = [r['accuracy'] for r in runs]
+        results.append({
+            'params': params,
+            'accuracy': float(np.mean(accuracy)),
+            'accuracy_std': float(np.std(accuracy)),
+            'fit_seconds': float(np.mean([r['fit_seconds'] for r in runs])),
+            'latency_us': float(np.median([r['latency_us'] for r in runs])),
+            'sklearn_latency_us': float(np.median([r['sklearn_latency_us'] for r in runs])),
+            'n_nodes': int(np.mean([r['n_nodes'] for r in runs])),
+        })
+    results.sort(key=lambda r: (-r['accuracy'], r['latency_us']))
+    return {
+        'dataset': {'sha256': digest, 'rows': len(y), 'classes': sorted(set(y)), 'cv': cv},
+        'results': results,
+        'stats': {'trained': len(pending), 'cached': len(combos) * len(folds) - len(pending),
+                  'seconds': time.perf_counter() - start},
+    }
+
+
+def pareto(results):
+    """Kombinasi yang tidak kalah di akurasi dan latensi sekaligus, urut latensi naik."""
+    front = []
+    for r in sorted(results, key=lambda r: (r['latency_us'], -r['accuracy'])):
+        if not front or r['accuracy'] > front[-1]['accuracy']:
+            front.append(r)
+    return front
+
+
+def select(results, tolerance=0.01):
+    """Kombinasi tercepat dengan akurasi >= akurasi terbaik - ``tolerance``."""
+    best = max(r['accuracy'] for r in results)
+    return min((r for r in results if r['accuracy'] >= best - tolerance), key=lambda r: r['latency_us'])
+
+
+def report(result, tolerance=0.01, limit=None):
+    """Tabel teks: akurasi vs latensi, tanda ``*`` = pareto, ``>`` = pilihan ``select``."""
+    results = result['results'][:limit] if limit else result['results']
+    front = {id(r) for r in pareto(result['results'])}
+    chosen = select(result['results'], tolerance)
+    lines = [
+        f"{'':2}{'params':<52} {'akurasi':>14} {'latensi':>11} {'sklearn':>11} {'fit':>8} {'node':>7}",
+    ]
+    for r in results:
+        mark = ('>' if r is chosen else ' ') + ('*' if id(r) in front else ' ')
+        params = ', '.join(f'{k}={v}' for k, v in r['params'].items())
+        lines.append(
+            f"{mark}{params:<52} {r['accuracy']:>7.2%} ±{r['accuracy_std']:>5.1%} "
+            f"{r['latency_us']:>8.0f} us {r['sklearn_latency_us']:>8.0f} us "
+            f"{r['fit_seconds'] * 1000:>5.0f} ms {r['n_nodes']:>7}"
+        )
+    stats = result['stats']
+    lines.append(
+        f"{result['dataset']['rows']} baris, {result['dataset']['cv']['n_splits']} fold "
+        f"({result['dataset']['cv']['scheme']}); {stats['trained']} fold dilatih, "
+        f"{stats['cached']} dari cache, {stats['seconds']:.1f} s"
+    )
+    lines.append(f"Pilihan (toleransi akurasi {tolerance:.1%}): {chosen['params']}")
+    return '\n'.join(lines)
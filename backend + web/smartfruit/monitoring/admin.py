@@ -5,9 +5,11 @@ from .models import ContactMessage
 
 @admin.register(SensorData)
 class SensorDataAdmin(admin.ModelAdmin):
-	list_display = ('timestamp', 'temperature', 'humidity', 'mq2', 'mq3', 'mq135', 'status')
-	list_filter = ('status',)
+	list_display = ('timestamp', 'device_id', 'temperature', 'humidity', 'mq2', 'mq3', 'mq135', 'status')
+	list_filter = ('status', 'device_id')
 	ordering = ('-timestamp',)
+	# Hindari COUNT(*) kedua atas seluruh tabel di setiap halaman changelist
+	show_full_result_count = False
 
 
 @admin.register(SensorConfig)
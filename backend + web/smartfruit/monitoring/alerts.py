@@ -0,0 +1,244 @@
+"""
+Alert engine per device.
+
+Status tiap reading (LAYAK / PERINGATAN / TIDAK LAYAK) tidak langsung
+memicu notifikasi. Engine menyimpan level alert per device dan hanya
+mengeluarkan *transisi*:
+
+- Hysteresis: untuk tetap di level yang sedang aktif, nilai cukup berada di
+  atas ``threshold - HYSTERESIS``; sensor yang bergetar di sekitar threshold
+  tidak membuat status bolak-balik.
+- Durasi minimum: level baru harus bertahan ``ALERT_MIN_OPEN_SECONDS``
+  (naik) atau ``ALERT_MIN_CLOSE_SECONDS`` (turun) sebelum transisi terjadi.
+
+State disimpan di memori dan dipersist ke model ``Setting``
+(key ``alert_state:<device>``) setiap kali terjadi transisi, sehingga
+restart server tidak membuka ulang alert yang masih aktif.
+"""
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .models import Setting
+from . import notifications
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ('LAYAK', 'PERINGATAN', 'TIDAK LAYAK')
+LAYAK, PERINGATAN, TIDAK_LAYAK = range(3)
+
+DANGER_THRESHOLDS = {'suhu': 35, 'kelembapan': 90, 'mq2': 200, 'mq3': 300, 'mq135': 150}
+WARNING_THRESHOLDS = {'suhu': 30, 'kelembapan': 80, 'mq2': 100, 'mq3': 150, 'mq135': 80}
+# Jarak turun dari threshold sebelum level yang sedang aktif dilepas
+HYSTERESIS = {'suhu': 1.0, 'kelembapan': 3.0, 'mq2': 10.0, 'mq3': 15.0, 'mq135': 8.0}
+
+# Level minimum yang dikirim sebagai push notification
+PUSH_LEVEL = TIDAK_LAYAK
+STATE_KEY = 'alert_state:{}'
+
+
+def classify(values, current=LAYAK):
+    """
+    Level untuk satu set nilai sensor ({'suhu', 'kelembapan', 'mq2', 'mq3', 'mq135'}).
+
+    Dengan ``current`` = LAYAK hasilnya sama dengan threshold biasa; untuk
+    level yang sudah aktif dipakai threshold dikurangi ``HYSTERESIS``.
+    """
+    for level, thresholds in ((TIDAK_LAYAK, DANGER_THRESHOLDS), (PERINGATAN, WARNING_THRESHOLDS)):
+        for key, limit in thresholds.items():
+            try:
+                value = float(values[key])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if level <= current:
+                limit -= HYSTERESIS[key]
+            if value >= limit:
+                return level
+    return LAYAK
+
+
+def classify_many(columns):
+    """
+    Versi vektor ``classify`` (tanpa hysteresis) untuk banyak reading sekaligus.
+
+    ``columns``: dict nama sensor -> array nilai (NaN diabaikan). Return array level.
+    """
+    size = len(next(iter(columns.values())))
+    levels = np.full(size, LAYAK, dtype=np.int8)
+    for level, thresholds in ((PERINGATAN, WARNING_THRESHOLDS), (TIDAK_LAYAK, DANGER_THRESHOLDS)):
+        hit = np.zeros(size, dtype=bool)
+        for key, limit in thresholds.items():
+            if key in columns:
+                hit |= np.asarray(columns[key], dtype=float) >= limit
+        levels[hit] = level
+    return levels
+
+
+def level_of(status):
+    """Index level dari string status, atau None jika tidak dikenal."""
+    return LEVELS.index(status) if status in LEVELS else None
+
+
+def values_of(reading):
+    """Nilai sensor SensorData dalam nama yang dipakai ``classify``."""
+    return {'suhu': reading.temperature, 'kelembapan': reading.humidity,
+            'mq2': reading.mq2, 'mq3': reading.mq3, 'mq135': reading.mq135}
+
+
+class AlertState:
+    def __init__(self, level=LAYAK, since=None, pending=None, pending_since=None):
+        self.level = level
+        self.since = since
+        self.pending = pending
+        self.pending_since = pending_since
+
+    def to_dict(self):
+        return {'level': self.level, 'since': self.since}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(level=int(data.get('level', LAYAK)), since=data.get('since'))
+
+
+class AlertEngine:
+    def __init__(self, min_open=None, min_close=None, persist=True):
+        self.min_open = min_open if min_open is not None else getattr(settings, 'ALERT_MIN_OPEN_SECONDS', 10)
+        self.min_close = min_close if min_close is not None else getattr(settings, 'ALERT_MIN_CLOSE_SECONDS', 30)
+        self.persist = persist
+        self._states = {}
+        self._lock = threading.Lock()
+
+    # -- persistence ------------------------------------------------
+    def _load(self, device_id):
+        if self.persist:
+            raw = Setting.objects.filter(key=STATE_KEY.format(device_id)).values_list('value', flat=True).first()
+            if raw:
+                try:
+                    return AlertState.from_dict(json.loads(raw))
+                except (ValueError, TypeError):
+                    pass
+        return AlertState()
+
+    def _save(self, device_id, state):
+        if self.persist:
+            Setting.objects.update_or_create(
+                key=STATE_KEY.format(device_id), defaults={'value': json.dumps(state.to_dict())})
+
+    def state(self, device_id):
+        with self._lock:
+            if device_id not in self._states:
+                self._states[device_id] = self._load(device_id)
+            return self._states[device_id]
+
+    # -- evaluation -------------------------------------------------
+    def evaluate(self, device_id, values=None, status=None, now=None):
+        """
+        Masukkan satu reading. Return dict transisi
+        ``{'device_id', 'kind': 'open'|'change'|'close', 'level', 'previous', 'status', 'at'}``
+        atau None jika level tidak berubah.
+        """
+        now = now if now is not None else time.time()
+        state = self.state(device_id)
+        with self._lock:
+            # Reading terlambat (lebih tua dari transisi / kandidat terakhir) tidak mengubah state
+            if any(t is not None and now < t for t in (state.since, state.pending_since)):
+                return None
+            current = state.level
+            # Nilai sensor diklasifikasi dengan hysteresis terhadap level aktif;
+            # status (mis. prediksi model) tetap berlaku: diambil yang paling parah
+            target = classify(values or {}, current)
+            predicted = level_of(status)
+            if predicted is not None:
+                target = max(target, predicted)
+
+            if target == current:
+                state.pending = state.pending_since = None
+                return None
+
+            rising = target > current
+            if state.pending is None or (state.pending > current) != rising:
+                state.pending, state.pending_since = target, now
+            elif rising:
+                # Naik: pakai level paling ringan yang terlihat selama masa tunggu
+                state.pending = min(state.pending, target)
+            else:
+                state.pending = max(state.pending, target)
+
+            hold = self.min_open if rising else self.min_close
+            if now - state.pending_since < hold:
+                return None
+
+            previous, state.level = current, state.pending
+            state.since = now
+            state.pending = state.pending_since = None
+
+        self._save(device_id, state)
+        if previous == LAYAK:
+            kind = 'open'
+        elif state.level == LAYAK:
+            kind = 'close'
+        else:
+            kind = 'change'
+        return {
+            'device_id': device_id,
+            'kind': kind,
+            'level': state.level,
+            'previous': previous,
+            'status': LEVELS[state.level],
+            'at': now,
+        }
+
+
+def emit(transition, values=None):
+    """Kirim transisi ke WebSocket dan (untuk level PUSH_LEVEL) ke push notification."""
+    device_id = transition['device_id']
+    level, previous = transition['level'], transition['previous']
+    if level >= PUSH_LEVEL > previous:
+        detail = ''
+        if values:
+            detail = f" Suhu: {values.get('suhu')}°C, Kelembapan: {values.get('kelembapan')}%"
+        notifications.notify(
+            "Peringatan Kualitas Buah",
+            f"Status buah {transition['status']} pada {device_id}!{detail}",
+            device_id=device_id, condition=f"open:{level}",
+            data={'device_id': device_id, 'status': transition['status']},
+        )
+    elif previous >= PUSH_LEVEL > level:
+        notifications.notify(
+            "Kualitas Buah Pulih",
+            f"Status buah pada {device_id} kembali {transition['status']}.",
+            device_id=device_id, condition="close",
+            data={'device_id': device_id, 'status': transition['status']},
+        )
+
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            "sensor_data", {"type": "send_alert", "data": transition})
+    except Exception as e:
+        logger.error("Gagal broadcast alert: %s", e)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
+
+
+def process(device_id, values=None, status=None, now=None):
+    """Evaluasi satu reading dan kirim transisi (jika ada). Return transisi atau None."""
+    transition = get_engine().evaluate(device_id, values=values, status=status, now=now)
+    if transition:
+        emit(transition, values)
+    return transition
@@ -0,0 +1,297 @@
+"""
+Ingest banyak reading dalam satu request (``POST /api/sensor/batch/``).
+
+Body yang diterima:
+
+- JSON array: ``[{...}, {...}]``
+- JSON objek dengan device & jam kirim bersama:
+  ``{"device_id": "esp32-01", "sent_at": 1735732800, "readings": [...]}``
+- NDJSON (``Content-Type: application/x-ndjson``): satu objek JSON per baris
+
+Field per reading: ``suhu``/``temperature`` dan ``kelembapan``/``humidity``
+(wajib), ``mq2``, ``mq3``, ``mq135``, ``skorTotal`` (opsional, default 0),
+``device_id`` (opsional) dan waktu ukur di ``ts`` (epoch detik atau
+milidetik) atau ``timestamp`` (ISO 8601). ``sent_at`` (body atau header
+``X-Sent-At``) dipakai mengoreksi jam device, lihat monitoring/clock.py.
+Reading tanpa waktu memakai waktu terima, diberi jarak 1 µs sesuai urutan
+supaya tidak dianggap duplikat satu sama lain.
+
+Validasi dikerjakan per kolom (pandas/numpy), bukan per reading. Reading
+yang valid ditulis dengan satu write InfluxDB dan satu bulk insert
+SensorData; response berisi hasil per item.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+from influxdb_client import Point, WritePrecision
+
+from .models import SensorData
+from . import alerts, clock, devices, influx_client, instrumentation, payloads, storage
+
+logger = logging.getLogger(__name__)
+
+# (nama field, alias lama)
+FIELDS = (
+    ('suhu', 'temperature'),
+    ('kelembapan', 'humidity'),
+    ('mq2', None),
+    ('mq3', None),
+    ('mq135', None),
+    ('skorTotal', None),
+)
+REQUIRED = ('suhu', 'kelembapan')
+RANGES = {
+    'suhu': (-40, 125),
+    'kelembapan': (0, 100),
+    'mq2': (0, 100000),
+    'mq3': (0, 100000),
+    'mq135': (0, 100000),
+    'skorTotal': (-1000, 1000),
+}
+NDJSON_TYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines'}
+
+
+class BatchError(ValueError):
+    """Body batch tidak bisa dipakai sama sekali (bukan error per item)."""
+
+
+def parse_body(body, content_type=None):
+    """
+    Return (items, envelope). ``envelope`` berisi ``device_id`` / ``sent_at``
+    bersama jika body berupa objek. Baris NDJSON yang rusak menjadi
+    ``PayloadError`` di posisinya supaya dilaporkan per item.
+    """
+    media = (content_type or '').split(';', 1)[0].strip().lower()
+    if media in NDJSON_TYPES:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(payloads.decode(line, payloads.JSON))
+            except payloads.PayloadError as e:
+                items.append(e)
+        return items, {}
+
+    try:
+        data = payloads.loads_json(body)
+    except payloads.PayloadError as e:
+        raise BatchError(str(e))
+    if isinstance(data, list):
+        return data, {}
+    if isinstance(data, dict) and isinstance(data.get('readings'), list):
+        return data['readings'], {
+            'device_id': data.get('device_id') or data.get('device'),
+            'sent_at': data.get('sent_at'),
+        }
+    raise BatchError("Body harus berupa array reading atau objek {'readings': [...]}")
+
+
+def _column(df, name, alias=None):
+    import pandas as pd
+
+    col = df[name] if name in df else pd.Series(np.nan, index=df.index, dtype=object)
+    if alias and alias in df:
+        col = col.where(col.notna(), df[alias])
+    return col
+
+
+def _timestamps(df, received_at, errors, offset=None):
+    """
+    Waktu ukur per reading (epoch detik, numpy) dari kolom ts / timestamp,
+    dikoreksi ``offset`` jam device; default waktu terima.
+    """
+    import pandas as pd
+
+    now = received_at.timestamp()
+    n = len(df)
+    times = now - (n - 1 - np.arange(n)) * 1e-6
+    from_device = np.zeros(n, dtype=bool)
+    if 'ts' in df:
+        raw = df['ts']
+        epoch = pd.to_numeric(raw, errors='coerce')
+        for i in np.flatnonzero((raw.notna() & epoch.isna()).to_numpy()):
+            errors[i].append('ts bukan angka epoch')
+        epoch = epoch.where(epoch < clock.EPOCH_MS_THRESHOLD, epoch / 1000).to_numpy(dtype=float)
+        valid = epoch > 0
+        times[valid] = epoch[valid]
+        from_device |= valid
+    if 'timestamp' in df:
+        raw = df['timestamp']
+        use = raw.notna()
+        if 'ts' in df:
+            use &= df['ts'].isna()
+        parsed = pd.to_datetime(raw.where(use), utc=True, errors='coerce', format='ISO8601')
+        for i in np.flatnonzero((use & parsed.isna()).to_numpy()):
+            errors[i].append('timestamp bukan ISO 8601')
+        seconds = (parsed - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy(dtype=float)
+        ok = use.to_numpy() & ~np.isnan(seconds)
+        times[ok] = seconds[ok]
+        from_device |= ok
+
+    tolerance = getattr(settings, 'SENSOR_CLOCK_TOLERANCE', clock.DEFAULT_TOLERANCE)
+    if offset is not None and abs(offset) > tolerance:
+        times[from_device] += offset
+
+    max_skew = getattr(settings, 'SENSOR_MAX_CLOCK_SKEW', 300)
+    for i in np.flatnonzero(times > now + max_skew):
+        errors[i].append('timestamp di masa depan')
+    # Sedikit di depan jam server (dalam toleransi skew): pakai waktu terima
+    times[(times > now) & (times <= now + max_skew)] = now
+    return times
+
+
+def validate(items, received_at, offset=None):
+    """
+    Validasi semua item sekaligus.
+
+    Returns:
+        (values, times, errors): dict kolom float (numpy), array epoch detik, dan
+        list error per item (list kosong = valid).
+    """
+    # pandas diimport saat dipakai supaya start worker tidak membayar biayanya
+    import pandas as pd
+
+    errors = [[] for _ in items]
+    rows = []
+    for i, item in enumerate(items):
+        if isinstance(item, Exception):
+            errors[i].append(str(item))
+            rows.append({})
+        elif not isinstance(item, dict):
+            errors[i].append('reading harus berupa objek')
+            rows.append({})
+        else:
+            rows.append(item)
+    df = pd.DataFrame.from_records(rows, index=range(len(rows)))
+
+    values = {}
+    for name, alias in FIELDS:
+        raw = _column(df, name, alias)
+        num = pd.to_numeric(raw, errors='coerce')
+        lo, hi = RANGES[name]
+        problems = (
+            (raw.notna() & num.isna(), f'{name} bukan angka'),
+            (num.notna() & ((num < lo) | (num > hi)), f'{name} di luar rentang {lo}..{hi}'),
+        )
+        if name in REQUIRED:
+            problems += ((raw.isna(), f'{name} wajib diisi'),)
+        for mask, message in problems:
+            for i in np.flatnonzero(mask.to_numpy()):
+                errors[i].append(message)
+        values[name] = num.astype(float).fillna(0.0).to_numpy()
+
+    times = _timestamps(df, received_at, errors, offset)
+    return values, times, errors
+
+
+def ingest(items, default_device=None, sent_at=None, request=None, received_at=None):
+    """
+    Validasi lalu simpan reading yang valid.
+
+    Returns:
+        dict: ``{'accepted', 'rejected', 'duplicates', 'influx', 'results': [{'index', 'status', ...}]}``
+        dengan status per item ``ok``, ``duplicate`` (sudah tersimpan) atau ``error``.
+    """
+    received_at = received_at or timezone.now()
+    max_items = getattr(settings, 'SENSOR_BATCH_MAX_ITEMS', 5000)
+    if not items:
+        raise BatchError("Batch kosong")
+    if len(items) > max_items:
+        raise BatchError(f"Batch maksimal {max_items} reading")
+
+    fallback_device = devices.clean_device_id(default_device) or devices.resolve_device_id(None, request)
+    sent_epoch = clock.parse_epoch(sent_at)
+    if sent_epoch is not None:
+        offset = received_at.timestamp() - sent_epoch
+    else:
+        offset = devices.clock_offset(fallback_device)
+    with instrumentation.span('validate'):
+        values, times, errors = validate(items, received_at, offset)
+        levels = alerts.classify_many(values)
+
+    readings, points, results = [], [], []
+    for i, item in enumerate(items):
+        if errors[i]:
+            results.append({'index': i, 'status': 'error', 'errors': errors[i]})
+            continue
+        device_id = fallback_device
+        if isinstance(item, dict):
+            device_id = (devices.clean_device_id(item.get('device_id') or item.get('device'))
+                         or fallback_device)
+        ts = datetime.fromtimestamp(times[i], tz=dt_timezone.utc)
+        readings.append(SensorData(
+            timestamp=ts,
+            temperature=values['suhu'][i],
+            humidity=values['kelembapan'][i],
+            mq2=values['mq2'][i],
+            mq3=values['mq3'][i],
+            mq135=values['mq135'][i],
+            status=alerts.LEVELS[levels[i]],
+            device_id=device_id,
+        ))
+        point = Point(influx_client.WRITE_MEASUREMENT).tag(devices.DEVICE_TAG, device_id)
+        for name, _ in FIELDS:
+            point.field(name, float(values[name][i]))
+        if isinstance(item, dict) and item.get('status') is not None:
+            try:
+                point.field('status', int(item['status']))
+            except (TypeError, ValueError):
+                pass
+        points.append(point.time(ts, WritePrecision.NS))
+        results.append({'index': i, 'status': 'ok', 'device_id': device_id, 'timestamp': ts.isoformat()})
+
+    # Point dengan device & waktu sama menimpa point lama, jadi kiriman ulang aman untuk Influx
+    with instrumentation.span('influx'):
+        influx_ok = influx_client.write_points(points)
+    duplicates = 0
+    if readings:
+        with instrumentation.span('db'):
+            saved = storage.save_readings(readings)
+        saved_ids = {id(r) for r in saved}
+        ok_results = [r for r in results if r['status'] == 'ok']
+        for reading, result in zip(readings, ok_results):
+            if id(reading) not in saved_ids:
+                result['status'] = 'duplicate'
+                duplicates += 1
+        if saved:
+            with instrumentation.span('publish'):
+                _publish(saved)
+
+    return {
+        'accepted': len(readings) - duplicates,
+        'rejected': len(items) - len(readings),
+        'duplicates': duplicates,
+        'influx': influx_ok,
+        'results': results,
+    }
+
+
+def _publish(readings):
+    """Alert (urut waktu), cache terbaru per device dan satu broadcast WebSocket."""
+    latest = {}
+    for reading in sorted(readings, key=lambda r: r.timestamp):
+        alerts.process(reading.device_id, values=alerts.values_of(reading), status=reading.status,
+                       now=reading.timestamp.timestamp())
+        latest[reading.device_id] = reading
+
+    broadcast = []
+    for device_id, reading in latest.items():
+        data = {
+            'device_id': device_id,
+            'suhu': reading.temperature, 'kelembapan': reading.humidity,
+            'mq2': reading.mq2, 'mq3': reading.mq3, 'mq135': reading.mq135,
+            'status': reading.status, 'timestamp': reading.timestamp.isoformat(),
+        }
+        devices.cache_latest(device_id, data, ts=reading.timestamp.timestamp())
+        broadcast.append(data)
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            "sensor_data", {"type": "send_sensor_batch", "data": broadcast})
+    except Exception as e:
+        logger.error("Gagal broadcast batch: %s", e)
@@ -0,0 +1,288 @@
+"""
+Benchmark jalur panas + perbandingan dengan baseline.
+
+Dijalankan lewat ``python manage.py benchmark`` (lihat
+management/commands/benchmark.py). Tiap benchmark adalah fungsi
+``setup(stack)`` yang mengembalikan callable tanpa argumen (``stack``:
+ExitStack untuk patch / server yang ditutup setelah diukur); callable itu diukur
+berulang (``measure``) dan median-nya dibandingkan dengan baseline JSON.
+Benchmark yang butuh database dijalankan di database test sementara oleh
+command, jadi data asli tidak tersentuh.
+"""
+import itertools
+import json
+import os
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from .fake_influx import FakeInflux
+
+REGISTRY = {}
+
+
+def benchmark(name, db=False):
+    """Daftarkan ``setup()`` sebagai benchmark ``name``."""
+    def register(setup):
+        REGISTRY[name] = {'setup': setup, 'db': db}
+        return setup
+    return register
+
+
+def measure(fn, rounds=None, min_time=0.2, max_rounds=10000, warmup=3):
+    """
+    Jalankan ``fn`` berulang; return statistik detik per panggilan.
+
+    Tanpa ``rounds``: ulang sampai total ``min_time`` detik (maks ``max_rounds``).
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    started = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+        if rounds is not None:
+            if len(timings) >= rounds:
+                break
+        elif time.perf_counter() - started >= min_time or len(timings) >= max_rounds:
+            break
+    ordered = sorted(timings)
+    return {
+        'rounds': len(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        'ops_per_s': len(ordered) / sum(ordered) if sum(ordered) else 0.0,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Bandingkan median dengan baseline.
+
+    Returns:
+        list dict ``{'name', 'median', 'baseline', 'change', 'regressed'}``;
+        benchmark tanpa baseline punya ``baseline`` None.
+    """
+    report = []
+    for name, stats in results.items():
+        base = (baseline.get(name) or {}).get('median')
+        change = (stats['median'] / base - 1) if base else None
+        report.append({
+            'name': name,
+            'median': stats['median'],
+            'baseline': base,
+            'change': change,
+            'regressed': change is not None and change > threshold,
+        })
+    return report
+
+
+def load_baseline(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('benchmarks', {})
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'created': datetime.now(dt_timezone.utc).isoformat(), 'benchmarks': results}, f, indent=2, sort_keys=True)
+
+
+def run(names=None, rounds=None, min_time=0.2, log=None):
+    """Jalankan benchmark terpilih (default semua); return {nama: statistik}."""
+    results = {}
+    for name in names or sorted(REGISTRY):
+        with ExitStack() as stack:
+            fn = REGISTRY[name]['setup'](stack)
+            results[name] = measure(fn, rounds=rounds, min_time=min_time)
+        if log:
+            log(f"{name:<32} median {results[name]['median'] * 1e6:>10.1f} µs  "
+                f"p95 {results[name]['p95'] * 1e6:>10.1f} µs  ({results[name]['rounds']} rounds)")
+    return results
+
+
+# ----------------------------------------------------------
+# Data contoh
+# ----------------------------------------------------------
+SAMPLE = {'suhu': 27.5, 'kelembapan': 70.0, 'mq2': 180.0, 'mq3': 1480.0, 'mq135': 590.0}
+
+
+def samples(count=256, seed=0):
+    """Variasi SAMPLE (±5%) supaya state adaptif AI agent tidak degenerate."""
+    import random
+
+    rng = random.Random(seed)
+    return [{k: v * rng.uniform(0.95, 1.05) for k, v in SAMPLE.items()} for _ in range(count)]
+FLUX_FIELDS = ('suhu', 'kelembapan', 'mq2', 'mq3', 'mq135', 'status', 'skorTotal')
+
+
+def fake_flux_tables(points=50, start=None):
+    """Hasil query Flux (tanpa pivot) seperti dari InfluxDB: satu tabel per field."""
+    from influxdb_client.client.flux_table import FluxRecord, FluxTable
+
+    start = start or datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    tables = []
+    for field in FLUX_FIELDS:
+        table = FluxTable()
+        for i in range(points):
+            table.records.append(FluxRecord(table, {
+                '_time': start - timedelta(seconds=i * 5),
+                '_field': field,
+                '_value': 1 if field == 'status' else float(i),
+                '_measurement': 'monitoring',
+            }))
+        tables.append(table)
+    return tables
+
+
+def import_profile(code, cwd=None, python=None):
+    """
+    Profil import ``code`` di proses baru dengan ``python -X importtime``.
+
+    Returns:
+        {modul: detik kumulatif}; modul yang diimport lebih dari sekali memakai
+        entri pertama (yang benar-benar memuat).
+    """
+    import subprocess
+    import sys
+
+    proc = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=cwd, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        profile.setdefault(name.strip(), int(cumulative) / 1e6)
+    return profile
+
+
+def seed_influx(store, bucket, points=200, device='bench', measurement='monitoring'):
+    """Isi ``InfluxStore`` dengan ``points`` reading terbaru (interval 5 detik)."""
+    now = time.time_ns()
+    lines = []
+    for i, sample in enumerate(samples(points)):
+        fields = ','.join(f'{k}={v}' for k, v in sample.items())
+        lines.append(f'{measurement},device={device} {fields},status={i % 3}i {now - i * 5_000_000_000}')
+    store.write(bucket, '\n'.join(lines))
+
+
+# ----------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------
+@benchmark('ai_agent.analyze_realtime')
+def bench_ai_agent(stack):
+    from . import ml_runtime
+
+    agent = ml_runtime.ai_agent().SensorAIAgent()
+    inputs = itertools.cycle(samples())
+    return lambda: agent.analyze_realtime(**next(inputs))
+
+
+@benchmark('ml.predict_status')
+def bench_ml_predict(stack):
+    """Prediksi forest penuh (cache dimatikan)."""
+    from . import ml_runtime
+
+    module = ml_runtime.ml_service()
+    service = module.MLService()
+    service.cache = module.PredictionCache(maxsize=0)
+    return lambda: service.predict_status(SAMPLE['mq2'], SAMPLE['mq3'], SAMPLE['mq135'],
+                                          SAMPLE['kelembapan'], SAMPLE['suhu'])
+
+
+@benchmark('ml.predict_status_cached')
+def bench_ml_predict_cached(stack):
+    """Kondisi sensor berulang: lookup cache prediksi."""
+    from . import ml_runtime
+
+    service = ml_runtime.ml_service().MLService()
+    return lambda: service.predict_status(SAMPLE['mq2'], SAMPLE['mq3'], SAMPLE['mq135'],
+                                          SAMPLE['kelembapan'], SAMPLE['suhu'])
+
+
+@benchmark('inference.predict_quality')
+def bench_quality_pipeline(stack):
+    """Satu reading lewat QualityPipeline (scaler affine + satu predict_proba)."""
+    from . import inference
+
+    pipeline = inference.get_pipeline()
+    X = pipeline.matrix([SAMPLE])
+    return lambda: pipeline.predict(X)
+
+
+@benchmark('views.calculate_overall_status')
+def bench_overall_status(stack):
+    from .views import calculate_overall_status
+
+    return lambda: calculate_overall_status(**SAMPLE)
+
+
+@benchmark('helpers.check_status')
+def bench_check_status(stack):
+    from helpers.status_checker import check_status
+
+    return lambda: check_status(SAMPLE)
+
+
+@benchmark('influx.get_history_data')
+def bench_history_regroup(stack):
+    """Regroup per timestamp di get_history_data dengan hasil Flux tiruan (tanpa jaringan)."""
+    from . import influx_client
+
+    tables = fake_flux_tables(points=200)
+    client = mock.MagicMock()
+    client.__enter__.return_value.query_api.return_value.query.return_value = tables
+    stack.enter_context(mock.patch('influxdb_client.InfluxDBClient', return_value=client))
+    return lambda: influx_client.get_history_data(limit=200)
+
+
+@benchmark('influx.query_latest')
+def bench_query_latest(stack):
+    """get_latest_data lewat influxdb-client asli ke InfluxDB tiruan lokal (HTTP + parse CSV)."""
+    from . import influx_client
+
+    server = stack.enter_context(FakeInflux())
+    seed_influx(server.store, influx_client.bucket)
+    stack.enter_context(mock.patch.object(influx_client, 'url', server.url))
+    return lambda: influx_client.get_latest_data(device='bench')
+
+
+@benchmark('export.iter_csv_5000_rows', db=True)
+def bench_export_csv(stack):
+    from . import export
+    from .models import SensorData
+
+    SensorData.objects.all().delete()
+    base = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    SensorData.objects.bulk_create([
+        SensorData(timestamp=base + timedelta(seconds=i), temperature=25, humidity=60,
+                   mq2=1, mq3=2, mq135=3, status='LAYAK', device_id='bench')
+        for i in range(5000)
+    ])
+    qs = SensorData.objects.order_by('-timestamp')
+    return lambda: sum(len(chunk) for chunk in export.iter_csv(qs))
+
+
+@benchmark('ingest.sensor_data', db=True)
+def bench_ingest_view(stack):
+    """POST /api/sensor/data/ lengkap (parse, write Influx, alert, broadcast) ke Influx lokal."""
+    from django.test import Client
+
+    server = stack.enter_context(FakeInflux())
+    stack.enter_context(mock.patch.dict(os.environ, {'INFLUX_URL': server.url}))
+    client = Client()
+    body = json.dumps({**SAMPLE, 'device_id': 'bench'})
+
+    def post():
+        response = client.post('/api/sensor/data/', body, content_type='application/json')
+        assert response.status_code == 200, response.content
+    return post
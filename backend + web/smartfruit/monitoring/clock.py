@@ -0,0 +1,89 @@
+"""
+Waktu ukur dari device dan koreksi selisih jam (clock skew).
+
+Device boleh mengirim:
+
+- ``ts`` (atau ``timestamp``): waktu pengukuran menurut jam device,
+  epoch detik / milidetik atau ISO 8601.
+- ``sent_at``: waktu pengiriman menurut jam device. Jika ada, selisih
+  ``waktu terima server - sent_at`` dianggap offset jam device dan
+  ditambahkan ke ``ts`` (reading backlog tetap berjarak benar walau jam
+  device meleset).
+
+Tanpa ``ts`` dipakai waktu terima server. Modul ini tanpa Django supaya
+juga dipakai ``mqtt_to_influx.py``.
+"""
+from datetime import datetime, timezone
+
+# Epoch di atas nilai ini dianggap milidetik
+EPOCH_MS_THRESHOLD = 1e11
+# Selisih di bawah ini dianggap latensi jaringan, bukan jam yang meleset (detik)
+DEFAULT_TOLERANCE = 2.0
+
+SOURCE_SERVER = 'server'        # tidak ada ts, pakai waktu terima
+SOURCE_DEVICE = 'device'        # ts device dipakai apa adanya
+SOURCE_CORRECTED = 'corrected'  # ts device + offset jam
+SOURCE_CLAMPED = 'clamped'      # ts (setelah koreksi) di masa depan, diganti waktu terima
+
+
+def parse_epoch(value):
+    """Epoch detik (float) dari angka (detik/ms) atau string ISO 8601; None jika tidak valid."""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            try:
+                dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+            except ValueError:
+                return None
+        else:
+            if number <= 0:
+                return None
+            return number / 1000 if number >= EPOCH_MS_THRESHOLD else number
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def measured_at(data):
+    """Waktu ukur mentah dari payload (epoch detik) atau None."""
+    for key in ('ts', 'timestamp', 'measured_at'):
+        value = parse_epoch(data.get(key))
+        if value is not None:
+            return value
+    return None
+
+
+def correct(ts, received, sent_at=None, offset=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Koreksi waktu ukur device terhadap jam server.
+
+    Args:
+        ts: waktu ukur device (epoch detik) atau None.
+        received: waktu terima server (epoch detik).
+        sent_at: waktu kirim menurut device; dipakai menghitung offset.
+        offset: offset jam device yang sudah diketahui (mis. dari pesan sebelumnya).
+
+    Returns:
+        (epoch detik, sumber, offset yang dipakai/terukur atau None)
+    """
+    if ts is None:
+        return received, SOURCE_SERVER, None
+    if sent_at is not None:
+        offset = received - sent_at
+    source = SOURCE_DEVICE
+    if offset is not None and abs(offset) > tolerance:
+        ts += offset
+        source = SOURCE_CORRECTED
+    # Pengukuran tidak mungkin setelah diterima
+    if ts > received + tolerance:
+        return received, SOURCE_CLAMPED, offset
+    return ts, source, offset
+
+
+def to_datetime(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
@@ -1,61 +1,283 @@
-import json
+"""
+MQTT consumer sisi Django.
+
+Dijalankan lewat ``python manage.py run_mqtt_consumer``. Thread jaringan paho
+hanya memasukkan pesan ke antrean terbatas tanpa menunggu (antrean penuh =
+pesan dibuang dan dihitung), jadi keepalive tidak pernah tertahan; satu
+thread writer mengambil pesan per batch, menyimpan dengan satu
+``bulk_create`` dan mengirim satu publish channel layer per batch ke group
+WebSocket ``sensor_data``. Seperti ``mqtt_to_influx.py``, client memakai
+manual ack: PUBACK QoS 1 dikirim setelah batch disimpan, jadi pesan yang
+masih di antrean saat proses mati dikirim ulang broker.
+
+Jika database gagal, batch dicoba ulang dengan backoff eksponensial
+(``MQTT_WRITE_RETRIES`` kali); batch yang tetap gagal ditulis ke dead-letter
+storage (baru setelah itu pesan di-ack) dan dihitung sebagai ``dropped`` di
+stats dan metrik ``smartfruit_mqtt_consumer_dropped_total``.
+"""
+import functools
+import logging
+import queue
+import threading
+import time
+
 import paho.mqtt.client as mqtt
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
 from .models import SensorData
+from .devices import reading_time, resolve_device_id
+from .storage import dead_letter, write_batch
+from . import alerts
+from . import instrumentation
+from . import payloads
 
-# MQTT broker configuration
+# MQTT broker configuration (default, bisa diganti di settings)
 BROKER_URL = "103.151.63.80"
 BROKER_PORT = 1883
-TOPIC = "annas/esp32/sensor"
+# Topic lama (satu device) dan topic per device: annas/esp32/<device_id>/sensor
+TOPICS = ["annas/esp32/sensor", "annas/esp32/+/sensor"]
+WS_GROUP = "sensor_data"
+# Label endpoint di histogram instrumentasi (/metrics)
+ENDPOINT = "mqtt_consumer"
+# Retry simpan batch saat database gagal: jeda WRITE_BACKOFF * 2^n detik
+WRITE_RETRIES = 3
+WRITE_BACKOFF = 0.5
+
+logger = logging.getLogger(__name__)
+
+# Pesan yang dibuang per alasan (semua consumer di proses ini)
+_dropped = {'queue_full': 0, 'db_error': 0}
+_dropped_lock = threading.Lock()
+
+
+def _count_dropped(reason, n):
+    with _dropped_lock:
+        _dropped[reason] += n
+
+
+instrumentation.register_collector(
+    'smartfruit_mqtt_consumer_dropped_total', 'counter', 'Pesan MQTT yang dibuang consumer Django.',
+    lambda: [({'reason': reason}, n) for reason, n in _dropped.items()])
 
 def process_sensor_data(temperature, humidity):
     """Process sensor data and determine status."""
     status = "LAYAK" if temperature <= 30 and humidity >= 30 else "TIDAK LAYAK"
     return status
 
-def on_message(client, userdata, msg):
-    """Callback for when a message is received from the MQTT broker."""
+def parse_message(topic, payload, received_at=None):
+    """Ubah satu pesan MQTT menjadi SensorData (belum disimpan), atau None jika tidak valid."""
     try:
-        data = json.loads(msg.payload)
-        temperature = data.get("temperature")
-        humidity = data.get("humidity")
-        status = process_sensor_data(temperature, humidity)
-
-        # Save to database
-        sensor_data = SensorData.objects.create(
-            temperature=temperature,
-            humidity=humidity,
-            mq2=data.get("mq2"),
-            mq3=data.get("mq3"),
-            mq135=data.get("mq135"),
-            status=status
-        )
+        data = payloads.decode(payload)
+        temperature = float(data["temperature"])
+        humidity = float(data["humidity"])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+    def _optional(key):
+        value = data.get(key)
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    device_id = resolve_device_id(data, topic=topic)
+    return SensorData(
+        timestamp=reading_time(data, device_id, received_at),
+        temperature=temperature,
+        humidity=humidity,
+        mq2=_optional("mq2"),
+        mq3=_optional("mq3"),
+        mq135=_optional("mq135"),
+        status=process_sensor_data(temperature, humidity),
+        device_id=device_id,
+    )
+
+def reading_payload(sensor_data):
+    return {
+        "device_id": sensor_data.device_id,
+        "timestamp": str(sensor_data.timestamp),
+        "temperature": sensor_data.temperature,
+        "humidity": sensor_data.humidity,
+        "mq2": sensor_data.mq2,
+        "mq3": sensor_data.mq3,
+        "mq135": sensor_data.mq135,
+        "status": sensor_data.status
+    }
+
 
-        # Broadcast to WebSocket group
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            "sensor_data_group",
-            {
-                "type": "send_sensor_data",
-                "data": {
-                    "timestamp": str(sensor_data.timestamp),
-                    "temperature": sensor_data.temperature,
-                    "humidity": sensor_data.humidity,
-                    "mq2": sensor_data.mq2,
-                    "mq3": sensor_data.mq3,
-                    "mq135": sensor_data.mq135,
-                    "status": sensor_data.status
-                }
-            }
+class MQTTConsumer:
+    """Client MQTT + antrean terbatas + writer batch."""
+
+    def __init__(self, broker=None, port=None, topics=None, client_id=None,
+                 batch_size=None, flush_interval=None, queue_size=None, qos=1):
+        self.broker = broker or getattr(settings, 'MQTT_BROKER', BROKER_URL)
+        self.port = port or getattr(settings, 'MQTT_PORT', BROKER_PORT)
+        self.topics = topics or getattr(settings, 'MQTT_TOPICS', TOPICS)
+        self.client_id = client_id or getattr(settings, 'MQTT_CLIENT_ID', 'smartfruit-django')
+        self.batch_size = batch_size or getattr(settings, 'MQTT_BATCH_SIZE', 200)
+        self.flush_interval = flush_interval or getattr(settings, 'MQTT_FLUSH_INTERVAL', 1.0)
+        self.qos = qos
+        self.queue = queue.Queue(maxsize=queue_size or getattr(settings, 'MQTT_QUEUE_SIZE', 10000))
+        self.stats = {'received': 0, 'dropped': 0, 'invalid': 0, 'saved': 0, 'batches': 0, 'errors': 0}
+        self._stopping = threading.Event()
+        self._writer = None
+        self.client = None
+
+    # -- MQTT -------------------------------------------------------
+    def on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code == 0:
+            client.subscribe([(topic, self.qos) for topic in self.topics])
+            logger.info("MQTT terhubung ke %s:%s, subscribe %s", self.broker, self.port, ', '.join(self.topics))
+        else:
+            logger.error("MQTT gagal terhubung: %s", reason_code)
+
+    def on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code != 0 and not self._stopping.is_set():
+            logger.warning("MQTT terputus (%s), mencoba reconnect...", reason_code)
+
+    def on_message(self, client, userdata, msg):
+        """Callback network thread paho: hanya enqueue, tidak pernah menunggu."""
+        self.stats['received'] += 1
+        ack = functools.partial(client.ack, msg.mid, msg.qos) if client is not None else None
+        try:
+            self.queue.put_nowait((msg.topic, msg.payload, timezone.now(), ack))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            _count_dropped('queue_full', 1)
+            if self.stats['dropped'] % 1000 == 1:
+                logger.warning("Antrean MQTT penuh, %d pesan dibuang sejauh ini", self.stats['dropped'])
+            # Tetap di-ack supaya pesan yang tidak di-ack tidak menahan pengiriman broker
+            if ack is not None:
+                ack()
+
+    def connect(self):
+        self.client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id=self.client_id,
+            clean_session=False,
+            # PUBACK dikirim writer setelah batch disimpan (process_batch), bukan saat diterima
+            manual_ack=True,
         )
-    except Exception as e:
-        print(f"Error processing message: {e}")
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        # connect_async + loop_start: paho terus mencoba reconnect walau broker belum siap
+        self.client.connect_async(self.broker, self.port, 60)
+        self.client.loop_start()
+
+    # -- Writer -----------------------------------------------------
+    def take_batch(self, timeout=None):
+        """Ambil sampai batch_size pesan; tunggu paling lama ``timeout`` detik untuk pesan pertama."""
+        items = []
+        deadline = time.monotonic() + (self.flush_interval if timeout is None else timeout)
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self.queue.get(timeout=max(remaining, 0)) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def process_batch(self, items):
+        """Simpan satu batch pesan dan publish sekali ke WebSocket. Return jumlah yang disimpan."""
+        readings = []
+        for topic, payload, received_at, _ in items:
+            reading = parse_message(topic, payload, received_at)
+            if reading is None:
+                self.stats['invalid'] += 1
+            else:
+                readings.append(reading)
+        if readings:
+            readings = self.save(readings)
+        # Tersimpan, duplikat, tidak valid atau sudah di dead-letter: semua selesai diproses
+        for *_, ack in items:
+            if ack is not None:
+                ack()
+        if not readings:
+            return 0
+        self.stats['saved'] += len(readings)
+        self.stats['batches'] += 1
+        for reading in readings:
+            alerts.process(reading.device_id, values=alerts.values_of(reading), status=reading.status,
+                           now=reading.timestamp.timestamp())
+
+        try:
+            with instrumentation.span('broadcast', endpoint=ENDPOINT):
+                async_to_sync(get_channel_layer().group_send)(
+                    WS_GROUP,
+                    {"type": "send_sensor_batch", "data": [reading_payload(r) for r in readings]}
+                )
+        except Exception as e:
+            logger.error("Error broadcasting batch: %s", e)
+        return len(readings)
+
+    def save(self, readings):
+        """
+        ``write_batch`` dengan retry + backoff. Return reading yang baru
+        disimpan; jika semua percobaan gagal reading ke dead-letter dan
+        dihitung ``dropped``.
+        """
+        retries = getattr(settings, 'MQTT_WRITE_RETRIES', WRITE_RETRIES)
+        for attempt in range(retries + 1):
+            try:
+                # Kiriman ulang (device_id, timestamp) yang sama dilewati
+                with instrumentation.span('db', endpoint=ENDPOINT):
+                    return write_batch(readings)
+            except Exception as e:
+                self.stats['errors'] += 1
+                error = e
+                if attempt < retries:
+                    delay = WRITE_BACKOFF * 2 ** attempt
+                    logger.warning("Error saving %d readings (%s), retry dalam %.1f s", len(readings), e, delay)
+                    time.sleep(delay)
+                    # Koneksi yang rusak dibuang supaya retry membuka koneksi baru
+                    close_old_connections()
+        logger.error("Error saving %d readings setelah %d retry: %s", len(readings), retries, error)
+        self.stats['dropped'] += len(readings)
+        _count_dropped('db_error', len(readings))
+        dead_letter(readings, error)
+        return []
+
+    def run_writer(self):
+        while not self._stopping.is_set():
+            items = self.take_batch()
+            if items:
+                self.process_batch(items)
+                close_old_connections()
+        self.drain()
+
+    def drain(self):
+        """Simpan semua pesan yang masih ada di antrean."""
+        while True:
+            items = self.take_batch(timeout=0)
+            if not items:
+                return
+            self.process_batch(items)
+
+    # -- Lifecycle --------------------------------------------------
+    def start(self):
+        self._stopping.clear()
+        self._writer = threading.Thread(target=self.run_writer, name='mqtt-writer', daemon=True)
+        self._writer.start()
+        self.connect()
+
+    def stop(self, timeout=30):
+        """Berhenti menerima pesan, lalu tunggu writer menghabiskan antrean."""
+        if self.client is not None:
+            self.client.disconnect()
+            self.client.loop_stop()
+        self._stopping.set()
+        if self._writer is not None:
+            self._writer.join(timeout=timeout)
+
 
 def start_mqtt_client():
-    """Start the MQTT client and subscribe to the topic."""
-    client = mqtt.Client()
-    client.on_message = on_message
-    client.connect(BROKER_URL, BROKER_PORT, 60)
-    client.subscribe(TOPIC)
-    client.loop_start()
\ No newline at end of file
+    """Start the MQTT consumer in background threads (lihat run_mqtt_consumer)."""
+    consumer = MQTTConsumer()
+    consumer.start()
+    return consumer
@@ -11,4 +11,13 @@ class SensorDataConsumer(AsyncWebsocketConsumer):
 
     async def send_sensor_data(self, event):
         data = event['data']
-        await self.send(text_data=json.dumps(data))
\ No newline at end of file
+        await self.send(text_data=json.dumps(data))
+
+    async def send_sensor_batch(self, event):
+        # Satu publish channel layer per batch dari MQTT consumer
+        for data in event['data']:
+            await self.send(text_data=json.dumps(data))
+
+    async def send_alert(self, event):
+        # Hanya transisi alert (buka/tutup), bukan setiap reading
+        await self.send(text_data=json.dumps({'type': 'alert', **event['data']}))
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Identitas device (ESP32) untuk ingest, query dan cache per device.
+
+Sumber device id (urutan prioritas):
+1. Payload: ``device_id`` / ``device``
+2. Header ``X-Device-Id``
+3. Token device di header ``X-Device-Token`` (dipetakan lewat ``settings.DEVICE_TOKENS``)
+4. Topic MQTT sesuai ``settings.MQTT_DEVICE_TOPIC_PATTERN``
+5. ``settings.DEFAULT_DEVICE_ID``
+
+Waktu ukur per reading memakai ``ts`` dari device yang dikoreksi dengan
+offset jam device (lihat monitoring/clock.py); offset terakhir per device
+disimpan di cache untuk pesan yang tidak membawa ``sent_at``.
+"""
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import clock
+
+DEVICE_TAG = 'device'
+_VALID_ID = re.compile(r'^[A-Za-z0-9_.:\-]{1,64}$')
+
+
+def default_device_id():
+    return getattr(settings, 'DEFAULT_DEVICE_ID', 'default')
+
+
+def clean_device_id(value):
+    """Kembalikan device id yang valid, atau None jika kosong/tidak valid."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value or not _VALID_ID.match(value):
+        return None
+    return value
+
+
+def device_from_topic(topic, pattern=None):
+    """
+    Ambil device id dari topic MQTT.
+
+    Pattern memakai ``{device}`` sebagai penanda dan ``+`` sebagai wildcard
+    satu level, misalnya ``annas/esp32/{device}/sensor``.
+    """
+    if not topic:
+        return None
+    pattern = pattern or getattr(settings, 'MQTT_DEVICE_TOPIC_PATTERN', 'annas/esp32/{device}/sensor')
+    topic_parts = topic.split('/')
+    pattern_parts = pattern.split('/')
+    if len(topic_parts) != len(pattern_parts):
+        return None
+    device = None
+    for expected, actual in zip(pattern_parts, topic_parts):
+        if expected == '{device}':
+            device = actual
+        elif expected != '+' and expected != actual:
+            return None
+    return clean_device_id(device)
+
+
+def resolve_device_id(data=None, request=None, topic=None):
+    """Tentukan device id untuk satu reading (lihat urutan di docstring modul)."""
+    if data:
+        for key in ('device_id', 'device'):
+            device = clean_device_id(data.get(key))
+            if device:
+                return device
+    if request is not None:
+        device = clean_device_id(request.headers.get('X-Device-Id'))
+        if device:
+            return device
+        token = request.headers.get('X-Device-Token')
+        if token:
+            device = clean_device_id(getattr(settings, 'DEVICE_TOKENS', {}).get(token))
+            if device:
+                return device
+    device = device_from_topic(topic)
+    if device:
+        return device
+    return default_device_id()
+
+
+def requested_device(request):
+    """Device yang diminta lewat query param ``device`` (None = semua device)."""
+    return clean_device_id(request.GET.get('device'))
+
+
+# ----------------------------------------------------------
+# Waktu ukur
+# ----------------------------------------------------------
+def _offset_key(device):
+    return f'sensor:clock_offset:{device}'
+
+
+def reading_time(data, device_id, received_at=None):
+    """
+    Waktu ukur (datetime UTC) untuk satu reading.
+
+    Tanpa ``ts`` di payload hasilnya ``received_at`` (default sekarang).
+    """
+    received_at = received_at or timezone.now()
+    data = data or {}
+    sent_at = clock.parse_epoch(data.get('sent_at'))
+    offset = cache.get(_offset_key(device_id)) if sent_at is None else None
+    epoch, source, offset = clock.correct(
+        clock.measured_at(data), received_at.timestamp(), sent_at=sent_at, offset=offset,
+        tolerance=getattr(settings, 'SENSOR_CLOCK_TOLERANCE', clock.DEFAULT_TOLERANCE),
+    )
+    if sent_at is not None:
+        cache.set(_offset_key(device_id), offset, getattr(settings, 'SENSOR_CLOCK_OFFSET_TTL', 3600))
+    if source == clock.SOURCE_SERVER:
+        return received_at
+    return clock.to_datetime(epoch)
+
+
+def clock_offset(device_id):
+    """Offset jam device terakhir yang terukur (detik) atau None."""
+    return cache.get(_offset_key(device_id))
+
+
+# ----------------------------------------------------------
+# Cache data terbaru per device
+# ----------------------------------------------------------
+def _latest_key(device):
+    return f'sensor:latest:{device or "*"}'
+
+
+def cache_latest(device, payload, ttl=None, include_all=True, ts=None):
+    """
+    Simpan reading terbaru untuk device.
+
+    ``include_all`` juga memperbarui entri agregat (semua device); dipakai
+    saat ingest, bukan saat mengisi cache dari hasil query satu device.
+    ``ts`` (epoch waktu ukur) mencegah reading yang datang terlambat menimpa
+    reading yang lebih baru.
+    """
+    ttl = ttl if ttl is not None else getattr(settings, 'SENSOR_CACHE_TTL', 5)
+    ts = ts if ts is not None else time.time()
+    keys = [_latest_key(device)]
+    if include_all:
+        keys.append(_latest_key(None))
+    current = cache.get_many(keys)
+    entries = {key: (ts, payload) for key in keys
+               if key not in current or current[key][0] <= ts}
+    if entries:
+        cache.set_many(entries, ttl)
+
+
+def get_cached_latest(device=None):
+    entry = cache.get(_latest_key(device))
+    return entry[1] if entry else None
@@ -0,0 +1,127 @@
+"""
+Streaming export untuk data SensorData.
+
+Baris dibaca per chunk lewat ``values_list().iterator()`` dan langsung
+dikirim ke client, jadi memori tetap datar walaupun data yang diekspor
+berbulan-bulan.
+"""
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+CSV_HEADER = ['Waktu', 'Suhu', 'Kelembapan', 'MQ2 (ppm)', 'MQ3 (ppm)', 'MQ135 (ppm)', 'Status']
+CSV_FIELDS = ('timestamp', 'temperature', 'humidity', 'mq2', 'mq3', 'mq135', 'status')
+
+# Jumlah baris per fetch dari database dan per potongan yang dikirim ke client
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object untuk csv.writer: kembalikan string, jangan simpan."""
+
+    def write(self, value):
+        return value
+
+
+def _parse_bound(value):
+    """Parse 'YYYY-MM-DD' atau datetime ISO menjadi datetime aware (UTC)."""
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            raise ValueError(f"Format waktu tidak valid: {value}")
+        dt = datetime.combine(d, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+def parse_time_range(params):
+    """
+    Ambil rentang waktu dari query params.
+
+    - ``date=YYYY-MM-DD``  -> [tanggal 00:00, tanggal+1 00:00)
+    - ``start`` / ``end``  -> tanggal atau datetime ISO, ``end`` eksklusif
+
+    Returns:
+        tuple: (start, end), masing-masing datetime aware atau None
+    """
+    start = _parse_bound(params.get('start'))
+    end = _parse_bound(params.get('end'))
+    date_str = params.get('date')
+    if date_str:
+        day_start = _parse_bound(date_str)
+        start = max(filter(None, [start, day_start]))
+        day_end = day_start + timedelta(days=1)
+        end = min(filter(None, [end, day_end]))
+    return start, end
+
+
+def filter_queryset(qs, params):
+    """
+    Terapkan filter export ke queryset SensorData.
+
+    Filter tanggal diubah jadi range lookup (``timestamp >= a AND < b``)
+    supaya database bisa memakai index pada kolom ``timestamp``.
+    """
+    start, end = parse_time_range(params)
+    if start is not None:
+        qs = qs.filter(timestamp__gte=start)
+    if end is not None:
+        qs = qs.filter(timestamp__lt=end)
+
+    time_str = params.get('time')
+    if time_str:
+        qs = qs.filter(timestamp__time=time_str)
+    status = params.get('status')
+    if status:
+        qs = qs.filter(status=status)
+    return qs
+
+
+def iter_csv(qs, fields=CSV_FIELDS, header=CSV_HEADER, chunk_size=CHUNK_SIZE):
+    """Generator CSV: header lalu baris data, dikelompokkan per ``chunk_size`` baris."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+
+    buf = []
+    for row in qs.values_list(*fields).iterator(chunk_size=chunk_size):
+        buf.append(writer.writerow(row))
+        if len(buf) >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+    if buf:
+        yield ''.join(buf)
+
+
+def gzip_stream(chunks, level=6):
+    """Kompres potongan string/bytes menjadi stream gzip secara on-the-fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def wants_gzip(params):
+    return (params.get('compress') or '').lower() in ('gzip', 'gz', '1', 'true')
+
+
+def streaming_csv_response(chunks, filename='sensor_data.csv', compress=False):
+    """Bungkus generator CSV menjadi StreamingHttpResponse (opsional gzip)."""
+    if compress:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,731 @@
+"""
+InfluxDB v2 tiruan di dalam proses, untuk test dan benchmark tanpa jaringan.
+
+``FakeInflux`` menjalankan server HTTP lokal (ThreadingHTTPServer) dengan
+endpoint yang dipakai influxdb-client:
+
+- ``POST /api/v2/write``  line protocol (precision ns/us/ms/s, gzip boleh)
+- ``POST /api/v2/query``  subset Flux, hasil annotated CSV
+- ``GET /health``, ``GET /ping``, ``GET /ready``
+
+Data disimpan di ``InfluxStore``: satu seri per (bucket, measurement, tag,
+field) dengan waktu terurut (bisect), jadi ``range()`` tidak memindai semua
+point. Point dengan seri + waktu sama menimpa nilai lama, sama seperti
+InfluxDB.
+
+Flux yang didukung: ``from``, ``range``, ``filter`` (``==``, ``!=``, ``<``,
+``<=``, ``>``, ``>=``, ``and``, ``or``, ``not``, ``exists``), ``last``,
+``first``, ``sort``, ``limit``, ``pivot``, ``keep``, ``drop``, ``group``,
+``aggregateWindow`` dan agregat ``mean``/``sum``/``count``/``min``/``max``/
+``median``, ``yield``. Fungsi lain menghasilkan error 400.
+
+Contoh::
+
+    with FakeInflux() as influx:
+        os.environ['INFLUX_URL'] = influx.url
+        ...
+        influx.store.count('datamonitoring')
+"""
+import bisect
+import gzip
+import json
+import re
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+VERSION = '2.7.0-fake'
+PRECISION = {'ns': 1, 'us': 1_000, 'ms': 1_000_000, 's': 1_000_000_000}
+DURATION_UNITS = {
+    'ns': 1, 'us': 1_000, 'µs': 1_000, 'ms': 1_000_000, 's': 1_000_000_000,
+    'm': 60_000_000_000, 'h': 3_600_000_000_000, 'd': 86_400_000_000_000, 'w': 604_800_000_000_000,
+}
+TIME_COLUMNS = ('_start', '_stop', '_time')
+
+
+class FluxError(ValueError):
+    """Query Flux tidak valid / tidak didukung (dibalas HTTP 400)."""
+
+
+# ----------------------------------------------------------
+# Line protocol
+# ----------------------------------------------------------
+def _split_unescaped(text, sep):
+    """Pisah di ``sep`` yang tidak di-escape dan tidak di dalam string."""
+    parts, buf, quoted, i = [], [], False, 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\' and i + 1 < len(text):
+            buf.append(text[i:i + 2])
+            i += 2
+            continue
+        if ch == '"':
+            quoted = not quoted
+        if ch == sep and not quoted:
+            parts.append(''.join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    parts.append(''.join(buf))
+    return parts
+
+
+def _unescape(text):
+    return re.sub(r'\\(.)', r'\1', text)
+
+
+def _field_value(raw):
+    if raw.startswith('"'):
+        return raw[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    if raw[-1] in 'iu' and raw[:-1].lstrip('-').isdigit():
+        return int(raw[:-1])
+    if raw in ('t', 'T', 'true', 'True', 'TRUE'):
+        return True
+    if raw in ('f', 'F', 'false', 'False', 'FALSE'):
+        return False
+    return float(raw)
+
+
+def parse_line_protocol(text, precision='ns'):
+    """Yield (measurement, tags tuple terurut, {field: nilai}, waktu ns atau None)."""
+    scale = PRECISION[precision]
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        sections = [s for s in _split_unescaped(line, ' ') if s]
+        if len(sections) not in (2, 3):
+            raise ValueError(f'line protocol tidak valid: {line!r}')
+        head = _split_unescaped(sections[0], ',')
+        tags = []
+        for tag in head[1:]:
+            key, _, value = tag.partition('=')
+            tags.append((_unescape(key), _unescape(value)))
+        fields = {}
+        for field in _split_unescaped(sections[1], ','):
+            key, _, value = field.partition('=')
+            fields[_unescape(key)] = _field_value(value)
+        ts = int(sections[2]) * scale if len(sections) == 3 else None
+        yield _unescape(head[0]), tuple(sorted(tags)), fields, ts
+
+
+# ----------------------------------------------------------
+# Store
+# ----------------------------------------------------------
+class Series:
+    __slots__ = ('times', 'values')
+
+    def __init__(self):
+        self.times = []
+        self.values = []
+
+    def put(self, ts, value):
+        i = bisect.bisect_left(self.times, ts)
+        if i < len(self.times) and self.times[i] == ts:
+            self.values[i] = value
+        else:
+            self.times.insert(i, ts)
+            self.values.insert(i, value)
+
+    def between(self, start, stop):
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_left(self.times, stop)
+        return zip(self.times[lo:hi], self.values[lo:hi])
+
+
+class InfluxStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def write(self, bucket, text, precision='ns', now_ns=None):
+        """Simpan line protocol; return jumlah nilai field yang ditulis."""
+        now_ns = now_ns or time.time_ns()
+        points = list(parse_line_protocol(text, precision))
+        written = 0
+        with self._lock:
+            series = self._buckets.setdefault(bucket, {})
+            for measurement, tags, fields, ts in points:
+                for field, value in fields.items():
+                    series.setdefault((measurement, tags, field), Series()).put(ts or now_ns, value)
+                    written += 1
+        return written
+
+    def select(self, bucket, start, stop):
+        """Yield (measurement, tags, field, [(waktu, nilai)]) dalam [start, stop)."""
+        with self._lock:
+            items = list(self._buckets.get(bucket, {}).items())
+            for (measurement, tags, field), series in items:
+                rows = list(series.between(start, stop))
+                if rows:
+                    yield measurement, tags, field, rows
+
+    def count(self, bucket=None):
+        with self._lock:
+            buckets = [self._buckets.get(bucket, {})] if bucket else list(self._buckets.values())
+            return sum(len(s.times) for b in buckets for s in b.values())
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# ----------------------------------------------------------
+# Flux: tokenizer + parser argumen / predicate
+# ----------------------------------------------------------
+_TOKEN = re.compile(r'''\s*(?:
+    (?P<str>"(?:\\.|[^"\\])*")
+  | (?P<time>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:\d\d))
+  | (?P<dur>-?(?:\d+(?:mo|ms|us|µs|ns|[wdhms]))+)
+  | (?P<num>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<op>=>|==|!=|>=|<=|\|>|[<>()\[\]{},:.])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+)''', re.X)
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise FluxError(f'token tidak dikenal di: {text[pos:pos + 20]!r}')
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def parse_duration(text):
+    sign = -1 if text.startswith('-') else 1
+    total = 0
+    for amount, unit in re.findall(r'(\d+)(mo|ms|us|µs|ns|[wdhms])', text):
+        if unit == 'mo':
+            raise FluxError('durasi bulan (mo) tidak didukung')
+        total += int(amount) * DURATION_UNITS[unit]
+    return sign * total
+
+
+def parse_time(text):
+    dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    # fromisoformat hanya presisi mikrodetik
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1_000
+
+
+class Lambda:
+    def __init__(self, param, body):
+        self.param, self.body = param, body
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens, self.i = tokens, 0
+
+    def peek(self, offset=0):
+        j = self.i + offset
+        return self.tokens[j] if j < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise FluxError(f'diharapkan {value!r}, dapat {token[1]!r}')
+        self.i += 1
+        return token
+
+    def done(self):
+        return self.i >= len(self.tokens)
+
+    # argumen: key: value, ...
+    def args(self):
+        out = {}
+        while not self.done():
+            key = self.take()[1]
+            self.take(':')
+            out[key] = self.value()
+            if not self.done():
+                self.take(',')
+        return out
+
+    def value(self):
+        kind, text = self.peek()
+        if text == '(' and self.peek(1)[0] == 'name' and self.peek(2)[1] == ')' and self.peek(3)[1] == '=>':
+            self.i += 4
+            return Lambda(self.tokens[self.i - 3][1], self.expr())
+        if text == '[':
+            self.take('[')
+            items = []
+            while self.peek()[1] != ']':
+                items.append(self.value())
+                if self.peek()[1] == ',':
+                    self.take(',')
+            self.take(']')
+            return items
+        if kind == 'name' and text == 'now' and self.peek(1)[1] == '(':
+            self.i += 3
+            return ('now',)
+        return self.literal()
+
+    def literal(self):
+        kind, text = self.take()
+        if kind == 'str':
+            return json.loads(text)
+        if kind == 'num':
+            return float(text) if any(c in text for c in '.eE') else int(text)
+        if kind == 'dur':
+            return ('duration', parse_duration(text))
+        if kind == 'time':
+            return ('time', parse_time(text))
+        if kind == 'name':
+            return {'true': True, 'false': False}.get(text, ('ident', text))
+        raise FluxError(f'nilai tidak valid: {text!r}')
+
+    # predicate
+    def expr(self):
+        node = self.conj()
+        while self.peek()[1] == 'or':
+            self.take()
+            node = ('or', node, self.conj())
+        return node
+
+    def conj(self):
+        node = self.unary()
+        while self.peek()[1] == 'and':
+            self.take()
+            node = ('and', node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek()[1] == 'not':
+            self.take()
+            return ('not', self.unary())
+        if self.peek()[1] == 'exists':
+            self.take()
+            return ('exists', self.operand())
+        left = self.operand()
+        if self.peek()[1] in ('==', '!=', '<', '<=', '>', '>='):
+            op = self.take()[1]
+            return ('cmp', op, left, self.operand())
+        return left
+
+    def operand(self):
+        if self.peek()[1] == '(':
+            self.take('(')
+            node = self.expr()
+            self.take(')')
+            return node
+        kind, text = self.peek()
+        if kind == 'name' and text not in ('true', 'false'):
+            self.take()
+            path = []
+            while self.peek()[1] in ('[', '.'):
+                if self.take()[1] == '[':
+                    path.append(json.loads(self.take()[1]))
+                    self.take(']')
+                else:
+                    path.append(self.take()[1])
+            return ('col', path[0] if path else text)
+        value = self.literal()
+        if isinstance(value, tuple) and value[0] in ('time', 'duration'):
+            value = value[1]
+        return ('lit', value)
+
+
+_COMPARE = {
+    '==': lambda a, b: a == b, '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+}
+
+
+def _evaluate(node, row):
+    kind = node[0]
+    if kind == 'or':
+        return _evaluate(node[1], row) or _evaluate(node[2], row)
+    if kind == 'and':
+        return _evaluate(node[1], row) and _evaluate(node[2], row)
+    if kind == 'not':
+        return not _evaluate(node[1], row)
+    if kind == 'exists':
+        return _evaluate(node[1], row) is not None
+    if kind == 'cmp':
+        left, right = _evaluate(node[2], row), _evaluate(node[3], row)
+        if left is None or right is None:
+            return node[1] == '!=' and left is not right
+        try:
+            return _COMPARE[node[1]](left, right)
+        except TypeError:
+            return False
+    if kind == 'col':
+        return row.get(node[1])
+    if kind == 'lit':
+        return node[1]
+    raise FluxError(f'ekspresi tidak didukung: {kind}')
+
+
+def _split_pipeline(flux):
+    """Pisah query di ``|>`` (di luar string) -> [(nama fungsi, teks argumen)]."""
+    lines = [line for line in flux.splitlines() if not line.strip().startswith(('import ', '//'))]
+    parts = [p.strip() for p in _split_unescaped('\n'.join(lines).replace('|>', '\x00'), '\x00') if p.strip()]
+    calls = []
+    for part in parts:
+        match = re.fullmatch(r'([A-Za-z_][A-Za-z0-9_.]*)\s*\((.*)\)', part, re.S)
+        if not match:
+            raise FluxError(f'tidak bisa parse: {part[:40]!r}')
+        calls.append((match.group(1), match.group(2)))
+    return calls
+
+
+# ----------------------------------------------------------
+# Flux: eksekusi
+# ----------------------------------------------------------
+class Table:
+    __slots__ = ('key', 'rows')
+
+    def __init__(self, key, rows):
+        self.key = key      # tuple (kolom, nilai) group key
+        self.rows = rows    # list dict
+
+
+def _regroup(tables, key_columns):
+    grouped = {}
+    for table in tables:
+        for row in table.rows:
+            key = tuple((c, row.get(c)) for c in key_columns if c in row)
+            grouped.setdefault(key, []).append(row)
+    return [Table(key, rows) for key, rows in grouped.items()]
+
+
+def _resolve_time(value, now):
+    if isinstance(value, tuple):
+        if value[0] == 'duration':
+            return now + value[1]
+        if value[0] in ('time',):
+            return value[1]
+        if value[0] == 'now':
+            return now
+    if isinstance(value, int):
+        return value * 1_000_000_000
+    raise FluxError(f'waktu tidak valid: {value!r}')
+
+
+def _aggregate(name, values):
+    values = [v for v in values if v is not None]
+    if name == 'count':
+        return len(values)
+    if not values:
+        return None
+    if name == 'mean':
+        return statistics.fmean(values)
+    if name == 'sum':
+        return sum(values)
+    if name == 'median':
+        return float(statistics.median(values))
+    if name in ('min', 'max'):
+        return (min if name == 'min' else max)(values)
+    if name == 'first':
+        return values[0]
+    if name == 'last':
+        return values[-1]
+    raise FluxError(f'fungsi agregat tidak didukung: {name}')
+
+
+AGGREGATES = ('mean', 'sum', 'count', 'min', 'max', 'median')
+
+
+def execute(store, flux, now=None):
+    """Jalankan query; return (nama result, [Table])."""
+    now = now or time.time_ns()
+    calls = _split_pipeline(flux)
+    if not calls or calls[0][0] != 'from':
+        raise FluxError('query harus diawali from()')
+    bucket = _Parser(_tokenize(calls[0][1])).args().get('bucket')
+    tables = None
+    result = '_result'
+
+    for name, raw in calls[1:]:
+        args = _Parser(_tokenize(raw)).args() if raw.strip() else {}
+        if name != 'range' and tables is None:
+            raise FluxError('range() wajib setelah from()')
+
+        if name == 'range':
+            start = _resolve_time(args['start'], now)
+            stop = _resolve_time(args.get('stop', ('now',)), now)
+            tables = []
+            for measurement, tags, field, points in store.select(bucket, start, stop):
+                base = {'_start': start, '_stop': stop, '_measurement': measurement, '_field': field, **dict(tags)}
+                key = tuple(base.items())
+                tables.append(Table(key, [{**base, '_time': t, '_value': v} for t, v in points]))
+        elif name == 'filter':
+            fn = args['fn']
+            for table in tables:
+                table.rows = [r for r in table.rows if _evaluate(fn.body, r)]
+            if args.get('onEmpty', 'drop') == 'drop':
+                tables = [t for t in tables if t.rows]
+        elif name in ('last', 'first'):
+            column = args.get('column', '_value')
+            for table in tables:
+                rows = [r for r in table.rows if r.get(column) is not None]
+                table.rows = [rows[-1 if name == 'last' else 0]] if rows else []
+            tables = [t for t in tables if t.rows]
+        elif name == 'sort':
+            columns = args.get('columns', ['_value'])
+            for table in tables:
+                table.rows.sort(key=lambda r: tuple((r.get(c) is not None, r.get(c)) for c in columns),
+                                reverse=bool(args.get('desc', False)))
+        elif name == 'limit':
+            n, offset = args['n'], args.get('offset', 0)
+            for table in tables:
+                table.rows = table.rows[offset:offset + n]
+        elif name == 'pivot':
+            tables = _pivot(tables, args['rowKey'], args['columnKey'], args['valueColumn'])
+        elif name in ('keep', 'drop'):
+            columns = set(args['columns'])
+            keep = (lambda c: c in columns) if name == 'keep' else (lambda c: c not in columns)
+            for table in tables:
+                table.rows = [{c: v for c, v in r.items() if keep(c)} for r in table.rows]
+                table.key = tuple((c, v) for c, v in table.key if keep(c))
+        elif name == 'group':
+            tables = _regroup(tables, args.get('columns', []))
+        elif name == 'aggregateWindow':
+            tables = _aggregate_window(tables, args)
+        elif name in AGGREGATES:
+            column = args.get('column', '_value')
+            for table in tables:
+                values = [r.get(column) for r in table.rows]
+                if name in ('min', 'max'):
+                    best = _aggregate(name, values)
+                    table.rows = [next(r for r in table.rows if r.get(column) == best)] if best is not None else []
+                else:
+                    table.rows = [{**dict(table.key), column: _aggregate(name, values)}]
+        elif name == 'yield':
+            result = args.get('name', '_result')
+        else:
+            raise FluxError(f'fungsi Flux tidak didukung oleh fake InfluxDB: {name}()')
+    return result, tables or []
+
+
+def _pivot(tables, row_key, column_key, value_column):
+    merged = {}
+    for table in tables:
+        key = tuple((c, v) for c, v in table.key if c not in column_key)
+        rows = merged.setdefault(key, {})
+        for row in table.rows:
+            rk = tuple(row.get(c) for c in row_key)
+            target = rows.get(rk)
+            if target is None:
+                target = rows[rk] = {c: v for c, v in row.items() if c not in column_key and c != value_column}
+            target['_'.join(str(row.get(c)) for c in column_key)] = row.get(value_column)
+    return [Table(key, [rows[k] for k in sorted(rows, key=lambda k: tuple((v is not None, v) for v in k))])
+            for key, rows in merged.items()]
+
+
+def _aggregate_window(tables, args):
+    every = args['every'][1]
+    fn = args['fn'][1] if isinstance(args['fn'], tuple) else args['fn']
+    column = args.get('column', '_value')
+    create_empty = args.get('createEmpty', True)
+    time_src = args.get('timeSrc', '_stop')
+    out = []
+    for table in tables:
+        if not table.rows:
+            continue
+        base = dict(table.key)
+        start, stop = base.get('_start', table.rows[0]['_time']), base.get('_stop', table.rows[-1]['_time'] + 1)
+        buckets = {}
+        for row in table.rows:
+            window = row['_time'] - row['_time'] % every
+            buckets.setdefault(window, []).append(row.get(column))
+        windows = range(start - start % every, stop, every) if create_empty else sorted(buckets)
+        rows = []
+        for window in windows:
+            values = buckets.get(window, [])
+            if not values and not create_empty:
+                continue
+            bounds = {'_start': max(window, start), '_stop': min(window + every, stop)}
+            rows.append({**base, column: _aggregate(fn, values), '_time': bounds[time_src]})
+        out.append(Table(table.key, rows))
+    return out
+
+
+# ----------------------------------------------------------
+# Annotated CSV
+# ----------------------------------------------------------
+def _datatype(column, values):
+    if column in TIME_COLUMNS:
+        return 'dateTime:RFC3339'
+    kinds = {type(v) for v in values if v is not None}
+    if kinds == {bool}:
+        return 'boolean'
+    if kinds == {int}:
+        return 'long'
+    if kinds and kinds <= {int, float}:
+        return 'double'
+    return 'string'
+
+
+def _csv_value(value, datatype):
+    if value is None:
+        return ''
+    if datatype.startswith('dateTime'):
+        seconds, nanos = divmod(value, 1_000_000_000)
+        stamp = datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        return f'{stamp}.{nanos // 1000:06d}Z' if nanos else stamp + 'Z'
+    if datatype == 'boolean':
+        return 'true' if value else 'false'
+    if datatype == 'double':
+        return repr(float(value))
+    text = str(value)
+    if any(c in text for c in ',"\n'):
+        text = '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def render_csv(result, tables):
+    blocks = []
+    for index, table in enumerate(tables):
+        columns = []
+        for row in table.rows:
+            for column in row:
+                if column not in columns:
+                    columns.append(column)
+        types = [_datatype(c, [r.get(c) for r in table.rows]) for c in columns]
+        group = {c for c, _ in table.key}
+        lines = [
+            ','.join(['#datatype', 'string', 'long'] + types),
+            ','.join(['#group', 'false', 'false'] + ['true' if c in group else 'false' for c in columns]),
+            ','.join(['#default', result, ''] + [''] * len(columns)),
+            ','.join(['', 'result', 'table'] + columns),
+        ]
+        for row in table.rows:
+            lines.append(','.join(['', '', str(index)] + [_csv_value(row.get(c), t) for c, t in zip(columns, types)]))
+        blocks.append('\r\n'.join(lines) + '\r\n')
+    return '\r\n'.join(blocks)
+
+
+# ----------------------------------------------------------
+# Server HTTP
+# ----------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Influxdb-Version', VERSION)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, code='invalid'):
+        self._send(status, json.dumps({'code': code, 'message': message}))
+
+    def _body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self._send(200, json.dumps({'name': 'influxdb', 'message': 'ready for queries and writes',
+                                        'status': 'pass', 'checks': [], 'version': VERSION}))
+        elif path == '/ping':
+            self._send(204)
+        elif path == '/ready':
+            self._send(200, json.dumps({'status': 'ready', 'started': self.server.fake.started, 'up': '0s'}))
+        else:
+            self._error(404, f'path tidak ada: {path}', 'not found')
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        fake = self.server.fake
+        parts = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        try:
+            body = self._body()
+        except OSError as e:
+            return self._error(400, f'body tidak valid: {e}')
+        if fake.token and self.headers.get('Authorization') != f'Token {fake.token}':
+            return self._error(401, 'unauthorized access', 'unauthorized')
+
+        if parts.path == '/api/v2/write':
+            if not params.get('bucket'):
+                return self._error(400, 'bucket wajib diisi')
+            try:
+                fake.stats['points'] += fake.store.write(
+                    params['bucket'], body.decode(), params.get('precision', 'ns'))
+            except (ValueError, KeyError) as e:
+                return self._error(400, str(e))
+            fake.stats['writes'] += 1
+            return self._send(204)
+
+        if parts.path == '/api/v2/query':
+            if 'json' in (self.headers.get('Content-Type') or ''):
+                flux = json.loads(body).get('query', '')
+            else:
+                flux = body.decode()
+            fake.stats['queries'] += 1
+            try:
+                result, tables = execute(fake.store, flux)
+            except (FluxError, KeyError) as e:
+                return self._error(400, f'error dalam query: {e}')
+            return self._send(200, render_csv(result, tables), 'text/csv; charset=utf-8')
+
+        self._error(404, f'path tidak ada: {parts.path}', 'not found')
+
+
+class FakeInflux:
+    """
+    Server InfluxDB tiruan. ``token=None`` menerima semua request; jika diisi,
+    header ``Authorization: Token <token>`` wajib cocok.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, token=None, store=None):
+        self.store = store or InfluxStore()
+        self.token = token
+        self.stats = {'writes': 0, 'points': 0, 'queries': 0}
+        self.started = datetime.now(timezone.utc).isoformat()
+        self._address = (host, port)
+        self.server = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.server = ThreadingHTTPServer(self._address, _Handler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        threading.Thread(target=self.server.serve_forever, name='fake-influx', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,94 @@
+"""
+Pipeline inferensi kualitas buah (model + scaler di ``models/``).
+
+``QualityPipeline`` menggabungkan scaler dan model menjadi satu pemanggilan:
+
+- scaler dilipat menjadi transformasi affine ``X * weight + bias`` yang
+  dihitung sekali saat load (``portable_forest.affine``, sama dengan yang
+  dipakai saat export ``.npz``), jadi tidak ada validasi
+  ``scaler.transform`` per request;
+- ``predict_proba`` dipanggil sekali untuk seluruh batch; label = kolom
+  probabilitas terbesar (sama dengan ``predict`` RandomForest), jadi tidak
+  perlu ``predict`` terpisah;
+- indeks kelas (``classes_``) dipetakan sekali saat load;
+- urutan kolom diambil dari nama fitur model/scaler lewat ml/features.py
+  (default ``LAYOUTS['fruit']`` untuk model tanpa nama fitur), jadi reading
+  boleh memakai nama kanonik maupun alias (``suhu`` / ``temperature``).
+
+``get_pipeline()`` mengembalikan pipeline yang di-cache per proses dan
+dibangun ulang hanya jika ``ml_runtime.artifact`` memuat file model/scaler
+baru. Pipeline dipanaskan dengan satu prediksi saat dibangun.
+"""
+import threading
+
+import numpy as np
+
+from ml import features as schema
+from ml.portable_forest import affine
+
+from . import ml_runtime
+
+FEATURES = schema.LAYOUTS['fruit']
+
+_cached = None  # (model, scaler, pipeline)
+_lock = threading.Lock()
+
+
+class QualityPipeline:
+    def __init__(self, model, scaler=None, features=None):
+        self.model = model
+        self.scaler = scaler
+        self.features = tuple(features or schema.order_for(model, scaler, default=FEATURES))
+        self.weight, self.bias = affine(scaler, len(self.features))
+        self.classes = [str(c) for c in model.classes_]
+        self.class_index = {label: i for i, label in enumerate(self.classes)}
+
+    def transform(self, X):
+        if self.weight is None:
+            return self.scaler.transform(X)
+        return X * self.weight + self.bias
+
+    def matrix(self, readings):
+        """Array float32 (n, fitur) dari list dict reading; field kosong = 0, di luar rentang = ValueError."""
+        return schema.from_records(readings, self.features)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.features))
+        return self.model.predict_proba(self.transform(X))
+
+    def predict(self, X):
+        """List hasil per baris: ``{'status', 'confidence', 'probabilities'}``."""
+        proba = self.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return [
+            {
+                'status': self.classes[j],
+                'confidence': float(row[j]),
+                'probabilities': {label: float(row[i]) for label, i in self.class_index.items()},
+            }
+            for row, j in zip(proba, best)
+        ]
+
+
+def get_pipeline():
+    """Pipeline untuk model + scaler terbaru, atau None jika salah satunya tidak ada."""
+    global _cached
+    model = ml_runtime.artifact('fruit_quality_joblib')
+    if model is None:
+        return None
+    # Model portabel membawa scaler sendiri (input_weight / input_bias)
+    if getattr(model, 'input_weight', None) is not None:
+        scaler = None
+    else:
+        scaler = ml_runtime.artifact('scaler')
+        if scaler is None:
+            return None
+    cached = _cached
+    if cached is not None and cached[0] is model and cached[1] is scaler:
+        return cached[2]
+    with _lock:
+        if _cached is None or _cached[0] is not model or _cached[1] is not scaler:
+            pipeline = QualityPipeline(model, scaler)
+            pipeline.predict(np.zeros((1, len(pipeline.features))))
+            _cached = (model, scaler, pipeline)
+        return _cached[2]
@@ -1,3 +1,4 @@
+import logging
 import os
 try:
     from dotenv import load_dotenv
@@ -9,6 +10,8 @@ except Exception:
 # Load environment variables from .env if present (noop if python-dotenv missing)
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- Konfigurasi InfluxDB Anda ---
 # Nilai-nilai ini diambil dari environment variable atau menggunakan default Anda
 url = os.environ.get('INFLUX_URL', 'http://127.0.0.1:8034')
@@ -19,6 +22,17 @@ bucket = os.environ.get('INFLUX_BUCKET', 'datamonitoring')
 # Measurement name - HARUS SESUAI dengan data di InfluxDB
 MEASUREMENT = 'monitoring'
 
+# Nama tag untuk identitas device (ESP32)
+DEVICE_TAG = 'device'
+
+
+def _device_filter(device):
+    """Baris filter Flux untuk satu device (kosong jika semua device)."""
+    if not device:
+        return ''
+    device = str(device).replace('\\', '\\\\').replace('"', '\\"')
+    return f'|> filter(fn: (r) => r["{DEVICE_TAG}"] == "{device}")'
+
 
 def test_connection():
     """Test InfluxDB connection"""
@@ -28,16 +42,16 @@ def test_connection():
         with InfluxDBClient(url=url, token=token, org=org, timeout=10000) as client:
             health = client.health()
             if getattr(health, 'status', None) == "pass":
-                print("✅ InfluxDB connection successful: pass")
+                logger.info("✅ InfluxDB connection successful: pass")
             else:
                 message = getattr(health, 'message', None) or getattr(health, 'status', None)
-                print("❌ InfluxDB connection failed:", message)
+                logger.error("❌ InfluxDB connection failed: %s", message)
     except Exception as e:
-        print("❌ Connection failed:", e)
+        logger.error("❌ Connection failed: %s", e)
 
 
-def get_latest_data():
-    """Get latest sensor data from InfluxDB - OPTIMIZED"""
+def get_latest_data(device=None):
+    """Get latest sensor data from InfluxDB - OPTIMIZED (opsional per device)"""
     try:
         from influxdb_client import InfluxDBClient
         with InfluxDBClient(url=url, token=token, org=org, timeout=30000) as client:
@@ -48,6 +62,7 @@ def get_latest_data():
                 from(bucket: "{bucket}")
                 |> range(start: -5m)
                 |> filter(fn: (r) => r["_measurement"] == "monitoring")
+                {_device_filter(device)}
                 |> last()
             '''
             tables = query_api.query(query, org=org)
@@ -81,14 +96,14 @@ def get_latest_data():
                     elif field == 'skortotal':
                         out['skorTotal'] = float(value) if value else 0.0
                         
-            print(f"DEBUG InfluxDB get_latest_data: {out}")
+            logger.debug("get_latest_data: %s", out)
             return out
     except Exception as e:
-        print(f"Error fetching data: {e}")
+        logger.warning("Error fetching data: %s", e)
         return {'suhu': 0.0, 'kelembapan': 0.0, 'mq2': 0.0, 'mq3': 0.0, 'mq135': 0.0, "error": str(e)}
 
-def get_history_data(limit=50):
-    """Get historical sensor data from InfluxDB (last N records)"""
+def get_history_data(limit=50, device=None):
+    """Get historical sensor data from InfluxDB (last N records, opsional per device)"""
     try:
         from influxdb_client import InfluxDBClient
         from datetime import datetime
@@ -101,6 +116,7 @@ def get_history_data(limit=50):
                 from(bucket:"{bucket}")
                 |> range(start: -24h)
                 |> filter(fn: (r) => r["_measurement"] == "monitoring")
+                {_device_filter(device)}
                 |> sort(columns:["_time"], desc: true)
                 |> limit(n:{limit})
             '''
@@ -151,7 +167,7 @@ def get_history_data(limit=50):
             return result[:limit]
             
     except Exception as e:
-        print(f"Error fetching history data: {e}")
+        logger.warning("Error fetching history data: %s", e)
         return []
 
 
@@ -180,5 +196,28 @@ def get_latest_raw(limit=100):
                     })
             return out
     except Exception as e:
-        print(f"Error fetching raw data: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        logger.warning("Error fetching raw data: %s", e)
+        return {"error": str(e)}
+
+# Measurement yang ditulis oleh jalur ingest (sensor_data, mqtt_to_influx.py)
+WRITE_MEASUREMENT = 'sensordata'
+
+
+def write_points(points):
+    """
+    Tulis banyak Point dalam satu request.
+
+    Returns:
+        bool: True jika berhasil (kosong dianggap berhasil).
+    """
+    if not points:
+        return True
+    try:
+        from influxdb_client import InfluxDBClient
+        from influxdb_client.client.write_api import SYNCHRONOUS
+        with InfluxDBClient(url=url, token=token, org=org, timeout=10000) as client:
+            client.write_api(write_options=SYNCHRONOUS).write(bucket=bucket, org=org, record=points)
+        return True
+    except Exception as e:
+        logger.error("Error writing %d points to InfluxDB: %s", len(points), e)
+        return False
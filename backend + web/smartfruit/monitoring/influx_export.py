@@ -0,0 +1,272 @@
+"""
+Export data historis dari InfluxDB.
+
+Rentang waktu dipecah menjadi jendela (default 6 jam). Setiap jendela
+di-query dengan pivot sehingga satu baris = satu timestamp, lalu hasilnya
+(DataFrame) langsung ditulis ke format tujuan: CSV, CSV gzip, Parquet
+atau Arrow IPC. Penulisan dilakukan per jendela secara vektor (pandas /
+pyarrow), bukan baris per baris di Python.
+
+Parquet dan Arrow membutuhkan ``pyarrow`` (opsional).
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from . import influx_client
+from .export import gzip_stream, parse_time_range
+
+DEFAULT_COLUMNS = ['suhu', 'kelembapan', 'mq2', 'mq3', 'mq135', 'status', 'skorTotal']
+DEFAULT_CHUNK = timedelta(hours=6)
+DEVICE_TAG = 'device'
+
+FORMATS = {
+    # format: (content_type, ekstensi file)
+    'csv': ('text/csv', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def _flux_time(dt):
+    return dt.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _flux_string(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def build_query(start, stop, columns=None, devices=None, measurement=None, bucket=None):
+    """Susun query Flux (range + filter + pivot) untuk satu jendela waktu."""
+    columns = columns or DEFAULT_COLUMNS
+    measurement = measurement or influx_client.MEASUREMENT
+    bucket = bucket or influx_client.bucket
+
+    field_filter = ' or '.join(f'r["_field"] == {_flux_string(c)}' for c in columns)
+    lines = [
+        f'from(bucket: {_flux_string(bucket)})',
+        f'|> range(start: {_flux_time(start)}, stop: {_flux_time(stop)})',
+        f'|> filter(fn: (r) => r["_measurement"] == {_flux_string(measurement)})',
+        f'|> filter(fn: (r) => {field_filter})',
+    ]
+    if devices:
+        device_filter = ' or '.join(f'r["{DEVICE_TAG}"] == {_flux_string(d)}' for d in devices)
+        lines.append(f'|> filter(fn: (r) => {device_filter})')
+    lines.append('|> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")')
+    keep = ['_time'] + ([DEVICE_TAG] if devices else []) + list(columns)
+    lines.append('|> keep(columns: [' + ', '.join(_flux_string(c) for c in keep) + '])')
+    lines.append('|> sort(columns: ["_time"])')
+    return '\n'.join(lines)
+
+
+def _split_list(params, key):
+    values = params.getlist(key) if hasattr(params, 'getlist') else [params.get(key)]
+    out = []
+    for value in values:
+        if value:
+            out.extend(v.strip() for v in value.split(',') if v.strip())
+    return out
+
+
+def parse_params(params):
+    """
+    Baca parameter export dari QueryDict/dict.
+
+    ``start``/``end`` (default 24 jam terakhir), ``format``, ``columns``
+    (dipisah koma), ``device`` (boleh berulang / dipisah koma),
+    ``chunk_hours``.
+    """
+    start, stop = parse_time_range(params)
+    stop = stop or timezone.now()
+    start = start or stop - timedelta(hours=24)
+    if start >= stop:
+        raise ValueError("start harus lebih awal dari end")
+
+    fmt = (params.get('format') or 'csv').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Format tidak dikenal: {fmt} (pilihan: {', '.join(FORMATS)})")
+
+    columns = _split_list(params, 'columns') or list(DEFAULT_COLUMNS)
+    chunk_hours = float(params.get('chunk_hours') or DEFAULT_CHUNK.total_seconds() / 3600)
+    if chunk_hours <= 0:
+        raise ValueError("chunk_hours harus > 0")
+
+    return {
+        'start': start,
+        'stop': stop,
+        'format': fmt,
+        'columns': columns,
+        'devices': _split_list(params, 'device'),
+        'chunk': timedelta(hours=chunk_hours),
+    }
+
+
+def iter_windows(start, stop, chunk=DEFAULT_CHUNK):
+    """Pecah [start, stop) menjadi jendela berukuran ``chunk``."""
+    cursor = start
+    while cursor < stop:
+        end = min(cursor + chunk, stop)
+        yield cursor, end
+        cursor = end
+
+
+def _normalize_frame(df, columns, devices):
+    """Buang kolom metadata Flux dan pastikan urutan/kelengkapan kolom."""
+    import pandas as pd
+
+    df = df.drop(columns=[c for c in ('result', 'table') if c in df.columns])
+    df = df.rename(columns={'_time': 'time'})
+    wanted = ['time'] + ([DEVICE_TAG] if devices else []) + list(columns)
+    for col in wanted:
+        if col not in df.columns:
+            df[col] = None
+    df = df[wanted].copy()
+    # Semua field numerik disimpan float64 supaya skema antar chunk konsisten
+    df[columns] = df[columns].apply(pd.to_numeric, errors='coerce').astype('float64')
+    return df
+
+
+def empty_frame(columns=None, devices=None):
+    """DataFrame tanpa baris dengan kolom/dtype yang sama seperti ``_normalize_frame``."""
+    import pandas as pd
+
+    columns = list(columns or DEFAULT_COLUMNS)
+    data = {'time': pd.Series(dtype='datetime64[ns, UTC]')}
+    if devices:
+        data[DEVICE_TAG] = pd.Series(dtype='object')
+    data.update({col: pd.Series(dtype='float64') for col in columns})
+    return pd.DataFrame(data)
+
+
+def iter_frames(start, stop, columns=None, devices=None, measurement=None,
+                chunk=DEFAULT_CHUNK, client=None):
+    """
+    Generator DataFrame dari InfluxDB, satu (atau beberapa) per jendela waktu.
+
+    Args:
+        client: InfluxDBClient yang sudah terbuka (opsional, dipakai di test)
+    """
+    columns = list(columns or DEFAULT_COLUMNS)
+    owns_client = client is None
+    if owns_client:
+        from influxdb_client import InfluxDBClient
+        client = InfluxDBClient(url=influx_client.url, token=influx_client.token,
+                                org=influx_client.org, timeout=60000)
+    try:
+        query_api = client.query_api()
+        for win_start, win_stop in iter_windows(start, stop, chunk):
+            query = build_query(win_start, win_stop, columns, devices, measurement)
+            for df in query_api.query_data_frame_stream(query, org=influx_client.org):
+                if df is None or df.empty:
+                    continue
+                yield _normalize_frame(df, columns, devices)
+    finally:
+        if owns_client:
+            client.close()
+
+
+# ----------------------------------------------------------
+# Writers: terima iterable DataFrame, hasilkan potongan bytes
+# ----------------------------------------------------------
+class _Sink:
+    """File-like untuk pyarrow; isi buffer diambil setiap selesai satu chunk."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_csv_bytes(frames):
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header, date_format='%Y-%m-%dT%H:%M:%S.%fZ').encode('utf-8')
+        header = False
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ValueError("Format parquet/arrow membutuhkan paket 'pyarrow' (pip install pyarrow)")
+
+
+def iter_parquet_bytes(frames, empty=None):
+    """
+    File Parquet (zstd) per chunk. Skema diambil dari frame pertama; tanpa
+    frame sama sekali ditulis file kosong dengan skema ``empty`` (default
+    ``empty_frame()``).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Sink()
+    writer = schema = None
+    for df in frames:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        writer.write_table(table.cast(schema))
+        yield sink.drain()
+    if writer is None:
+        schema = pa.Schema.from_pandas(empty if empty is not None else empty_frame(), preserve_index=False)
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    writer.close()
+    yield sink.drain()
+
+
+def iter_arrow_bytes(frames, empty=None):
+    """
+    Arrow IPC stream per chunk. Skema diambil dari frame pertama (writer IPC
+    tidak menyimpan skemanya); tanpa frame ditulis stream berisi skema saja.
+    """
+    import pyarrow as pa
+
+    sink = _Sink()
+    writer = schema = None
+    for df in frames:
+        batch = pa.RecordBatch.from_pandas(df, preserve_index=False)
+        if writer is None:
+            schema = batch.schema
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_batch(batch.cast(schema))
+        yield sink.drain()
+    if writer is None:
+        schema = pa.Schema.from_pandas(empty if empty is not None else empty_frame(), preserve_index=False)
+        writer = pa.ipc.new_stream(sink, schema)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(frames, fmt, columns=None, devices=None):
+    """
+    Pilih writer sesuai format. ``columns`` / ``devices`` (sama seperti
+    ``iter_frames``) menentukan skema file Parquet/Arrow jika hasil query kosong.
+    """
+    if fmt == 'csv':
+        return iter_csv_bytes(frames)
+    if fmt == 'csv.gz':
+        return gzip_stream(iter_csv_bytes(frames))
+    if fmt == 'parquet':
+        _require_pyarrow()
+        return iter_parquet_bytes(frames, empty_frame(columns, devices))
+    if fmt == 'arrow':
+        _require_pyarrow()
+        return iter_arrow_bytes(frames, empty_frame(columns, devices))
+    raise ValueError(f"Format tidak dikenal: {fmt} (pilihan: {', '.join(FORMATS)})")
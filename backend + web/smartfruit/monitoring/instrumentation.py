@@ -0,0 +1,296 @@
+"""
+Instrumentasi ringan: span waktu per tahap, histogram per endpoint/tahap
+dan export format Prometheus.
+
+Pemakaian di view::
+
+    with instrumentation.span('influx'):
+        write_api.write(...)
+
+``ServerTimingMiddleware`` mengumpulkan span selama satu request, menambah
+header ``Server-Timing`` (terbaca di DevTools browser) lalu mencatat durasi
+ke histogram dengan label endpoint (nama URL) dan tahap; durasi seluruh
+request tercatat sebagai tahap ``total``. Span di luar request (mis. worker
+MQTT) dicatat dengan endpoint ``background``.
+
+Histogram disimpan di memori proses (per worker gunicorn): bucket kumulatif
+untuk Prometheus plus sampel terbaru untuk p50/p95/p99. Memori proses
+(``/proc/<pid>/smaps_rollup``, Linux) ikut diekspor sebagai gauge. Endpoint
+``/metrics`` butuh token ``METRICS_TOKEN`` (header ``Authorization: Bearer``)
+atau user staff yang login.
+"""
+import bisect
+import hmac
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+
+# Batas atas bucket (detik), gaya Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Jumlah sampel terbaru per histogram untuk menghitung persentil
+SAMPLE_SIZE = 1024
+BACKGROUND = 'background'
+METRIC = 'smartfruit_stage_duration_seconds'
+
+# Span milik request yang sedang berjalan: list (tahap, detik) atau None
+_current = ContextVar('instrumentation_spans', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS, sample_size=SAMPLE_SIZE):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # + bucket +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self.samples.append(seconds)
+
+    def quantiles(self, qs=QUANTILES):
+        """Persentil dari sampel terbaru (nearest-rank); None jika belum ada data."""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in qs}
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(q * len(ordered)))] for q in qs}
+
+    def cumulative(self):
+        """[(le, jumlah kumulatif)] termasuk '+Inf'."""
+        with self._lock:
+            counts = list(self.counts)
+        result, total = [], 0
+        for le, n in zip(self.buckets + ('+Inf',), counts):
+            total += n
+            result.append((le, total))
+        return result
+
+
+_histograms = {}
+_requests = {}
+# Metrik tambahan dari modul lain: nama -> (tipe, help, fn() -> [(labels dict, nilai)])
+_collectors = {}
+_lock = threading.Lock()
+
+
+def register_collector(metric, kind, help_text, fn):
+    """Tambahkan metrik ``metric`` (gauge/counter) yang nilainya dibaca dari ``fn()`` saat /metrics."""
+    with _lock:
+        _collectors[metric] = (kind, help_text, fn)
+
+
+def observe(endpoint, stage, seconds):
+    key = (endpoint, stage)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(key, Histogram())
+    hist.observe(seconds)
+
+
+def count_request(endpoint, status_code):
+    key = (endpoint, str(status_code))
+    with _lock:
+        _requests[key] = _requests.get(key, 0) + 1
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _requests.clear()
+
+
+@contextmanager
+def span(stage, endpoint=BACKGROUND):
+    """Ukur durasi blok. Di dalam request dicatat oleh middleware, di luar langsung ke histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        spans = _current.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+        else:
+            observe(endpoint, stage, elapsed)
+
+
+def snapshot():
+    """Ringkasan semua histogram: {(endpoint, tahap): {'count', 'sum', 'p50', 'p95', 'p99'}}."""
+    with _lock:
+        items = list(_histograms.items())
+    result = {}
+    for key, hist in items:
+        q = hist.quantiles()
+        result[key] = {'count': hist.count, 'sum': hist.sum,
+                       **{f'p{int(k * 100)}': v for k, v in q.items()}}
+    return result
+
+
+# ----------------------------------------------------------
+# Memori proses
+# ----------------------------------------------------------
+MEMORY_KEYS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+
+def process_memory(pid='self'):
+    """
+    Ringkasan memori satu proses dari ``/proc/<pid>/smaps_rollup`` (byte).
+
+    ``Pss`` membagi halaman bersama rata ke semua proses pemakainya, jadi
+    jumlah PSS seluruh worker = memori sebenarnya; selisih dengan jumlah RSS
+    adalah halaman yang dibagi (mis. model hasil preload copy-on-write).
+    Return {} jika tidak tersedia (bukan Linux / proses sudah selesai).
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    result = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(':')
+        if key in MEMORY_KEYS:
+            result[key.lower()] = int(value.split()[0]) * 1024
+    return result
+
+
+def child_pids(pid):
+    """PID anak langsung (mis. worker gunicorn dari PID master)."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+# ----------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None:
+        return match.url_name or match.view_name or request.path
+    return 'unmatched'
+
+
+def _server_timing(spans, total):
+    # Tahap yang muncul berkali-kali (mis. di loop) dijumlahkan
+    merged = {}
+    for stage, seconds in spans:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    parts = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in merged.items()]
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts), merged
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        spans = []
+        token = _current.set(spans)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        endpoint = _endpoint(request)
+        header, merged = _server_timing(spans, total)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = header
+        for stage, seconds in merged.items():
+            observe(endpoint, stage, seconds)
+        observe(endpoint, 'total', total)
+        count_request(endpoint, response.status_code)
+        return response
+
+
+# ----------------------------------------------------------
+# Export Prometheus
+# ----------------------------------------------------------
+def _labels(**labels):
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in labels.items())
+    return '{' + body + '}'
+
+
+def render_prometheus():
+    with _lock:
+        histograms = sorted(_histograms.items())
+        requests = sorted(_requests.items())
+        collectors = dict(_collectors)
+
+    lines = [
+        f'# HELP {METRIC} Durasi per endpoint dan tahap (tahap total = seluruh request).',
+        f'# TYPE {METRIC} histogram',
+    ]
+    for (endpoint, stage), hist in histograms:
+        for le, n in hist.cumulative():
+            lines.append(f'{METRIC}_bucket{_labels(endpoint=endpoint, stage=stage, le=le)} {n}')
+        lines.append(f'{METRIC}_sum{_labels(endpoint=endpoint, stage=stage)} {hist.sum:.6f}')
+        lines.append(f'{METRIC}_count{_labels(endpoint=endpoint, stage=stage)} {hist.count}')
+
+    lines += [
+        f'# HELP {METRIC}_quantile Persentil dari {SAMPLE_SIZE} sampel terbaru.',
+        f'# TYPE {METRIC}_quantile gauge',
+    ]
+    for (endpoint, stage), hist in histograms:
+        for q, value in hist.quantiles().items():
+            if value is not None:
+                lines.append(f'{METRIC}_quantile{_labels(endpoint=endpoint, stage=stage, quantile=q)} {value:.6f}')
+
+    lines += [
+        '# HELP smartfruit_http_requests_total Jumlah request per endpoint dan status HTTP.',
+        '# TYPE smartfruit_http_requests_total counter',
+    ]
+    for (endpoint, code), n in requests:
+        lines.append(f'smartfruit_http_requests_total{_labels(endpoint=endpoint, code=code)} {n}')
+
+    for metric, (kind, help_text, fn) in sorted(collectors.items()):
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for labels, value in fn():
+            lines.append(f'{metric}{_labels(**labels) if labels else ""} {value}')
+
+    memory = process_memory()
+    if memory:
+        lines += [
+            '# HELP smartfruit_process_memory_bytes Memori worker ini (smaps_rollup).',
+            '# TYPE smartfruit_process_memory_bytes gauge',
+        ]
+        for kind, value in memory.items():
+            lines.append(f'smartfruit_process_memory_bytes{_labels(pid=os.getpid(), kind=kind)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _authorized(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer '):
+        return hmac.compare_digest(header[len('Bearer '):].strip(), token)
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def metrics_view(request):
+    if not _authorized(request):
+        response = HttpResponse('unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,151 @@
+"""
+Logging terstruktur dan asinkron.
+
+- ``JsonFormatter``: satu objek JSON per baris (``ts``, ``level``,
+  ``logger``, ``msg``, ``exc`` + field ``extra=...``).
+- ``QueueLogHandler``: request/worker hanya memasukkan record ke antrean;
+  format + tulis ke stdout dikerjakan thread ``QueueListener``. Jika antrean
+  penuh record dibuang (dihitung di ``dropped``), request tidak menunggu I/O.
+  Thread tidak ikut ``fork()``: proses anak (mis. worker gunicorn dengan
+  ``ML_PRELOAD=1``, yang mengonfigurasi logging di master) otomatis
+  mendapat antrean + listener baru.
+- ``SamplingFilter``: untuk log per reading; record di bawah ``level``
+  hanya diteruskan 1 dari ``every``.
+
+Konfigurasi Django ada di ``LOGGING`` (settings.py). Modul ini tanpa Django
+supaya ``mqtt_to_influx.py`` bisa memakai ``configure()``.
+"""
+import atexit
+import copy
+import functools
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:  # opsional
+    orjson = None
+
+# Atribut bawaan LogRecord; sisanya dianggap field ``extra``
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Teruskan semua record >= ``level``; di bawahnya hanya 1 dari ``every``."""
+
+    def __init__(self, every=100, level='INFO', name=''):
+        super().__init__(name)
+        self.every = max(1, int(every))
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        if next(self._counter) % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler antrean dengan listener sendiri (Python 3.11 belum bisa
+    ``queue_handler`` di dictConfig).
+
+    Args:
+        fmt: ``'json'`` atau ``'text'``.
+        stream: ``'stdout'`` atau ``'stderr'``.
+        queue_size: batas antrean; record dibuang saat penuh.
+    """
+
+    TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+    def __init__(self, fmt='json', stream='stdout', queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = logging.StreamHandler(sys.stderr if stream == 'stderr' else sys.stdout)
+        self.target.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(self.TEXT_FORMAT))
+        self.dropped = 0
+        self._start_listener()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=functools.partial(_restart_after_fork, weakref.ref(self)))
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+
+    def _after_fork(self):
+        # Anak hanya mewarisi antrean (berisi record milik induk), bukan thread listener-nya
+        if self.listener._thread is None:
+            return
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._start_listener()
+
+    def prepare(self, record):
+        # Hanya gabungkan pesan + traceback; format JSON dikerjakan listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Tulis sisa antrean lalu hentikan listener (dipanggil juga saat exit)."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def _restart_after_fork(ref):
+    handler = ref()
+    if handler is not None:
+        handler._after_fork()
+
+
+def configure(level='INFO', fmt='json', loggers=None):
+    """Pasang ``QueueLogHandler`` di root logger (untuk script di luar Django)."""
+    handler = QueueLogHandler(fmt=fmt)
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    for name, logger_level in (loggers or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+    return handler
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from monitoring import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Ukur jalur panas (AI agent, prediksi ML, status, history Influx, export CSV, ingest) "
+        "dan bandingkan median dengan baseline. Gagal (exit 1) jika ada yang lebih lambat dari "
+        "baseline melebihi threshold, atau jika baseline belum ada (kecuali --allow-missing-baseline)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Nama benchmark (default semua, lihat --list)")
+        parser.add_argument('--list', action='store_true', help="Tampilkan nama benchmark lalu keluar")
+        parser.add_argument('--rounds', type=int, help="Jumlah putaran tetap per benchmark")
+        parser.add_argument('--min-time', type=float, default=0.5, help="Lama minimal pengukuran per benchmark (detik)")
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE, help="File baseline JSON")
+        parser.add_argument('--threshold', type=float, default=settings.BENCHMARK_THRESHOLD,
+                            help="Batas kenaikan median, mis. 0.2 = 20%% lebih lambat")
+        parser.add_argument('--save', action='store_true', help="Simpan hasil sebagai baseline baru")
+        parser.add_argument('--allow-missing-baseline', action='store_true',
+                            help="Jangan gagal jika file baseline belum ada (hanya tampilkan hasil)")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, entry in sorted(benchmarks.REGISTRY.items()):
+                self.stdout.write(f"{name}{'  (database)' if entry['db'] else ''}")
+            return
+
+        names = options['names'] or sorted(benchmarks.REGISTRY)
+        unknown = [n for n in names if n not in benchmarks.REGISTRY]
+        if unknown:
+            raise CommandError(f"Benchmark tidak dikenal: {', '.join(unknown)}")
+
+        # Benchmark database memakai database test sementara
+        test_db = None
+        if any(benchmarks.REGISTRY[n]['db'] for n in names):
+            test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = benchmarks.run(names, rounds=options['rounds'], min_time=options['min_time'],
+                                     log=self.stdout.write)
+        finally:
+            if test_db is not None:
+                connection.creation.destroy_test_db(test_db, verbosity=0)
+
+        if options['save']:
+            baseline = benchmarks.load_baseline(options['baseline'])
+            baseline.update(results)
+            benchmarks.save_baseline(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS(f"Baseline disimpan ke {options['baseline']}"))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if not baseline:
+            message = f"Belum ada baseline di {options['baseline']}; jalankan dengan --save"
+            if not options['allow_missing_baseline']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+            return
+
+        regressed = []
+        for row in benchmarks.compare(results, baseline, options['threshold']):
+            if row['baseline'] is None:
+                self.stdout.write(f"{row['name']:<32} (baru, tidak ada baseline)")
+                continue
+            line = f"{row['name']:<32} {row['change'] * 100:+7.1f}% vs baseline"
+            if row['regressed']:
+                regressed.append(row['name'])
+                self.stdout.write(self.style.ERROR(line + "  REGRESI"))
+            else:
+                self.stdout.write(line)
+        if regressed:
+            raise CommandError(
+                f"{len(regressed)} benchmark lebih lambat > {options['threshold']:.0%}: {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS("Tidak ada regresi"))
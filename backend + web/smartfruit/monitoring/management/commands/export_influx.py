@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import influx_export
+
+
+class Command(BaseCommand):
+    help = "Export data historis InfluxDB ke CSV, CSV gzip, Parquet atau Arrow IPC"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Awal rentang (YYYY-MM-DD atau ISO datetime), default 24 jam terakhir")
+        parser.add_argument('--end', help="Akhir rentang (eksklusif), default sekarang")
+        parser.add_argument('--format', default='csv', choices=list(influx_export.FORMATS))
+        parser.add_argument('--columns', help="Field yang diekspor, dipisah koma")
+        parser.add_argument('--device', action='append', help="Filter device (boleh diulang)")
+        parser.add_argument('--chunk-hours', type=float, help="Ukuran jendela query dalam jam")
+        parser.add_argument('-o', '--output', help="File tujuan (default stdout)")
+
+    def handle(self, *args, **options):
+        params = {
+            'start': options['start'],
+            'end': options['end'],
+            'format': options['format'],
+            'columns': options['columns'],
+            'device': ','.join(options['device'] or []),
+            'chunk_hours': options['chunk_hours'],
+        }
+        try:
+            opts = influx_export.parse_params(params)
+            frames = influx_export.iter_frames(
+                opts['start'], opts['stop'], columns=opts['columns'],
+                devices=opts['devices'], chunk=opts['chunk'],
+            )
+            chunks = influx_export.iter_export(frames, opts['format'], opts['columns'], opts['devices'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        total = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                total += len(chunk)
+        finally:
+            if options['output']:
+                out.close()
+
+        self.stderr.write(
+            f"Export {opts['start']:%Y-%m-%d %H:%M} .. {opts['stop']:%Y-%m-%d %H:%M} "
+            f"({opts['format']}): {total} bytes"
+        )
@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import ml_runtime
+
+# (pickle model, scaler yang dilipat atau None)
+DEFAULT_MODELS = (
+    (os.path.join(ml_runtime.ML_PATH, 'model.pkl'), None),
+    (ml_runtime.ARTIFACTS['fruit_quality_joblib'], ml_runtime.ARTIFACTS['scaler']),
+    (ml_runtime.ARTIFACTS['fruit_quality'], None),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export model scikit-learn (pickle/joblib) ke format portabel .npz di samping file aslinya "
+        "(lihat ml/portable_forest.py), supaya bisa dimuat tanpa scikit-learn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help="File model (default: semua model aplikasi)")
+        parser.add_argument('--scaler', help="Scaler yang dilipat ke model (hanya untuk satu model)")
+        parser.add_argument('--check', action='store_true',
+                            help="Bandingkan predict_proba .npz dengan model asli pada data acak")
+
+    def handle(self, *args, **options):
+        import joblib
+
+        portable = ml_runtime._load('portable_forest')
+        if portable is None:
+            raise CommandError("ml/portable_forest.py tidak bisa dimuat")
+        if options['models']:
+            if options['scaler'] and len(options['models']) > 1:
+                raise CommandError("--scaler hanya untuk satu model")
+            models = [(path, options['scaler']) for path in options['models']]
+        else:
+            models = [(path, scaler) for path, scaler in DEFAULT_MODELS if os.path.exists(path)]
+
+        for path, scaler_path in models:
+            model = joblib.load(path)
+            scaler = joblib.load(scaler_path) if scaler_path else None
+            output = portable.sibling(path)
+            meta = portable.export(model, output, scaler=scaler, source_path=path, scaler_path=scaler_path)
+            line = f"{path} -> {output} ({meta['n_trees']} pohon, {os.path.getsize(output) / 1024:.0f} KB)"
+            if options['check']:
+                diff = self._max_diff(model, scaler, portable.load(output))
+                line += f", selisih proba maks {diff:.2e}"
+            self.stdout.write(line)
+
+    @staticmethod
+    def _max_diff(model, scaler, forest, rows=2000):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        if getattr(scaler, 'mean_', None) is not None:
+            X = rng.normal(scaler.mean_, scaler.scale_, size=(rows, len(scaler.mean_)))
+        else:
+            X = rng.uniform(0, 1500, size=(rows, model.n_features_in_))
+        if scaler is not None:
+            names = getattr(scaler, 'feature_names_in_', None)
+            if names is not None:  # scaler dilatih dengan DataFrame: hindari warning nama fitur
+                import pandas as pd
+
+                X = pd.DataFrame(X, columns=names)
+            expected = model.predict_proba(scaler.transform(X))
+        else:
+            expected = model.predict_proba(X)
+        return float(np.abs(expected - forest.predict_proba(X)).max())
@@ -0,0 +1,63 @@
+import json
+import os
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import instrumentation, ml_runtime
+
+COLUMNS = ('rss', 'pss', 'shared_clean', 'shared_dirty', 'private_clean', 'private_dirty')
+
+
+class Command(BaseCommand):
+    help = (
+        "Laporan memori per proses (RSS, PSS, shared, private) dari /proc/<pid>/smaps_rollup. "
+        "Dengan --pid: master gunicorn + semua worker-nya. Dengan --fork N: muat model di proses "
+        "ini (ml_runtime.preload) lalu fork N proses diam untuk melihat halaman model yang dibagi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pid', type=int, help="PID master gunicorn (default: proses ini)")
+        parser.add_argument('--fork', type=int, default=0, help="Jumlah worker tiruan yang di-fork setelah preload")
+        parser.add_argument('--json', action='store_true', help="Output JSON")
+
+    def handle(self, *args, **options):
+        if not instrumentation.process_memory():
+            raise CommandError("/proc/<pid>/smaps_rollup tidak tersedia (hanya Linux)")
+
+        children = []
+        if options['fork']:
+            ml_runtime.preload()
+            for _ in range(options['fork']):
+                pid = os.fork()
+                if pid == 0:
+                    # Worker tiruan: diam sampai dibunuh, tanpa menyentuh model
+                    while True:
+                        time.sleep(60)
+                children.append(pid)
+            time.sleep(0.2)
+
+        try:
+            master = options['pid'] or os.getpid()
+            pids = [master] + (children or instrumentation.child_pids(master))
+            rows = [{'pid': pid, **instrumentation.process_memory(pid)} for pid in pids]
+        finally:
+            for pid in children:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+
+        rows = [row for row in rows if len(row) > 1]
+        totals = {key: sum(row.get(key, 0) for row in rows) for key in COLUMNS}
+        # Jumlah RSS menghitung halaman bersama berulang kali; PSS tidak
+        saved = totals['rss'] - totals['pss']
+
+        if options['json']:
+            self.stdout.write(json.dumps({'processes': rows, 'total': totals, 'shared_saving': saved}, indent=2))
+            return
+
+        self.stdout.write(f"{'pid':>8} " + ' '.join(f'{c:>14}' for c in COLUMNS))
+        for row in rows:
+            self.stdout.write(f"{row['pid']:>8} " + ' '.join(f'{row.get(c, 0) / 2**20:>11.1f} MB' for c in COLUMNS))
+        self.stdout.write(f"{'total':>8} " + ' '.join(f'{totals[c] / 2**20:>11.1f} MB' for c in COLUMNS))
+        self.stdout.write(f"Halaman dibagi antar proses (total RSS - total PSS): {saved / 2**20:.1f} MB")
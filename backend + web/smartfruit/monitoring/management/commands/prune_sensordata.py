@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Arsipkan SensorData yang melewati masa retensi ke file CSV gzip per hari "
+        "lalu hapus per batch. Jalankan berkala (cron / scheduler), mis. setiap jam."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Masa retensi dalam hari (default settings.SENSORDATA_RETENTION_DAYS)")
+        parser.add_argument('--batch', type=int, help="Jumlah baris per batch hapus (default settings.SENSORDATA_PRUNE_BATCH)")
+        parser.add_argument('--dry-run', action='store_true', help="Hanya tampilkan jumlah baris yang akan diarsipkan")
+        parser.add_argument('--rebuild-counts', action='store_true', help="Hitung ulang tabel ringkasan DailyReadingCount")
+
+    def handle(self, *args, **options):
+        if options['rebuild_counts']:
+            retention.rebuild_counts()
+            self.stdout.write("Ringkasan DailyReadingCount dihitung ulang")
+
+        result = retention.archive_expired(
+            days=options['days'],
+            batch_size=options['batch'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        verb = "akan diarsipkan" if options['dry_run'] else "diarsipkan"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['archived']} baris sebelum {result['cutoff']:%Y-%m-%d %H:%M} {verb} "
+            f"({len(result['files'])} file)"
+        ))
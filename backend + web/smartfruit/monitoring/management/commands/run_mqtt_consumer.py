@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from monitoring.consumer import MQTTConsumer
+
+
+class Command(BaseCommand):
+    help = (
+        "Jalankan MQTT consumer: simpan data sensor ke SensorData per batch dan "
+        "broadcast ke WebSocket. Berhenti dengan Ctrl-C / SIGTERM (antrean dihabiskan dulu)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--broker', help="Host broker MQTT (default settings.MQTT_BROKER)")
+        parser.add_argument('--port', type=int, help="Port broker MQTT (default settings.MQTT_PORT)")
+        parser.add_argument('--topic', action='append', help="Topic yang di-subscribe, boleh wildcard (boleh diulang)")
+        parser.add_argument('--client-id', help="Client id MQTT untuk persistent session")
+        parser.add_argument('--batch-size', type=int, help="Maksimal pesan per bulk insert")
+        parser.add_argument('--flush-interval', type=float, help="Maksimal detik menunggu sebelum batch ditulis")
+        parser.add_argument('--stats-interval', type=float, default=60, help="Interval log statistik (detik)")
+
+    def handle(self, *args, **options):
+        consumer = MQTTConsumer(
+            broker=options['broker'],
+            port=options['port'],
+            topics=options['topic'],
+            client_id=options['client_id'],
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+        )
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        consumer.start()
+        self.stdout.write(f"MQTT consumer berjalan ({consumer.broker}:{consumer.port}, batch {consumer.batch_size})")
+        try:
+            while not stop.wait(options['stats_interval']):
+                self.stdout.write(f"Statistik: {consumer.stats}, antrean={consumer.queue.qsize()}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write("Menghentikan consumer, menyimpan sisa antrean...")
+            consumer.stop()
+            self.stdout.write(self.style.SUCCESS(f"Selesai: {consumer.stats}"))
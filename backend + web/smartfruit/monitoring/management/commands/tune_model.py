@@ -0,0 +1,69 @@
+import json
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring import ml_runtime
+
+
+class Command(BaseCommand):
+    help = (
+        "Hyperparameter search RandomForest (cross-validation paralel, hasil fold di-cache per hash "
+        "dataset + parameter, lihat ml/tuning.py) lalu tampilkan akurasi vs latensi. Default dataset "
+        "ML Service; --save menyimpan pilihan ke ml/model_params.json dan melatih ulang model.pkl."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help="Dataset CSV (default dataset ML Service)")
+        parser.add_argument('--features', help="Kolom fitur dipisah koma, nama/alias ml/features.py "
+                                               "(default urutan kanonik)")
+        parser.add_argument('--target', help="Kolom label (default status / Label)")
+        parser.add_argument('--grid', help='Grid JSON, mis. \'{"n_estimators": [10, 50], "max_depth": [null, 6]}\'')
+        parser.add_argument('--folds', type=int, default=5, help="Jumlah fold cross-validation")
+        parser.add_argument('--jobs', type=int, help="Jumlah proses (default semua core)")
+        parser.add_argument('--no-cache', action='store_true', help="Jangan baca/tulis cache hasil fold")
+        parser.add_argument('--tolerance', type=float, default=0.01,
+                            help="Penurunan akurasi yang diterima demi model lebih cepat (0.01 = 1%%)")
+        parser.add_argument('--limit', type=int, help="Tampilkan hanya N kombinasi teratas")
+        parser.add_argument('--json', action='store_true', help="Output JSON")
+        parser.add_argument('--save', action='store_true',
+                            help="Simpan parameter pilihan dan latih ulang model ML Service")
+
+    def handle(self, *args, **options):
+        import pandas as pd
+
+        tuning = ml_runtime._load('tuning')
+        ml = ml_runtime.ml_service()
+        if tuning is None or ml is None:
+            raise CommandError("ml/tuning.py / ml_service tidak bisa dimuat")
+        path = options['csv'] or ml.DATASET_PATH
+        if options['save'] and os.path.abspath(path) != os.path.abspath(ml.DATASET_PATH):
+            raise CommandError("--save hanya untuk dataset ML Service")
+        schema = ml.features
+        try:
+            order = schema.resolve(options['features'].split(',')) if options['features'] else schema.FEATURES
+            grid = json.loads(options['grid']) if options['grid'] else None
+            df = pd.read_csv(path)
+            X = schema.from_frame(df, order)
+            y = df[options['target']].to_numpy() if options['target'] else schema.labels(df)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Dataset / grid tidak valid: {e}")
+
+        result = tuning.search(X, y, grid=grid, n_splits=options['folds'], jobs=options['jobs'],
+                               cache_dir=None if options['no_cache'] else tuning.CACHE_DIR)
+        chosen = tuning.select(result['results'], options['tolerance'])
+        if options['json']:
+            self.stdout.write(json.dumps({**result, 'selected': chosen}, indent=2))
+        else:
+            self.stdout.write(tuning.report(result, options['tolerance'], options['limit']))
+
+        if options['save']:
+            tmp = f'{ml.PARAMS_PATH}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({**chosen, 'dataset_sha256': result['dataset']['sha256'],
+                           'created_at': datetime.now().isoformat()}, f, indent=2)
+            os.replace(tmp, ml.PARAMS_PATH)
+            if not ml.ml_service.train_model(chosen['params']):
+                raise CommandError("Training ulang gagal, lihat log ML Service")
+            self.stdout.write(f"💾 {ml.PARAMS_PATH} disimpan, model dilatih ulang dengan {chosen['params']}")
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0007_contactmessage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='sensordata',
+            options={'get_latest_by': 'timestamp'},
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['-timestamp'], name='sensordata_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['status', '-timestamp'], name='sensordata_status_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['jenis_buah', '-timestamp'], name='sensordata_jenis_ts_idx'),
+        ),
+    ]
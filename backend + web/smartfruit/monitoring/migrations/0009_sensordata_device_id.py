@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0008_sensordata_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensordata',
+            name='device_id',
+            field=models.CharField(default='default', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['device_id', '-timestamp'], name='sensordata_device_ts_idx'),
+        ),
+    ]
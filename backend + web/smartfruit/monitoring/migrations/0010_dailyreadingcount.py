@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:48
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_counts(apps, schema_editor):
+    SensorData = apps.get_model('monitoring', 'SensorData')
+    DailyReadingCount = apps.get_model('monitoring', 'DailyReadingCount')
+    rows = (SensorData.objects.annotate(day=TruncDate('timestamp'))
+            .values('day', 'status').annotate(n=Count('id')))
+    DailyReadingCount.objects.bulk_create([
+        DailyReadingCount(day=row['day'], status=row['status'], count=row['n']) for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_sensordata_device_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReadingCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='dailyreadingcount_day_status_uniq')],
+            },
+        ),
+        migrations.RunPython(build_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0010_dailyreadingcount'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sensordata',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
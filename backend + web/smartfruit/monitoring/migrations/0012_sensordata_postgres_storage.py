@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations
+
+TABLE = 'monitoring_sensordata'
+
+
+def setup_postgres_storage(apps, schema_editor):
+    """
+    PostgreSQL saja (SQLite dilewati):
+    - SENSORDATA_TIMESCALE=1: jadikan tabel hypertable TimescaleDB dengan chunk harian.
+      Hypertable mensyaratkan kolom waktu ada di setiap unique index, jadi
+      primary key diganti menjadi (id, timestamp).
+    - Selain itu: index BRIN pada timestamp (kecil, cocok untuk data append-only).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    if getattr(settings, 'SENSORDATA_TIMESCALE', False):
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+        schema_editor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {TABLE}_pkey")
+        schema_editor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, timestamp)")
+        schema_editor.execute(
+            f"SELECT create_hypertable('{TABLE}', 'timestamp', "
+            "chunk_time_interval => INTERVAL '1 day', "
+            "migrate_data => true, if_not_exists => true)"
+        )
+    else:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS sensordata_ts_brin ON {TABLE} USING BRIN (timestamp)"
+        )
+
+
+def teardown_postgres_storage(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS sensordata_ts_brin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0011_sensordata_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(setup_postgres_storage, teardown_postgres_storage),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+
+
+def drop_duplicates(apps, schema_editor):
+    """
+    Hapus duplikat (device_id, timestamp) lama, simpan baris dengan pk terkecil,
+    lalu hitung ulang ringkasan DailyReadingCount (0010) untuk hari yang terkena.
+    """
+    SensorData = apps.get_model('monitoring', 'SensorData')
+    DailyReadingCount = apps.get_model('monitoring', 'DailyReadingCount')
+    dupes = (SensorData.objects.values('device_id', 'timestamp')
+             .annotate(n=Count('id'), keep=Min('id')).filter(n__gt=1))
+    days = set()
+    for row in list(dupes):
+        extra = (SensorData.objects.filter(device_id=row['device_id'], timestamp=row['timestamp'])
+                 .exclude(pk=row['keep']))
+        days.update(extra.annotate(day=TruncDate('timestamp')).values_list('day', flat=True))
+        extra.delete()
+    if not days:
+        return
+    # Sama seperti build_counts di 0010, hanya untuk hari yang berubah
+    rows = (SensorData.objects.annotate(day=TruncDate('timestamp')).filter(day__in=days)
+            .values('day', 'status').annotate(n=Count('id')))
+    DailyReadingCount.objects.filter(day__in=days).delete()
+    DailyReadingCount.objects.bulk_create([
+        DailyReadingCount(day=row['day'], status=row['status'], count=row['n']) for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0012_sensordata_postgres_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='sensordata',
+            name='sensordata_device_ts_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='sensordata',
+            constraint=models.UniqueConstraint(fields=('device_id', 'timestamp'), name='sensordata_device_ts_uniq'),
+        ),
+    ]
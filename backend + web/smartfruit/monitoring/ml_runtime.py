@@ -0,0 +1,185 @@
+"""
+Akses lazy ke ML Service dan AI Agent (folder ``ml/``).
+
+``ml_service`` mengimpor pandas + scikit-learn dan memuat (atau melatih)
+model saat diimport. Karena itu modul ML tidak diimport saat URL Django
+dimuat; import terjadi pada pemakaian pertama lewat ``ml_service()`` /
+``ai_agent()``, dan hasilnya di-cache per proses. Jika import gagal, hasilnya
+None dan endpoint ML membalas 503.
+
+``warm_up()`` memuat keduanya lebih awal (dipanggil hook gunicorn
+``post_worker_init`` / asgi.py jika ``ML_WARMUP`` aktif), supaya request
+pertama tidak membayar biaya load model.
+
+File model lain (``ARTIFACTS``) dibaca lewat ``artifact(name)``: dimuat sekali
+per proses dan dimuat ulang hanya jika file berubah (mtime). Model dibagi
+antar worker hanya lewat preload: dengan ``ML_PRELOAD=1`` gunicorn memuat
+aplikasi + ``preload()`` di master sebelum fork, lalu ``gc.freeze()``
+supaya halaman model tetap dibagi copy-on-write (lihat gunicorn.conf.py).
+Tanpa preload tiap worker memegang salinan model sendiri.
+
+Jika ada file portabel di samping pickle (``model.pkl`` -> ``model.npz``,
+lihat ml/portable_forest.py) dan ``ML_RUNTIME`` bukan ``sklearn``,
+``artifact()`` memuat ``ForestModel`` NumPy tanpa mengimport scikit-learn.
+"""
+import gc
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ML_PATH = os.path.join(settings.BASE_DIR, 'ml')
+
+# Nama -> path file model (joblib.load juga membaca pickle biasa)
+ARTIFACTS = {
+    'fruit_quality': os.path.join(settings.BASE_DIR, 'monitoring', 'fruit_quality_model.pkl'),
+    'fruit_quality_joblib': os.path.join(settings.BASE_DIR, 'models', 'fruit_quality_model.joblib'),
+    'scaler': os.path.join(settings.BASE_DIR, 'models', 'scaler.joblib'),
+}
+# Model -> scaler yang dilipat ke file portabelnya (ikut dicek ``choose()``)
+SCALERS = {'fruit_quality_joblib': 'scaler'}
+
+_modules = {}
+_artifacts = {}  # nama -> (mtime_ns, objek)
+_lock = threading.Lock()
+
+
+def _load(name):
+    if name in _modules:
+        return _modules[name]
+    with _lock:
+        if name not in _modules:
+            if ML_PATH not in sys.path:
+                sys.path.insert(0, ML_PATH)
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(name)
+                logger.info("✅ %s dimuat dalam %.2f s", name, time.perf_counter() - start)
+                if hasattr(module, 'get_cache_stats'):
+                    _register_cache_metrics(module.get_cache_stats)
+            except Exception as e:
+                module = None
+                logger.warning("⚠️ %s tidak tersedia: %s", name, e)
+            _modules[name] = module
+    return _modules[name]
+
+
+def _register_cache_metrics(stats):
+    from . import instrumentation
+
+    events = ('hits', 'misses', 'evictions', 'invalidations')
+    instrumentation.register_collector(
+        'smartfruit_ml_cache_events_total', 'counter', 'Hit/miss/eviksi/invalidasi cache prediksi ML.',
+        lambda: [({'event': e}, stats()[e]) for e in events])
+    instrumentation.register_collector(
+        'smartfruit_ml_cache_entries', 'gauge', 'Jumlah entri cache prediksi ML.',
+        lambda: [({}, stats()['size'])])
+    instrumentation.register_collector(
+        'smartfruit_ml_cache_hit_ratio', 'gauge', 'Rasio hit cache prediksi ML sejak proses mulai.',
+        lambda: [({}, round(stats()['hit_rate'], 6))])
+
+
+def ml_service():
+    """Modul ``ml_service`` (import pertama memuat model), atau None jika gagal."""
+    return _load('ml_service')
+
+
+def ai_agent():
+    """Modul ``ai_agent``, atau None jika gagal."""
+    return _load('ai_agent')
+
+
+def loaded():
+    """Nama modul ML yang sudah dimuat proses ini (untuk test / diagnosa)."""
+    return sorted(name for name, module in _modules.items() if module is not None)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def artifact(name):
+    """
+    Model ``ARTIFACTS[name]`` yang sudah dimuat, atau None jika file tidak ada
+    / gagal dimuat. ``stat()`` pickle + ``.npz`` (+ scaler di ``SCALERS``)
+    per panggilan untuk mendeteksi file baru; pilihan pickle/portabel dihitung
+    ulang hanya saat salah satunya berubah.
+    """
+    source = ARTIFACTS[name]
+    runtime = getattr(settings, 'ML_RUNTIME', 'auto')
+    portable = _load('portable_forest') if runtime != 'sklearn' else None
+    sibling = portable.sibling(source) if portable else None
+    scaler = ARTIFACTS[SCALERS[name]] if portable and name in SCALERS else None
+    key = (runtime, _mtime(source), _mtime(sibling) if sibling else None, _mtime(scaler) if scaler else None)
+    if key[1:3] == (None, None):
+        return None
+    cached = _artifacts.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _lock:
+        cached = _artifacts.get(name)
+        if cached is None or cached[0] != key:
+            path = (portable.choose(source, runtime, scaler) if portable else None) or source
+            try:
+                if path != source:
+                    obj = portable.load(path)
+                else:
+                    import joblib
+
+                    obj = joblib.load(path)
+                logger.info("✅ Model %s dimuat dari %s", name, path)
+            except Exception as e:
+                obj = None
+                logger.error("❌ Gagal memuat model %s: %s", name, e)
+            cached = _artifacts[name] = (key, obj)
+    return cached[1]
+
+
+def warm_up(background=False):
+    """
+    Muat ML Service, AI Agent dan pipeline kualitas buah (inference.py), lalu
+    jalankan satu prediksi dummy (tanpa menyentuh buffer adaptive learning).
+    ``background=True`` menjalankannya di thread supaya worker langsung
+    menerima request.
+    """
+    if background:
+        thread = threading.Thread(target=warm_up, name='ml-warmup', daemon=True)
+        thread.start()
+        return thread
+    from . import inference
+
+    start = time.perf_counter()
+    ai_agent()
+    inference.get_pipeline()
+    ml = ml_service()
+    if ml is not None:
+        try:
+            ml.predict_status(0.0, 0.0, 0.0, 0.0, 0.0)
+        except Exception as e:
+            logger.warning("⚠️ Warm-up prediksi gagal: %s", e)
+    logger.info("🔥 ML warm-up selesai dalam %.2f s", time.perf_counter() - start)
+    return None
+
+
+def preload():
+    """
+    Muat semua modul ML + ``ARTIFACTS`` lalu bekukan objek yang ada ke
+    generasi permanen GC. Dipanggil di master gunicorn sebelum fork: GC di
+    worker tidak lagi menulis header objek model, jadi halamannya tetap
+    dibagi copy-on-write.
+    """
+    warm_up()
+    result = {name: artifact(name) is not None for name in ARTIFACTS}
+    gc.collect()
+    gc.freeze()
+    logger.info("📦 Model dimuat sebelum fork: %s", result)
+    return result
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class DeviceToken(models.Model):
     token = models.CharField(max_length=256, unique=True)
@@ -7,8 +8,19 @@ class DeviceToken(models.Model):
     def __str__(self):
         return self.token
 
+class SensorDataQuerySet(models.QuerySet):
+    def latest_reading(self):
+        """Data terbaru berdasarkan timestamp (bukan pk), None jika kosong."""
+        return self.order_by('-timestamp').first()
+
+    def for_device(self, device_id):
+        """Filter per device; None/kosong = semua device."""
+        return self.filter(device_id=device_id) if device_id else self
+
+
 class SensorData(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # default (bukan auto_now_add) supaya waktu terima tetap terjaga saat ditulis lewat buffer/bulk_create
+    timestamp = models.DateTimeField(default=timezone.now)
     temperature = models.FloatField()
     humidity = models.FloatField()
     mq2 = models.FloatField(verbose_name="Gas MQ2", help_text="Gas umum (ppm)", null=True, blank=True)
@@ -16,11 +28,47 @@ class SensorData(models.Model):
     mq135 = models.FloatField(verbose_name="Gas MQ135", help_text="Amonia/CO₂ (ppm)", null=True, blank=True)
     status = models.CharField(max_length=20, default="LAYAK")
     jenis_buah = models.CharField(max_length=50, default="UNKNOWN")
+    device_id = models.CharField(max_length=64, default="default")
+
+    objects = SensorDataQuerySet.as_manager()
+
+    class Meta:
+        get_latest_by = 'timestamp'
+        indexes = [
+            models.Index(fields=['-timestamp'], name='sensordata_ts_idx'),
+            models.Index(fields=['status', '-timestamp'], name='sensordata_status_ts_idx'),
+            models.Index(fields=['jenis_buah', '-timestamp'], name='sensordata_jenis_ts_idx'),
+        ]
+        constraints = [
+            # Satu reading per device per waktu ukur: kiriman ulang tidak menjadi duplikat.
+            # Index unik ini juga melayani query per device urut waktu.
+            models.UniqueConstraint(fields=['device_id', 'timestamp'], name='sensordata_device_ts_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.timestamp} - Temp: {self.temperature}°C, Humidity: {self.humidity}%, Status: {self.status}, Jenis Buah: {self.jenis_buah}"
 
 
+class DailyReadingCount(models.Model):
+    """
+    Ringkasan jumlah SensorData per hari & status.
+
+    Dipelihara saat insert/archival sehingga halaman history tidak perlu
+    COUNT(*) atas seluruh tabel.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='dailyreadingcount_day_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
 class SensorConfig(models.Model):
     name = models.CharField(max_length=100)
     sensor_type = models.CharField(max_length=50, help_text="e.g. MQ2, MQ3, MQ135, DHT11")
@@ -0,0 +1,223 @@
+"""
+Notifikasi push FCM.
+
+- ``notify()`` dipanggil dari jalur ingest. Alert yang sama (device + kondisi)
+  hanya dikirim sekali per ``NOTIFY_COOLDOWN`` detik; sisanya dibuang.
+- Alert dimasukkan ke antrean dan dikirim oleh satu thread worker, sehingga
+  request ESP32 tidak menunggu HTTPS ke FCM.
+- Token dikirim multicast (``registration_ids``) per batch maksimal
+  ``FCM_BATCH_SIZE`` (batas FCM 1000) lewat satu ``requests.Session`` yang
+  koneksinya dipakai ulang.
+- Token yang dilaporkan FCM tidak valid dihapus dari ``DeviceToken``;
+  ``registration_id`` kanonik menggantikan token lama.
+"""
+import logging
+import queue
+import threading
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from requests.adapters import HTTPAdapter
+
+from .models import DeviceToken
+
+logger = logging.getLogger(__name__)
+
+FCM_MAX_BATCH = 1000
+# Error FCM yang berarti token tidak akan pernah valid lagi
+INVALID_TOKEN_ERRORS = {'NotRegistered', 'InvalidRegistration', 'MismatchSenderId'}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Session bersama dengan connection pool (keep-alive ke FCM)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=2)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def send_multicast(tokens, title, body, data=None, session=None):
+    """
+    Kirim satu notifikasi ke banyak token.
+
+    Returns:
+        dict: {'success', 'failure', 'requests', 'invalid': [token],
+               'canonical': {token_lama: token_baru}}
+    """
+    tokens = list(dict.fromkeys(t for t in tokens if t))
+    session = session or get_session()
+    batch_size = max(1, min(int(_setting('FCM_BATCH_SIZE', FCM_MAX_BATCH)), FCM_MAX_BATCH))
+    headers = {
+        'Authorization': 'key=' + _setting('FCM_SERVER_KEY', ''),
+        'Content-Type': 'application/json',
+    }
+    result = {'success': 0, 'failure': 0, 'requests': 0, 'invalid': [], 'canonical': {}}
+
+    for batch in _batches(tokens, batch_size):
+        payload = {
+            'registration_ids': batch,
+            'notification': {'title': title, 'body': body},
+        }
+        if data:
+            payload['data'] = data
+        result['requests'] += 1
+        try:
+            r = session.post(_setting('FCM_URL', 'https://fcm.googleapis.com/fcm/send'),
+                             json=payload, headers=headers,
+                             timeout=_setting('FCM_TIMEOUT', (3.05, 10)))
+            r.raise_for_status()
+            response = r.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.error("Gagal kirim FCM (%d token): %s", len(batch), e)
+            result['failure'] += len(batch)
+            continue
+
+        # results[i] berurutan sesuai registration_ids[i]
+        for token, item in zip(batch, response.get('results', [])):
+            error = item.get('error')
+            if error:
+                result['failure'] += 1
+                if error in INVALID_TOKEN_ERRORS:
+                    result['invalid'].append(token)
+            else:
+                result['success'] += 1
+                if item.get('registration_id'):
+                    result['canonical'][token] = item['registration_id']
+    return result
+
+
+def prune_tokens(result):
+    """Hapus token tidak valid & ganti token dengan registration_id kanonik."""
+    removed = 0
+    if result['invalid']:
+        removed, _ = DeviceToken.objects.filter(token__in=result['invalid']).delete()
+    for old, new in result['canonical'].items():
+        if DeviceToken.objects.filter(token=new).exists():
+            DeviceToken.objects.filter(token=old).delete()
+        else:
+            DeviceToken.objects.filter(token=old).update(token=new)
+    return removed
+
+
+def dispatch(alert):
+    """Kirim satu alert ke semua token terdaftar lalu bersihkan token tidak valid."""
+    tokens = list(DeviceToken.objects.values_list('token', flat=True))
+    if not tokens:
+        return None
+    result = send_multicast(tokens, alert['title'], alert['body'], alert.get('data'))
+    prune_tokens(result)
+    logger.info("FCM %s: %s sukses, %s gagal, %d token dihapus",
+                alert.get('key'), result['success'], result['failure'], len(result['invalid']))
+    return result
+
+
+# ----------------------------------------------------------
+# Dedup / cooldown
+# ----------------------------------------------------------
+def _cooldown_key(device_id, condition):
+    return f'notify:{device_id or "*"}:{condition or "*"}'
+
+
+def acquire_cooldown(device_id, condition, cooldown=None):
+    """True jika alert boleh dikirim (belum ada alert sama dalam periode cooldown)."""
+    cooldown = cooldown if cooldown is not None else _setting('NOTIFY_COOLDOWN', 300)
+    if cooldown <= 0:
+        return True
+    # cache.add atomik: hanya pemanggil pertama yang berhasil
+    return cache.add(_cooldown_key(device_id, condition), 1, cooldown)
+
+
+def reset_cooldown(device_id, condition):
+    cache.delete(_cooldown_key(device_id, condition))
+
+
+# ----------------------------------------------------------
+# Worker
+# ----------------------------------------------------------
+class NotificationWorker:
+    def __init__(self, maxsize=1000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='fcm-worker', daemon=True)
+                self._thread.start()
+
+    def submit(self, alert):
+        try:
+            self.queue.put_nowait(alert)
+            return True
+        except queue.Full:
+            logger.warning("Antrean notifikasi penuh, alert %s dibuang", alert.get('key'))
+            return False
+
+    def _run(self):
+        while True:
+            alert = self.queue.get()
+            try:
+                dispatch(alert)
+            except Exception as e:
+                logger.exception("Worker notifikasi: %s", e)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = NotificationWorker(maxsize=_setting('NOTIFY_QUEUE_SIZE', 1000))
+        return _worker
+
+
+def notify(title, body, device_id=None, condition=None, data=None, cooldown=None):
+    """
+    Jadwalkan notifikasi push ke semua token.
+
+    Returns:
+        bool: False jika alert ditahan cooldown atau antrean penuh.
+    """
+    if not acquire_cooldown(device_id, condition, cooldown):
+        return False
+    alert = {
+        'key': _cooldown_key(device_id, condition),
+        'title': title,
+        'body': body,
+        'data': data,
+    }
+    if not _setting('NOTIFY_ASYNC', True):
+        dispatch(alert)
+        return True
+    worker = get_worker()
+    worker.start()
+    return worker.submit(alert)
@@ -0,0 +1,43 @@
+"""
+Parser DRF untuk payload sensor non-JSON (lihat monitoring/payloads.py).
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, FormParser, JSONParser, MultiPartParser
+
+from . import payloads
+
+
+class _PayloadParser(BaseParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return payloads.decode(stream.read(), self.media_type)
+        except payloads.PayloadError as e:
+            raise ParseError(str(e))
+
+
+class SensorFrameParser(_PayloadParser):
+    media_type = payloads.FRAME
+
+
+class OctetStreamFrameParser(_PayloadParser):
+    """Frame biner dari client yang hanya bisa mengirim application/octet-stream."""
+    media_type = 'application/octet-stream'
+
+
+class CBORParser(_PayloadParser):
+    media_type = payloads.CBOR
+
+
+class MessagePackParser(_PayloadParser):
+    media_type = payloads.MSGPACK
+
+
+class XMessagePackParser(_PayloadParser):
+    media_type = 'application/x-msgpack'
+
+
+# Parser untuk endpoint ingest sensor: JSON/form seperti biasa + format ringkas
+SENSOR_PARSERS = [
+    JSONParser, FormParser, MultiPartParser,
+    SensorFrameParser, OctetStreamFrameParser, CBORParser, MessagePackParser, XMessagePackParser,
+]
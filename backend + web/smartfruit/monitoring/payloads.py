@@ -0,0 +1,189 @@
+"""
+Decoder payload sensor: JSON, frame biner ringkas, CBOR dan MessagePack.
+
+Modul ini tidak bergantung pada Django supaya bisa dipakai juga oleh
+bridge MQTT (``mqtt_to_influx.py``).
+
+Frame biner v1 (little-endian, 18 byte + device id opsional)::
+
+    offset  tipe    field
+    0       uint8   versi (= 1)
+    1       int8    status (0 / 1, -1 = tidak ada)
+    2       int16   suhu x 100        (°C)
+    4       uint16  kelembapan x 100  (%)
+    6       uint16  mq2 x 10
+    8       uint16  mq3 x 10
+    10      uint16  mq135 x 10
+    12      int16   skorTotal x 100
+    14      uint32  timestamp epoch detik (0 = tidak ada)
+    18..    ascii   device id (0-64 byte, opsional)
+
+Content-Type: ``application/vnd.smartfruit.frame``. Untuk MQTT (tanpa
+content type) format dikenali dari byte pertama, lihat ``sniff()``.
+"""
+import json
+import struct
+
+try:
+    import orjson
+except ImportError:  # opsional
+    orjson = None
+
+try:
+    import cbor2
+except ImportError:  # opsional
+    cbor2 = None
+
+try:
+    import msgpack
+except ImportError:  # opsional
+    msgpack = None
+
+JSON = 'application/json'
+FRAME = 'application/vnd.smartfruit.frame'
+CBOR = 'application/cbor'
+MSGPACK = 'application/msgpack'
+
+FRAME_VERSION = 1
+FRAME_STRUCT = struct.Struct('<BbhHHHHhI')
+MAX_DEVICE_ID = 64
+# (field, skala) sesuai urutan di frame setelah versi & status
+FRAME_FIELDS = (('suhu', 100), ('kelembapan', 100), ('mq2', 10), ('mq3', 10), ('mq135', 10), ('skorTotal', 100))
+# Nama lain yang dipakai endpoint lama (update_sensor, MQTT consumer)
+ALIASES = {'suhu': 'temperature', 'kelembapan': 'humidity'}
+
+MEDIA_ALIASES = {
+    'application/octet-stream': FRAME,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'text/json': JSON,
+}
+
+
+class PayloadError(ValueError):
+    """Payload tidak bisa didecode (format salah atau decoder opsional tidak terpasang)."""
+
+
+# ----------------------------------------------------------
+# Frame biner
+# ----------------------------------------------------------
+def _first(data, *keys):
+    for key in keys:
+        if data.get(key) is not None:
+            return data[key]
+    return 0
+
+
+def encode_frame(data):
+    """Encode dict reading (nama field JSON) menjadi frame biner v1."""
+    status = data.get('status')
+    values = []
+    for name, scale in FRAME_FIELDS:
+        values.append(int(round(float(_first(data, name, ALIASES.get(name, name))) * scale)))
+    try:
+        frame = FRAME_STRUCT.pack(
+            FRAME_VERSION, -1 if status is None else int(status), *values, int(data.get('ts') or 0))
+    except struct.error as e:
+        raise PayloadError(f"Nilai di luar jangkauan frame: {e}")
+    device = (data.get('device_id') or '').encode('ascii')
+    return frame + device[:MAX_DEVICE_ID]
+
+
+def decode_frame(raw):
+    if len(raw) < FRAME_STRUCT.size:
+        raise PayloadError(f"Frame terlalu pendek ({len(raw)} byte)")
+    version, status, *values, ts = FRAME_STRUCT.unpack_from(raw)
+    if version != FRAME_VERSION:
+        raise PayloadError(f"Versi frame tidak dikenal: {version}")
+
+    data = {}
+    for (name, scale), value in zip(FRAME_FIELDS, values):
+        data[name] = value / scale
+        if name in ALIASES:
+            data[ALIASES[name]] = data[name]
+    if status >= 0:
+        data['status'] = status
+    if ts:
+        data['ts'] = ts
+    device = raw[FRAME_STRUCT.size:FRAME_STRUCT.size + MAX_DEVICE_ID]
+    if device:
+        try:
+            data['device_id'] = device.decode('ascii')
+        except UnicodeDecodeError:
+            raise PayloadError("Device id frame bukan ASCII")
+    return data
+
+
+# ----------------------------------------------------------
+# Format lain
+# ----------------------------------------------------------
+def loads_json(raw):
+    try:
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError as e:
+        raise PayloadError(f"JSON tidak valid: {e}")
+
+
+def _cbor_loads(raw):
+    if cbor2 is None:
+        raise PayloadError("Payload CBOR membutuhkan paket cbor2")
+    try:
+        return cbor2.loads(raw)
+    except Exception as e:
+        raise PayloadError(f"CBOR tidak valid: {e}")
+
+
+def _msgpack_loads(raw):
+    if msgpack is None:
+        raise PayloadError("Payload MessagePack membutuhkan paket msgpack")
+    try:
+        return msgpack.unpackb(raw, raw=False)
+    except Exception as e:
+        raise PayloadError(f"MessagePack tidak valid: {e}")
+
+
+DECODERS = {
+    JSON: loads_json,
+    FRAME: decode_frame,
+    CBOR: _cbor_loads,
+    MSGPACK: _msgpack_loads,
+}
+
+
+def media_type(content_type):
+    """Normalisasi Content-Type ke salah satu kunci DECODERS (atau None)."""
+    if not content_type:
+        return None
+    media = content_type.split(';', 1)[0].strip().lower()
+    media = MEDIA_ALIASES.get(media, media)
+    return media if media in DECODERS else None
+
+
+def sniff(raw):
+    """Tebak format dari byte pertama (untuk MQTT yang tidak punya content type)."""
+    if not raw:
+        raise PayloadError("Payload kosong")
+    first = raw[0]
+    if first == FRAME_VERSION:
+        return FRAME
+    if 0xA0 <= first <= 0xBF:      # CBOR map
+        return CBOR
+    if 0x80 <= first <= 0x8F or first in (0xDE, 0xDF):  # MessagePack map
+        return MSGPACK
+    return JSON
+
+
+def decode(raw, content_type=None):
+    """
+    Decode payload menjadi dict.
+
+    ``content_type`` yang tidak dikenal (mis. text/plain dari client lama)
+    ditangani dengan ``sniff()``.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    media = media_type(content_type) or sniff(raw)
+    data = DECODERS[media](raw)
+    if not isinstance(data, dict):
+        raise PayloadError("Payload harus berupa objek")
+    return data
@@ -0,0 +1,164 @@
+"""
+Retensi & arsip data SensorData.
+
+- Data mentah disimpan selama ``settings.SENSORDATA_RETENTION_DAYS`` hari.
+- Data yang lebih lama dipindah ke file CSV gzip, dipartisi per hari::
+
+      <SENSORDATA_ARCHIVE_DIR>/YYYY-MM-DD/part-<pk pertama>.csv.gz
+
+  lalu dihapus per batch (``SENSORDATA_PRUNE_BATCH`` baris per transaksi).
+  Nama part berdasarkan pk pertama sehingga menjalankan ulang setelah crash
+  hanya menimpa part yang sama (tidak ada duplikasi di arsip).
+- Tabel ``DailyReadingCount`` menyimpan jumlah baris per hari & status
+  untuk menggantikan COUNT(*) di halaman history.
+"""
+import csv
+import gzip
+import io
+import os
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyReadingCount, SensorData
+
+ARCHIVE_FIELDS = ('id', 'timestamp', 'device_id', 'temperature', 'humidity',
+                  'mq2', 'mq3', 'mq135', 'status', 'jenis_buah')
+
+
+# ----------------------------------------------------------
+# Ringkasan jumlah baris
+# ----------------------------------------------------------
+def _day_of(ts):
+    return timezone.localtime(ts).date() if timezone.is_aware(ts) else ts.date()
+
+
+def _apply_deltas(deltas):
+    """Terapkan perubahan jumlah {(day, status): delta} ke DailyReadingCount."""
+    for (day, status), delta in deltas.items():
+        if not delta:
+            continue
+        updated = DailyReadingCount.objects.filter(day=day, status=status).update(count=F('count') + delta)
+        if not updated:
+            obj, created = DailyReadingCount.objects.get_or_create(
+                day=day, status=status, defaults={'count': delta})
+            if not created:
+                DailyReadingCount.objects.filter(pk=obj.pk).update(count=F('count') + delta)
+
+
+def count_readings(readings):
+    """Tambahkan jumlah untuk reading baru (instance SensorData)."""
+    _apply_deltas(Counter((_day_of(r.timestamp), r.status) for r in readings))
+
+
+def total_count(day=None, status=None):
+    """Jumlah baris dari ringkasan, opsional per tanggal dan/atau status."""
+    qs = DailyReadingCount.objects.all()
+    if day is not None:
+        qs = qs.filter(day=day)
+    if status:
+        qs = qs.filter(status=status)
+    return qs.aggregate(total=Sum('count'))['total'] or 0
+
+
+def rebuild_counts():
+    """Hitung ulang ringkasan dari tabel SensorData (sekali jalan, mis. setelah migrasi)."""
+    rows = (SensorData.objects.annotate(day=TruncDate('timestamp'))
+            .values('day', 'status').annotate(n=Count('id')))
+    with transaction.atomic():
+        DailyReadingCount.objects.all().delete()
+        DailyReadingCount.objects.bulk_create([
+            DailyReadingCount(day=row['day'], status=row['status'], count=row['n']) for row in rows
+        ])
+
+
+# ----------------------------------------------------------
+# Archival
+# ----------------------------------------------------------
+def retention_cutoff(days=None, now=None):
+    days = days if days is not None else getattr(settings, 'SENSORDATA_RETENTION_DAYS', 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archive_dir():
+    return str(getattr(settings, 'SENSORDATA_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+def _write_part(path, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(ARCHIVE_FIELDS)
+    writer.writerows(rows)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8', newline='') as f:
+        f.write(buf.getvalue())
+    os.replace(tmp, path)
+
+
+def _expired_days(cutoff):
+    """Tanggal yang masih punya data lebih tua dari cutoff (dari tabel ringkasan)."""
+    days = set(DailyReadingCount.objects.filter(day__lte=_day_of(cutoff), count__gt=0)
+               .values_list('day', flat=True))
+    # Jaga-jaga jika ringkasan belum lengkap: cek baris tertua yang ada
+    oldest = SensorData.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is not None:
+        days.add(_day_of(oldest))
+    return sorted(days)
+
+
+def archive_expired(days=None, batch_size=None, dry_run=False, now=None, log=None):
+    """
+    Pindahkan SensorData yang melewati masa retensi ke arsip lalu hapus.
+
+    Returns:
+        dict: {'archived': jumlah baris, 'files': [path part], 'cutoff': datetime}
+    """
+    batch_size = batch_size or getattr(settings, 'SENSORDATA_PRUNE_BATCH', 5000)
+    cutoff = retention_cutoff(days, now)
+    base_dir = archive_dir()
+    tz = timezone.get_current_timezone()
+    result = {'archived': 0, 'files': [], 'cutoff': cutoff}
+
+    for day in _expired_days(cutoff):
+        day_start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        day_end = min(day_start + timedelta(days=1), cutoff)
+        qs = SensorData.objects.filter(timestamp__gte=day_start, timestamp__lt=day_end).order_by('pk')
+        if dry_run:
+            n = qs.count()
+            result['archived'] += n
+            if log:
+                log(f"{day}: {n} baris akan diarsipkan")
+            continue
+
+        last_pk = 0
+        while True:
+            rows = list(qs.filter(pk__gt=last_pk).values_list(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            first_pk, last_pk = rows[0][0], rows[-1][0]
+            path = os.path.join(base_dir, day.isoformat(), f'part-{first_pk:012d}.csv.gz')
+            _write_part(path, rows)
+
+            status_idx = ARCHIVE_FIELDS.index('status')
+            deltas = Counter()
+            for row in rows:
+                deltas[(day, row[status_idx])] -= 1
+            with transaction.atomic():
+                SensorData.objects.filter(pk__in=[row[0] for row in rows]).delete()
+                _apply_deltas(deltas)
+
+            result['archived'] += len(rows)
+            result['files'].append(path)
+            if log:
+                log(f"{day}: {len(rows)} baris -> {path}")
+
+    # Bersihkan baris ringkasan yang sudah nol
+    if not dry_run:
+        DailyReadingCount.objects.filter(count__lte=0).delete()
+    return result
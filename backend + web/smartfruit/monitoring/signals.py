@@ -0,0 +1,34 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import SensorData
+from . import retention
+
+
+@receiver(post_save, sender=SensorData)
+def count_new_reading(sender, instance, created, raw=False, **kwargs):
+    """Perbarui ringkasan DailyReadingCount untuk setiap SensorData baru."""
+    if created and not raw:
+        retention.count_readings([instance])
+
+
+# Pragma SQLite: WAL supaya pembaca tidak memblok writer, fsync lebih jarang,
+# cache & temp di memori.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=134217728',
+)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
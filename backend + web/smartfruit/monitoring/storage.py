@@ -0,0 +1,297 @@
+"""
+Storage layer untuk penulisan SensorData.
+
+Semua jalur ingest memanggil ``save_readings()``. Jika buffer aktif
+(``settings.SENSORDATA_FLUSH_INTERVAL > 0``) reading dikumpulkan di memori
+dan ditulis dengan satu ``bulk_create`` per transaksi setiap interval
+(atau saat buffer mencapai ``SENSORDATA_FLUSH_BATCH``), sehingga banyak
+device tidak saling berebut lock database untuk INSERT satu per satu.
+Jika interval 0, reading langsung ditulis (tetap satu bulk_create).
+Duplikat (device_id, timestamp) dibuang sebelum masuk buffer (dicek ke
+database dan ke isi buffer), jadi kiriman ulang tetap dilaporkan sebagai
+duplikat walaupun belum di-flush.
+
+Reading yang tidak bisa ditulis (field wajib kosong, ditolak database) tidak
+pernah masuk / kembali ke buffer: dicatat ke dead-letter
+(``SENSORDATA_DEAD_LETTER``, JSON Lines) supaya tidak menahan reading lain.
+Jika satu batch gagal karena data, batch ditulis ulang baris per baris; hanya
+error koneksi/database sibuk yang membuat batch dikembalikan ke buffer.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import SensorData
+from . import instrumentation, retention
+
+logger = logging.getLogger(__name__)
+
+# Kolom NOT NULL tanpa nilai dari database (selain pk)
+REQUIRED_FIELDS = tuple(f.attname for f in SensorData._meta.concrete_fields if not f.null and not f.primary_key)
+# Error karena isi baris (bukan koneksi): dicoba baris per baris lalu dead-letter
+ROW_ERRORS = (IntegrityError, DataError, ValueError, TypeError)
+
+_dead_letters = 0
+_dead_letter_lock = threading.Lock()
+
+
+def flush_interval():
+    return float(getattr(settings, 'SENSORDATA_FLUSH_INTERVAL', 0))
+
+
+def invalid_reason(reading):
+    """Alasan reading tidak bisa disimpan, atau None jika valid."""
+    missing = [name for name in REQUIRED_FIELDS if getattr(reading, name) is None]
+    if missing:
+        return f"field wajib kosong: {', '.join(missing)}"
+    return None
+
+
+def split_valid(readings):
+    """Pisahkan reading valid; yang tidak valid langsung ke dead-letter."""
+    valid = []
+    for reading in readings:
+        reason = invalid_reason(reading)
+        if reason:
+            dead_letter([reading], reason)
+        else:
+            valid.append(reading)
+    return valid
+
+
+def dead_letter(readings, reason):
+    """Catat reading yang gagal disimpan ke file JSON Lines ``SENSORDATA_DEAD_LETTER``."""
+    global _dead_letters
+    path = str(getattr(settings, 'SENSORDATA_DEAD_LETTER',
+                       os.path.join(settings.BASE_DIR, 'archive', 'dead_letter', 'sensordata.jsonl')))
+    failed_at = timezone.now()
+    fields = [f.attname for f in SensorData._meta.concrete_fields]
+    lines = [
+        json.dumps({**{name: getattr(r, name) for name in fields}, 'error': str(reason), 'failed_at': failed_at},
+                   cls=DjangoJSONEncoder)
+        for r in readings
+    ]
+    with _dead_letter_lock:
+        _dead_letters += len(readings)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            logger.error("Gagal menulis dead-letter %s: %s", path, e)
+    logger.warning("%d SensorData ke dead-letter: %s", len(readings), reason)
+
+
+instrumentation.register_collector(
+    'smartfruit_sensordata_dead_letter_total', 'counter', 'SensorData yang gagal disimpan (dead-letter).',
+    lambda: [({}, _dead_letters)])
+
+
+def _key(reading):
+    return reading.device_id, reading.timestamp
+
+
+def _existing(keys):
+    """Subset ``keys`` (device_id, timestamp) yang sudah ada di database."""
+    if not keys:
+        return set()
+    rows = SensorData.objects.filter(
+        device_id__in={device for device, _ in keys},
+        timestamp__in={ts for _, ts in keys},
+    ).values_list('device_id', 'timestamp')
+    return set(rows) & set(keys)
+
+
+def _dedupe(readings):
+    """
+    Buang reading yang (device_id, timestamp)-nya sudah ada di batch atau
+    di database (kiriman ulang dari device).
+    """
+    unique = {}
+    for reading in readings:
+        unique.setdefault(_key(reading), reading)
+    existing = _existing(unique)
+    return [reading for key, reading in unique.items() if key not in existing]
+
+
+def write_batch(readings):
+    """
+    Tulis list SensorData dalam satu transaksi dan perbarui ringkasan jumlah.
+
+    Duplikat (device_id, timestamp) dilewati. Returns: list reading yang
+    benar-benar baru (yang barisnya ada setelah insert).
+    """
+    readings = split_valid(readings)
+    if not readings:
+        return []
+    with transaction.atomic():
+        fresh = _dedupe(readings)
+        # ignore_conflicts: penjaga terakhir jika writer lain menyisipkan baris yang sama.
+        # Baris yang di-ignore (di SQLite termasuk pelanggaran NOT NULL) tidak
+        # terlihat dari hasil bulk_create, jadi yang dihitung hanya key yang
+        # benar-benar ada setelah insert
+        SensorData.objects.bulk_create(fresh, ignore_conflicts=True)
+        inserted = _existing([_key(r) for r in fresh])
+        fresh = [r for r in fresh if _key(r) in inserted]
+        retention.count_readings(fresh)
+    return fresh
+
+
+class SensorDataWriter:
+    """Buffer thread-safe + thread flusher periodik untuk bulk insert SensorData."""
+
+    def __init__(self, interval=1.0, max_batch=500, max_pending=None):
+        self.interval = interval
+        self.max_batch = max_batch
+        # Batas buffer saat database tidak bisa ditulis; data tertua dibuang
+        self.max_pending = max_pending or max_batch * 100
+        self._buffer = []
+        # Key (device_id, timestamp) di buffer / sedang ditulis, untuk dedupe sebelum flush
+        self._keys = set()
+        self._atexit_registered = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='sensordata-writer', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def add(self, readings):
+        """Masukkan reading ke buffer. Return reading yang diterima (bukan duplikat isi buffer)."""
+        accepted = []
+        with self._lock:
+            for reading in readings:
+                key = _key(reading)
+                if key not in self._keys:
+                    self._keys.add(key)
+                    accepted.append(reading)
+            self._buffer.extend(accepted)
+            overflow = len(self._buffer) - self.max_pending
+            if overflow > 0:
+                self._keys.difference_update(_key(r) for r in self._buffer[:overflow])
+                del self._buffer[:overflow]
+                logger.warning("Buffer SensorData penuh, %d reading tertua dibuang", overflow)
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self._wakeup.set()
+        return accepted
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Tulis semua isi buffer sekarang. Return jumlah baris yang ditulis."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        valid = split_valid(batch)
+        if len(valid) < len(batch):
+            kept = {id(r) for r in valid}
+            self._release([r for r in batch if id(r) not in kept])
+        batch = valid
+        if not batch:
+            return 0
+        try:
+            written = len(write_batch(batch))
+        except ROW_ERRORS as e:
+            # Ada baris yang ditolak: tulis satu per satu, yang gagal ke dead-letter
+            logger.warning("Bulk insert %d SensorData gagal (%s), ditulis per baris", len(batch), e)
+            return self._write_rows(batch)
+        except Exception as e:
+            # Database tidak bisa dihubungi/sibuk: kembalikan ke buffer untuk flush berikutnya
+            logger.error("Gagal bulk insert %d SensorData: %s", len(batch), e)
+            self._requeue(batch)
+            raise
+        self._release(batch)
+        return written
+
+    def _write_rows(self, batch):
+        written = 0
+        for i, reading in enumerate(batch):
+            try:
+                written += len(write_batch([reading]))
+            except ROW_ERRORS as e:
+                dead_letter([reading], e)
+            except Exception:
+                self._release(batch[:i])
+                self._requeue(batch[i:])
+                raise
+        self._release(batch)
+        return written
+
+    def _release(self, readings):
+        """Lepas key reading yang sudah ditulis / dibuang (dedupe berikutnya lewat database)."""
+        with self._lock:
+            self._keys.difference_update(_key(r) for r in readings)
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._buffer[:0] = batch
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Database sibuk/putus: tunggu sebentar sebelum mencoba lagi
+                time.sleep(min(self.interval, 1.0))
+            finally:
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SensorDataWriter(
+                interval=flush_interval() or 1.0,
+                max_batch=int(getattr(settings, 'SENSORDATA_FLUSH_BATCH', 500)),
+            )
+        return _writer
+
+
+def save_readings(readings):
+    """
+    Simpan satu atau banyak SensorData.
+
+    Returns:
+        list: instance yang disimpan, tanpa duplikat. Saat buffer aktif,
+        ``pk`` belum terisi karena baris baru ditulis pada flush berikutnya.
+    """
+    readings = split_valid(readings)
+    if flush_interval() <= 0:
+        return write_batch(readings)
+    writer = get_writer()
+    writer.start()
+    return writer.add(_dedupe(readings))
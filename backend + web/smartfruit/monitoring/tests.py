@@ -1,3 +1,1545 @@
-from django.test import TestCase
+import gzip
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase
+
+from . import alerts, influx_export, notifications, payloads, retention, storage
+from .models import SensorData
+
+
+def make_reading(ts, **kwargs):
+    """Buat SensorData dengan timestamp tertentu."""
+    values = {'temperature': 25.0, 'humidity': 60.0, 'mq2': 100.0, 'mq3': 200.0, 'mq135': 300.0}
+    values.update(kwargs)
+    return SensorData.objects.create(timestamp=ts, **values)
+
+
+class ExportCsvTests(TestCase):
+    def setUp(self):
+        make_reading(datetime(2025, 1, 1, 23, 59, tzinfo=dt_timezone.utc), status='LAYAK')
+        make_reading(datetime(2025, 1, 2, 8, 0, tzinfo=dt_timezone.utc), status='TIDAK LAYAK')
+        make_reading(datetime(2025, 1, 2, 9, 0, tzinfo=dt_timezone.utc), status='LAYAK')
+        make_reading(datetime(2025, 1, 3, 0, 0, tzinfo=dt_timezone.utc), status='LAYAK')
+
+    def _rows(self, response):
+        body = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            body = gzip.decompress(body)
+        return body.decode('utf-8').strip().splitlines()
+
+    def test_streams_all_rows_newest_first(self):
+        response = self.client.get('/export/csv/')
+        self.assertTrue(response.streaming)
+        rows = self._rows(response)
+        self.assertEqual(rows[0], 'Waktu,Suhu,Kelembapan,MQ2 (ppm),MQ3 (ppm),MQ135 (ppm),Status')
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(rows[1].startswith('2025-01-03'))
+
+    def test_date_filter_is_half_open_day_range(self):
+        rows = self._rows(self.client.get('/export/csv/', {'date': '2025-01-02'}))
+        self.assertEqual(len(rows), 3)
+
+    def test_start_end_and_status(self):
+        rows = self._rows(self.client.get('/export/csv/', {
+            'start': '2025-01-02T00:00:00Z', 'end': '2025-01-04', 'status': 'LAYAK',
+        }))
+        self.assertEqual(len(rows), 3)
+
+    def test_gzip(self):
+        response = self.client.get('/export/csv/', {'compress': 'gzip'})
+        self.assertIn('sensor_data.csv.gz', response['Content-Disposition'])
+        self.assertEqual(len(self._rows(response)), 5)
+
+    def test_invalid_date(self):
+        response = self.client.get('/export/csv/', {'date': 'kemarin'})
+        self.assertEqual(response.status_code, 400)
+
+
+class InfluxExportTests(TestCase):
+    def _frames(self):
+        import pandas as pd
+        for hour in (0, 1):
+            raw = pd.DataFrame({
+                'result': ['_result'] * 2,
+                'table': [0, 0],
+                '_time': pd.to_datetime([f'2025-01-01T0{hour}:00:00Z', f'2025-01-01T0{hour}:30:00Z']),
+                'suhu': [25.0 + hour, 26.0],
+                'mq2': [100, 110],
+            })
+            yield influx_export._normalize_frame(raw, ['suhu', 'mq2', 'status'], None)
+
+    def test_build_query_pivots_and_filters_devices(self):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        stop = datetime(2025, 1, 2, tzinfo=dt_timezone.utc)
+        query = influx_export.build_query(start, stop, ['suhu'], ['esp32-a'], 'monitoring', 'bucket')
+        self.assertIn('range(start: 2025-01-01T00:00:00.000000Z, stop: 2025-01-02T00:00:00.000000Z)', query)
+        self.assertIn('r["device"] == "esp32-a"', query)
+        self.assertIn('pivot(rowKey: ["_time"]', query)
+
+    def test_windows_cover_range(self):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        windows = list(influx_export.iter_windows(start, start + timedelta(hours=13), timedelta(hours=6)))
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[-1][1], start + timedelta(hours=13))
+
+    def test_parse_params_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            influx_export.parse_params({'format': 'xlsx'})
+
+    def test_csv_writer_single_header(self):
+        text = b''.join(influx_export.iter_export(self._frames(), 'csv')).decode()
+        lines = text.strip().splitlines()
+        self.assertEqual(lines[0], 'time,suhu,mq2,status')
+        self.assertEqual(len(lines), 5)
+
+    def test_parquet_writer_roundtrip(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow tidak terpasang')
+        data = b''.join(influx_export.iter_export(self._frames(), 'parquet'))
+        table = pq.read_table(pa.BufferReader(data))
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column_names, ['time', 'suhu', 'mq2', 'status'])
+
+    def test_arrow_writer_roundtrip(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self.skipTest('pyarrow tidak terpasang')
+        data = b''.join(influx_export.iter_export(self._frames(), 'arrow'))
+        table = pa.ipc.open_stream(pa.BufferReader(data)).read_all()
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column_names, ['time', 'suhu', 'mq2', 'status'])
+        self.assertEqual(table.column('suhu').to_pylist(), [25.0, 26.0, 26.0, 26.0])
+
+    def test_binary_writers_emit_schema_when_query_is_empty(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow tidak terpasang')
+        columns = ['suhu', 'status']
+        parquet = pq.read_table(pa.BufferReader(b''.join(
+            influx_export.iter_export(iter(()), 'parquet', columns, ['esp32-a']))))
+        arrow = pa.ipc.open_stream(pa.BufferReader(b''.join(
+            influx_export.iter_export(iter(()), 'arrow', columns, ['esp32-a'])))).read_all()
+        for table in (parquet, arrow):
+            self.assertEqual(table.num_rows, 0)
+            self.assertEqual(table.column_names, ['time', 'device', 'suhu', 'status'])
+
+
+class SensorDataQueryTests(TestCase):
+    """Regresi jumlah query & pemakaian index untuk view yang membaca SensorData."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        base = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        for i in range(60):
+            make_reading(base + timedelta(hours=i), status='LAYAK' if i % 3 else 'TIDAK LAYAK')
+        retention.rebuild_counts()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _sensordata_queries(self, func):
+        import time
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = func()
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 2.0)
+        return [q['sql'] for q in ctx.captured_queries if 'monitoring_sensordata' in q['sql']]
+
+    def test_latest_reading_orders_by_timestamp(self):
+        newest = SensorData.objects.create(temperature=1, humidity=1)
+        SensorData.objects.filter(pk=newest.pk).update(timestamp=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+        latest = SensorData.objects.latest_reading()
+        self.assertEqual(latest.timestamp, datetime(2025, 1, 3, 11, tzinfo=dt_timezone.utc))
+
+    def test_dashboard_single_query(self):
+        queries = self._sensordata_queries(lambda: self.client.get('/dashboard/'))
+        self.assertEqual(len(queries), 1)
+
+    def test_data_history_queries(self):
+        queries = self._sensordata_queries(
+            lambda: self.client.get('/history/', {'date': '2025-01-02', 'status': 'LAYAK'}))
+        # total_records dari DailyReadingCount, tidak ada COUNT(*) atas SensorData
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('django_datetime_cast_date', ' '.join(queries))
+
+    def test_get_history_fallback_single_query(self):
+        from django.test import RequestFactory
+        from . import views
+
+        request = RequestFactory().get('/api/sensor/history/', {'date': '2025-01-02'})
+        queries = self._sensordata_queries(lambda: views.get_history(request))
+        self.assertEqual(len(queries), 1)
+
+    def test_export_csv_single_query(self):
+        queries = self._sensordata_queries(lambda: self.client.get('/export/csv/', {'date': '2025-01-02'}))
+        self.assertEqual(len(queries), 1)
+
+    def test_admin_changelist_queries(self):
+        queries = self._sensordata_queries(lambda: self.client.get('/admin/monitoring/sensordata/'))
+        # count + halaman + DISTINCT untuk tiap list_filter (status, device_id)
+        self.assertLessEqual(len(queries), 4)
+
+    def test_range_and_order_use_index(self):
+        from django.db import connection
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN khusus SQLite')
+        plan = SensorData.objects.order_by('-timestamp')[:1].explain()
+        self.assertIn('sensordata_ts_idx', plan)
+        plan = SensorData.objects.filter(
+            status='LAYAK', timestamp__gte=datetime(2025, 1, 2, tzinfo=dt_timezone.utc),
+        ).order_by('-timestamp').explain()
+        self.assertIn('INDEX', plan)
+
+
+class DeviceIdentityTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_resolve_device_priority(self):
+        from django.test import RequestFactory, override_settings
+        from . import devices
+
+        rf = RequestFactory()
+        request = rf.post('/', HTTP_X_DEVICE_ID='esp32-hdr', HTTP_X_DEVICE_TOKEN='tok')
+        self.assertEqual(devices.resolve_device_id({'device_id': 'esp32-body'}, request), 'esp32-body')
+        self.assertEqual(devices.resolve_device_id({}, request), 'esp32-hdr')
+        with override_settings(DEVICE_TOKENS={'tok': 'esp32-tok'}):
+            self.assertEqual(devices.resolve_device_id({}, rf.post('/', HTTP_X_DEVICE_TOKEN='tok')), 'esp32-tok')
+        self.assertEqual(devices.resolve_device_id({'device_id': 'bad id!'}), 'default')
+
+    def test_device_from_topic(self):
+        from . import devices
+
+        self.assertEqual(devices.device_from_topic('annas/esp32/esp32-07/sensor'), 'esp32-07')
+        self.assertIsNone(devices.device_from_topic('annas/esp32/sensor'))
+        self.assertEqual(devices.device_from_topic('farm/1/dev9', 'farm/+/{device}'), 'dev9')
+
+    def test_latest_status_per_device(self):
+        base = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        make_reading(base, device_id='esp32-a', temperature=20)
+        make_reading(base + timedelta(minutes=1), device_id='esp32-b', temperature=30)
+
+        self.assertEqual(self.client.get('/api/sensor/status/').json()['device_id'], 'esp32-b')
+        data = self.client.get('/api/sensor/status/', {'device': 'esp32-a'}).json()
+        self.assertEqual((data['device_id'], data['temperature']), ('esp32-a', 20))
+
+    def test_api_status_served_from_device_cache(self):
+        from unittest import mock
+        from . import devices, influx_client
+
+        devices.cache_latest('esp32-a', {'suhu': 21.5, 'kelembapan': 60, 'mq2': 1, 'mq3': 1, 'mq135': 1})
+        with mock.patch.object(influx_client, 'get_latest_data') as influx:
+            data = self.client.get('/api/status/', {'device': 'esp32-a'}).json()
+        influx.assert_not_called()
+        self.assertEqual(data['suhu'], 21.5)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        base = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        for day in range(3):
+            for i in range(3):
+                make_reading(base + timedelta(days=day, minutes=i), status='LAYAK' if i else 'TIDAK LAYAK')
+        retention.rebuild_counts()
+        self.now = base + timedelta(days=31, hours=1)
+
+    def test_counts_follow_inserts(self):
+        self.assertEqual(retention.total_count(), 9)
+        SensorData.objects.create(temperature=1, humidity=1, status='LAYAK')
+        self.assertEqual(retention.total_count(), 10)
+        self.assertEqual(retention.total_count(status='TIDAK LAYAK'), 3)
+
+    def test_archive_expired_moves_rows_by_day(self):
+        from django.test import override_settings
+
+        with override_settings(SENSORDATA_ARCHIVE_DIR=self.tmp.name):
+            result = retention.archive_expired(days=30, batch_size=2, now=self.now)
+
+        # cutoff = 2 Jan 13:00 -> data 1 & 2 Jan diarsipkan, 3 Jan tetap
+        self.assertEqual(result['archived'], 6)
+        self.assertEqual(SensorData.objects.count(), 3)
+        self.assertEqual(retention.total_count(), 3)
+        self.assertEqual(len(result['files']), 4)
+
+        archived = []
+        for path in result['files']:
+            self.assertIn('2025-01-0', path)
+            with gzip.open(path, 'rt') as f:
+                archived.extend(f.read().strip().splitlines()[1:])
+        self.assertEqual(len(archived), 6)
+
+    def test_archive_rerun_is_idempotent(self):
+        from django.test import override_settings
+
+        with override_settings(SENSORDATA_ARCHIVE_DIR=self.tmp.name):
+            retention.archive_expired(days=30, now=self.now)
+            again = retention.archive_expired(days=30, now=self.now)
+        self.assertEqual(again['archived'], 0)
+
+
+class DuplicateMigrationTests(TransactionTestCase):
+    """0013 menghapus duplikat lama dan ikut mengoreksi ringkasan DailyReadingCount."""
+
+    def test_drop_duplicates_rebuilds_daily_counts(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        before = [('monitoring', '0012_sensordata_postgres_storage')]
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(before)
+        try:
+            apps = executor.loader.project_state(before).apps
+            OldSensorData = apps.get_model('monitoring', 'SensorData')
+            OldCount = apps.get_model('monitoring', 'DailyReadingCount')
+            ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+            # esp32-a mengirim ulang reading yang sama dua kali (status berbeda)
+            for device, status in (('esp32-a', 'LAYAK'), ('esp32-a', 'LAYAK'), ('esp32-a', 'TIDAK LAYAK'),
+                                   ('esp32-b', 'LAYAK')):
+                OldSensorData.objects.create(timestamp=ts, temperature=20, humidity=50, status=status,
+                                             device_id=device)
+            OldCount.objects.create(day=ts.date(), status='LAYAK', count=3)
+            OldCount.objects.create(day=ts.date(), status='TIDAK LAYAK', count=1)
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(latest)
+
+        self.assertEqual(SensorData.objects.count(), 2)
+        self.assertEqual(retention.total_count(), 2)
+        self.assertEqual(retention.total_count(status='LAYAK'), 2)
+        self.assertEqual(retention.total_count(status='TIDAK LAYAK'), 0)
+
+
+class StorageTests(TestCase):
+    def test_buffered_writer_flushes_in_one_batch(self):
+        writer = storage.SensorDataWriter(interval=60, max_batch=100)
+        ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        writer.add([SensorData(timestamp=ts + timedelta(seconds=i), temperature=20, humidity=50,
+                               status='LAYAK', device_id='esp32-a')
+                    for i in range(5)])
+        self.assertEqual(writer.pending(), 5)
+        self.assertEqual(SensorData.objects.count(), 0)
+
+        self.assertEqual(writer.flush(), 5)
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-a').count(), 5)
+        # Ringkasan jumlah ikut diperbarui walau bulk_create tidak memicu post_save
+        self.assertEqual(retention.total_count(status='LAYAK'), 5)
+
+    def test_writer_drops_oldest_when_full(self):
+        writer = storage.SensorDataWriter(interval=60, max_batch=2, max_pending=3)
+        ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        writer.add([SensorData(timestamp=ts + timedelta(seconds=i), temperature=i, humidity=50, status='LAYAK')
+                    for i in range(5)])
+        self.assertEqual(writer.pending(), 3)
+        writer.flush()
+        self.assertEqual(sorted(SensorData.objects.values_list('temperature', flat=True)), [2, 3, 4])
+
+    def test_bad_rows_go_to_dead_letter_instead_of_blocking_writer(self):
+        import json
+        import os
+        import tempfile
+        from django.test import override_settings
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'dead.jsonl')
+        writer = storage.SensorDataWriter(interval=60, max_batch=100)
+        ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        readings = [SensorData(timestamp=ts + timedelta(seconds=i), temperature=20, humidity=50, device_id='esp32-d')
+                    for i in range(4)]
+        readings[1].temperature = None  # field wajib kosong
+        readings[2].humidity = 'basah'  # ditolak saat insert
+        with override_settings(SENSORDATA_DEAD_LETTER=path):
+            writer.add(readings)
+            self.assertEqual(writer.flush(), 2)
+            self.assertEqual(writer.pending(), 0)
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-d').count(), 2)
+        with open(path) as f:
+            dead = [json.loads(line) for line in f]
+        self.assertEqual([d['temperature'] for d in dead], [None, 20])
+        self.assertIn('wajib', dead[0]['error'])
+
+    def test_update_sensor_rejects_missing_required_fields(self):
+        from django.test import override_settings
+
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=60):
+            response = self.client.post('/api/sensor/update/', {'humidity': 60, 'device_id': 'esp32-x'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(storage.get_writer().pending(), 0)
+
+    def test_update_sensor_rejects_out_of_range_reading(self):
+        from django.test import override_settings
+
+        for payload in ({'temperature': 25, 'humidity': 130, 'device_id': 'esp32-o'},
+                        {'temperature': 25, 'humidity': 60, 'mq2': -5, 'device_id': 'esp32-o'}):
+            with override_settings(SENSORDATA_FLUSH_INTERVAL=0):
+                response = self.client.post('/api/sensor/update/', payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('di luar rentang', response.json()['error'])
+        self.assertFalse(SensorData.objects.filter(device_id='esp32-o').exists())
+
+    def test_update_sensor_writes_immediately_without_buffer(self):
+        from django.test import override_settings
+
+        payload = {'temperature': 25, 'humidity': 60, 'mq2': 1, 'mq3': 1, 'mq135': 1, 'device_id': 'esp32-s'}
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0):
+            response = self.client.post('/api/sensor/update/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-s').count(), 1)
+
+    def test_sqlite_pragmas_applied(self):
+        from django.db import connection
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('khusus SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class NotificationTests(TestCase):
+    """Dispatcher FCM diuji terhadap server HTTP lokal yang meniru endpoint legacy FCM."""
+
+    @classmethod
+    def setUpClass(cls):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        super().setUpClass()
+        cls.received = []
+
+        class FakeFCM(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                cls.received.append(payload)
+                results = []
+                for token in payload['registration_ids']:
+                    if token.startswith('bad'):
+                        results.append({'error': 'NotRegistered'})
+                    elif token.startswith('old'):
+                        results.append({'message_id': '1', 'registration_id': 'new' + token[3:]})
+                    else:
+                        results.append({'message_id': '1'})
+                body = json.dumps({'results': results}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeFCM)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/fcm/send'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+
+        from .models import DeviceToken
+
+        cache.clear()
+        self.received.clear()
+        for token in ('good1', 'good2', 'bad1', 'old1'):
+            DeviceToken.objects.create(token=token)
+        overrides = override_settings(FCM_URL=self.url, FCM_BATCH_SIZE=2, NOTIFY_ASYNC=False, NOTIFY_COOLDOWN=60)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_multicast_batches_and_prunes_tokens(self):
+        from .models import DeviceToken
+
+        result = notifications.dispatch({'key': 'k', 'title': 'T', 'body': 'B'})
+        self.assertEqual(result['requests'], 2)
+        self.assertEqual([len(p['registration_ids']) for p in self.received], [2, 2])
+        self.assertEqual(result['invalid'], ['bad1'])
+        self.assertEqual(sorted(DeviceToken.objects.values_list('token', flat=True)), ['good1', 'good2', 'new1'])
+
+    def test_cooldown_per_device_and_condition(self):
+        self.assertTrue(notifications.notify('T', 'B', device_id='esp32-a', condition='TIDAK_LAYAK'))
+        self.assertFalse(notifications.notify('T', 'B', device_id='esp32-a', condition='TIDAK_LAYAK'))
+        self.assertTrue(notifications.notify('T', 'B', device_id='esp32-b', condition='TIDAK_LAYAK'))
+        self.assertEqual(len(self.received), 4)
+
+    def test_worker_sends_in_background(self):
+        from unittest import mock
+        from django.test import override_settings
+
+        # Thread worker memakai koneksi DB sendiri (tidak melihat transaksi test),
+        # jadi dispatch diganti pencatat.
+        worker = notifications.NotificationWorker()
+        sent = []
+        with override_settings(NOTIFY_ASYNC=True), \
+                mock.patch.object(notifications, '_worker', worker), \
+                mock.patch.object(notifications, 'dispatch', sent.append):
+            self.assertTrue(notifications.notify('T', 'B', device_id='esp32-a', condition='X'))
+            worker.queue.join()
+        self.assertEqual([alert['key'] for alert in sent], ['notify:esp32-a:X'])
+
+
+class AlertEngineTests(TestCase):
+    DANGER = {'suhu': 36, 'kelembapan': 60, 'mq2': 10, 'mq3': 10, 'mq135': 10}
+    NEAR = {'suhu': 34.5, 'kelembapan': 60, 'mq2': 10, 'mq3': 10, 'mq135': 10}
+    NORMAL = {'suhu': 25, 'kelembapan': 60, 'mq2': 10, 'mq3': 10, 'mq135': 10}
+
+    def test_classify_matches_thresholds_and_hysteresis(self):
+        self.assertEqual(alerts.classify(self.DANGER), alerts.TIDAK_LAYAK)
+        self.assertEqual(alerts.classify(self.NEAR), alerts.PERINGATAN)
+        # Sudah TIDAK LAYAK: 34.5 masih dalam margin hysteresis (35 - 1)
+        self.assertEqual(alerts.classify(self.NEAR, alerts.TIDAK_LAYAK), alerts.TIDAK_LAYAK)
+
+    def test_only_transitions_after_min_duration(self):
+        engine = alerts.AlertEngine(min_open=10, min_close=30)
+        events = []
+        for t, values in [(0, self.DANGER), (5, self.NEAR), (6, self.DANGER), (12, self.DANGER),
+                          (13, self.NORMAL), (14, self.DANGER), (20, self.NORMAL), (49, self.NORMAL),
+                          (50, self.NORMAL), (60, self.NORMAL)]:
+            transition = engine.evaluate('esp32-a', values=values, now=t)
+            if transition:
+                events.append((t, transition['kind'], transition['status']))
+        # t=5 hanya PERINGATAN, jadi yang bertahan 10 detik adalah PERINGATAN;
+        # data normal/danger yang bergantian tidak membuat transisi
+        self.assertEqual(events, [(12, 'open', 'PERINGATAN'), (50, 'close', 'LAYAK')])
+
+    def test_values_keep_hysteresis_when_status_is_given(self):
+        engine = alerts.AlertEngine(min_open=0, min_close=0, persist=False)
+        self.assertEqual(engine.evaluate('esp32-a', values=self.DANGER, status='TIDAK LAYAK', now=0)['kind'], 'open')
+        # Status dari reading/model sudah turun ke PERINGATAN, tapi suhu 34.5
+        # masih dalam margin hysteresis sehingga level tidak berubah
+        self.assertIsNone(engine.evaluate('esp32-a', values=self.NEAR, status='PERINGATAN', now=1))
+        self.assertEqual(engine.state('esp32-a').level, alerts.TIDAK_LAYAK)
+        # Tanpa nilai sensor, level hanya dari status
+        self.assertEqual(engine.evaluate('esp32-a', status='LAYAK', now=2)['kind'], 'close')
+
+    def test_model_prediction_opens_alert_for_in_range_values(self):
+        import json
+        from unittest import mock
+        from django.test import override_settings
+        from . import views
+
+        class Model:
+            def predict(self, features):
+                return [1]  # TIDAK LAYAK
+
+        engine = alerts.AlertEngine(min_open=0, min_close=0, persist=False)
+        reading = {'temperature': 25, 'humidity': 60, 'mq2': 10, 'mq3': 10, 'mq135': 10, 'device_id': 'esp32-m'}
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0), \
+                mock.patch.object(views, 'load_model', return_value=Model()), \
+                mock.patch.object(alerts, '_engine', engine), \
+                mock.patch.object(notifications, 'notify') as notify:
+            response = self.client.post('/api/sensor/update/', json.dumps(reading), content_type='application/json')
+        self.assertEqual(response.json()['status'], 'TIDAK LAYAK')
+        self.assertEqual(engine.state('esp32-m').level, alerts.TIDAK_LAYAK)
+        self.assertEqual(notify.call_count, 1)
+
+    def test_state_persisted_across_engines(self):
+        first = alerts.AlertEngine(min_open=0)
+        self.assertEqual(first.evaluate('esp32-a', status='TIDAK LAYAK', now=0)['kind'], 'open')
+        second = alerts.AlertEngine(min_open=0)
+        self.assertIsNone(second.evaluate('esp32-a', status='TIDAK LAYAK', now=1))
+        self.assertEqual(second.state('esp32-a').level, alerts.TIDAK_LAYAK)
+
+    def test_emit_pushes_only_on_open_and_close(self):
+        from unittest import mock
+
+        engine = alerts.AlertEngine(min_open=0, min_close=0, persist=False)
+        with mock.patch.object(alerts, '_engine', engine), \
+                mock.patch.object(notifications, 'notify') as notify:
+            for t in range(5):
+                alerts.process('esp32-a', values=self.DANGER, now=t)
+            alerts.process('esp32-a', values=self.NORMAL, now=6)
+        self.assertEqual([c.kwargs['condition'] for c in notify.call_args_list], ['open:2', 'close'])
+
+
+class MQTTConsumerTests(TestCase):
+    class Msg:
+        def __init__(self, topic, payload, mid=0, qos=1):
+            self.topic, self.payload, self.mid, self.qos = topic, payload, mid, qos
+
+    def test_batch_saved_with_one_publish(self):
+        import json
+        from unittest import mock
+        from .consumer import MQTTConsumer
+
+        consumer = MQTTConsumer(batch_size=10, flush_interval=0.01)
+        for i in range(12):
+            payload = json.dumps({'temperature': 20 + i, 'humidity': 50}).encode()
+            consumer.on_message(None, None, self.Msg(f'annas/esp32/esp32-{i % 2}/sensor', payload))
+        consumer.on_message(None, None, self.Msg('annas/esp32/sensor', b'not json'))
+
+        layer = mock.MagicMock()
+        layer.group_send = mock.AsyncMock()
+        with mock.patch('monitoring.consumer.get_channel_layer', return_value=layer):
+            consumer.drain()
+
+        self.assertEqual(SensorData.objects.count(), 12)
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-1').count(), 6)
+        self.assertEqual(consumer.stats['invalid'], 1)
+        self.assertEqual(consumer.stats['batches'], 2)
+        self.assertEqual(layer.group_send.await_count, 2)
+        group, event = layer.group_send.await_args_list[0].args
+        self.assertEqual((group, event['type'], len(event['data'])), ('sensor_data', 'send_sensor_batch', 10))
+
+    def test_full_queue_drops_without_blocking_and_acks_after_save(self):
+        import json
+        import time
+        from unittest import mock
+        from .consumer import MQTTConsumer
+
+        consumer = MQTTConsumer(batch_size=10, queue_size=2)
+        client = mock.Mock()
+        payload = json.dumps({'temperature': 20, 'humidity': 50}).encode()
+        start = time.monotonic()
+        for mid in range(3):
+            consumer.on_message(client, None, self.Msg(f'annas/esp32/esp32-k{mid}/sensor', payload, mid=mid))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(consumer.stats['dropped'], 1)
+        # Pesan yang dibuang langsung di-ack, sisanya baru setelah disimpan
+        self.assertEqual([c.args for c in client.ack.call_args_list], [(2, 1)])
+
+        layer = mock.MagicMock()
+        layer.group_send = mock.AsyncMock()
+        with mock.patch('monitoring.consumer.get_channel_layer', return_value=layer):
+            consumer.drain()
+        self.assertEqual(SensorData.objects.filter(device_id__startswith='esp32-k').count(), 2)
+        self.assertEqual(sorted(c.args for c in client.ack.call_args_list), [(0, 1), (1, 1), (2, 1)])
+
+    def test_db_error_retried_then_dead_lettered(self):
+        import json
+        import os
+        import tempfile
+        from unittest import mock
+        from django.db import OperationalError
+        from django.test import override_settings
+        from . import consumer as consumer_module
+
+        consumer = consumer_module.MQTTConsumer(batch_size=10)
+        items = [('annas/esp32/esp32-r/sensor', json.dumps({'temperature': 20 + i, 'humidity': 50}).encode(),
+                  datetime(2025, 1, 1, 12, i, tzinfo=dt_timezone.utc), None) for i in range(3)]
+        layer = mock.MagicMock()
+        layer.group_send = mock.AsyncMock()
+        real_write = consumer_module.write_batch
+        with tempfile.TemporaryDirectory() as tmp, \
+                override_settings(SENSORDATA_DEAD_LETTER=os.path.join(tmp, 'dead.jsonl'), MQTT_WRITE_RETRIES=2), \
+                mock.patch.object(consumer_module.time, 'sleep') as sleep, \
+                mock.patch('monitoring.consumer.get_channel_layer', return_value=layer):
+            # Database sibuk sekali lalu pulih: batch tetap tersimpan
+            calls = iter([OperationalError('locked')])
+
+            def flaky(readings):
+                error = next(calls, None)
+                if error:
+                    raise error
+                return real_write(readings)
+
+            with mock.patch.object(consumer_module, 'write_batch', side_effect=flaky):
+                self.assertEqual(consumer.process_batch(items[:2]), 2)
+            # Tetap gagal: setelah retry batch ke dead-letter, bukan hilang diam-diam
+            with mock.patch.object(consumer_module, 'write_batch', side_effect=OperationalError('down')):
+                self.assertEqual(consumer.process_batch(items[2:]), 0)
+            with open(os.path.join(tmp, 'dead.jsonl')) as f:
+                dead = [json.loads(line) for line in f]
+
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-r').count(), 2)
+        self.assertEqual([d['temperature'] for d in dead], [22])
+        self.assertEqual((consumer.stats['errors'], consumer.stats['dropped']), (4, 1))
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 0.5, 1.0])
+
+
+class PayloadTests(TestCase):
+    READING = {'suhu': 27.35, 'kelembapan': 61.2, 'mq2': 120, 'mq3': 1450, 'mq135': 300.5,
+               'skorTotal': 71.25, 'status': 1, 'device_id': 'esp32-07'}
+
+    def test_frame_roundtrip(self):
+        frame = payloads.encode_frame(self.READING)
+        self.assertEqual(len(frame), payloads.FRAME_STRUCT.size + len('esp32-07'))
+        data = payloads.decode(frame, payloads.FRAME)
+        self.assertEqual((data['suhu'], data['temperature'], data['mq135']), (27.35, 27.35, 300.5))
+        self.assertEqual((data['status'], data['device_id']), (1, 'esp32-07'))
+        self.assertNotIn('ts', data)
+
+    def test_sniff_without_content_type(self):
+        self.assertEqual(payloads.decode(b'{"suhu": 20}'), {'suhu': 20})
+        self.assertEqual(payloads.decode(payloads.encode_frame({'suhu': 20}), 'text/plain')['suhu'], 20)
+        with self.assertRaises(payloads.PayloadError):
+            payloads.decode(b'\x01\x00')
+        with self.assertRaises(payloads.PayloadError):
+            payloads.decode(b'[1, 2]')
+
+    def test_update_sensor_accepts_binary_frame(self):
+        from django.test import override_settings
+
+        frame = payloads.encode_frame({'temperature': 24.5, 'humidity': 55, 'mq2': 10, 'device_id': 'esp32-bin'})
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0):
+            response = self.client.post('/api/sensor/update/', frame, content_type=payloads.FRAME)
+        self.assertEqual(response.status_code, 200)
+        reading = SensorData.objects.get(device_id='esp32-bin')
+        self.assertEqual((reading.temperature, reading.humidity, reading.mq2), (24.5, 55, 10))
+
+    def test_mqtt_consumer_parses_frame(self):
+        from .consumer import parse_message
+
+        reading = parse_message('annas/esp32/sensor', payloads.encode_frame(
+            {'temperature': 31, 'humidity': 40, 'device_id': 'esp32-mq'}))
+        self.assertEqual((reading.temperature, reading.device_id, reading.status), (31, 'esp32-mq', 'TIDAK LAYAK'))
+
+
+class BatchIngestTests(TestCase):
+    def post(self, body, content_type='application/json'):
+        from unittest import mock
+        from django.test import override_settings
+        from . import influx_client
+
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0), \
+                mock.patch.object(influx_client, 'write_points', return_value=True) as write:
+            response = self.client.post('/api/sensor/batch/', body, content_type=content_type)
+        return response, write
+
+    def test_json_array_with_per_item_results(self):
+        import json
+
+        body = json.dumps([
+            {'suhu': 25, 'kelembapan': 60, 'ts': 1735732800, 'device_id': 'esp32-a'},
+            {'temperature': 26, 'humidity': 61, 'ts': 1735732801000, 'device_id': 'esp32-a'},
+            {'suhu': 'panas', 'kelembapan': 60},
+            {'suhu': 25, 'kelembapan': 160, 'timestamp': '2025-01-01T12:00:05Z'},
+            {'kelembapan': 60},
+            'bukan objek',
+        ])
+        response, write = self.post(body)
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data['accepted'], data['rejected']), (2, 4))
+        self.assertEqual([r['status'] for r in data['results']], ['ok', 'ok', 'error', 'error', 'error', 'error'])
+        self.assertIn('suhu bukan angka', data['results'][2]['errors'])
+        self.assertIn('kelembapan di luar rentang 0..100', data['results'][3]['errors'])
+        self.assertIn('suhu wajib diisi', data['results'][4]['errors'])
+
+        # Satu write Influx, dua baris DB dengan waktu ukur dari device
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(write.call_args.args[0]), 2)
+        stamps = list(SensorData.objects.order_by('timestamp').values_list('timestamp', flat=True))
+        self.assertEqual(stamps, [datetime(2025, 1, 1, 12, 0, 0, tzinfo=dt_timezone.utc),
+                                  datetime(2025, 1, 1, 12, 0, 1, tzinfo=dt_timezone.utc)])
+
+    def test_ndjson_with_shared_device_header(self):
+        body = '{"suhu": 36, "kelembapan": 50}\nnot json\n\n{"suhu": 20, "kelembapan": 50}\n'
+        from unittest import mock
+        from django.test import override_settings
+        from . import influx_client
+
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0), \
+                mock.patch.object(influx_client, 'write_points', return_value=True):
+            response = self.client.post('/api/sensor/batch/', body, content_type='application/x-ndjson',
+                                        HTTP_X_DEVICE_ID='esp32-nd')
+        data = response.json()
+        self.assertEqual((data['accepted'], data['rejected']), (2, 1))
+        self.assertEqual(sorted(SensorData.objects.filter(device_id='esp32-nd').values_list('status', flat=True)),
+                         ['LAYAK', 'TIDAK LAYAK'])
+
+    def test_rejects_future_and_empty_batches(self):
+        import json
+        import time
+
+        response, _ = self.post(json.dumps({'readings': [{'suhu': 20, 'kelembapan': 50, 'ts': time.time() + 3600}]}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('timestamp di masa depan', response.json()['results'][0]['errors'])
+        self.assertEqual(self.post('[]')[0].status_code, 400)
+
+
+class DeviceClockTests(TestCase):
+    def test_correct_applies_offset_and_clamps_future(self):
+        from . import clock
+
+        # Jam device 100 detik terlambat: ts digeser sebesar selisih sent_at
+        self.assertEqual(clock.correct(1000, 1200, sent_at=1100), (1100, clock.SOURCE_CORRECTED, 100))
+        # Selisih kecil dianggap latensi jaringan
+        self.assertEqual(clock.correct(1000, 1001, sent_at=1000)[:2], (1000, clock.SOURCE_DEVICE))
+        self.assertEqual(clock.correct(1500, 1200)[:2], (1200, clock.SOURCE_CLAMPED))
+        self.assertEqual(clock.correct(None, 1200)[:2], (1200, clock.SOURCE_SERVER))
+        self.assertEqual(clock.parse_epoch('2025-01-01T00:00:00Z'), 1735689600)
+
+    def test_write_batch_skips_retransmitted_readings(self):
+        ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        make_reading(ts, device_id='esp32-a')
+        fresh = storage.write_batch([
+            SensorData(timestamp=ts, temperature=20, humidity=50, status='LAYAK', device_id='esp32-a'),
+            SensorData(timestamp=ts, temperature=20, humidity=50, status='LAYAK', device_id='esp32-b'),
+            SensorData(timestamp=ts, temperature=20, humidity=50, status='LAYAK', device_id='esp32-b'),
+        ])
+        self.assertEqual([r.device_id for r in fresh], ['esp32-b'])
+        self.assertEqual(SensorData.objects.filter(timestamp=ts).count(), 2)
+
+    def test_batch_retransmit_is_reported_as_duplicate(self):
+        import json
+        from unittest import mock
+        from django.test import override_settings
+        from . import influx_client
+
+        # sent_at 60 detik di belakang waktu terima: semua ts digeser +60
+        received = datetime(2025, 1, 1, 12, 5, tzinfo=dt_timezone.utc)
+        body = {'device_id': 'esp32-a', 'sent_at': received.timestamp() - 60,
+                'readings': [{'suhu': 25, 'kelembapan': 60, 'ts': 1735732800}]}
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=0), \
+                mock.patch.object(influx_client, 'write_points', return_value=True), \
+                mock.patch('django.utils.timezone.now', return_value=received):
+            first = self.client.post('/api/sensor/batch/', json.dumps(body), content_type='application/json')
+            again = self.client.post('/api/sensor/batch/', json.dumps(body), content_type='application/json')
+
+        self.assertEqual(first.json()['accepted'], 1)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual((again.json()['accepted'], again.json()['duplicates']), (0, 1))
+        self.assertEqual(again.json()['results'][0]['status'], 'duplicate')
+        self.assertEqual(list(SensorData.objects.values_list('timestamp', flat=True)),
+                         [datetime(2025, 1, 1, 12, 1, tzinfo=dt_timezone.utc)])
+
+    def test_buffered_retransmit_is_reported_as_duplicate(self):
+        import json
+        from unittest import mock
+        from django.test import override_settings
+        from . import influx_client
+
+        body = {'device_id': 'esp32-buf', 'readings': [{'suhu': 25, 'kelembapan': 60, 'ts': 1735732800}]}
+        writer = storage.SensorDataWriter(interval=60)
+        with override_settings(SENSORDATA_FLUSH_INTERVAL=60), \
+                mock.patch.object(storage, 'get_writer', return_value=writer), \
+                mock.patch.object(writer, 'start'), \
+                mock.patch.object(influx_client, 'write_points', return_value=True):
+            first = self.client.post('/api/sensor/batch/', json.dumps(body), content_type='application/json')
+            # Belum di-flush: duplikat terdeteksi dari isi buffer
+            again = self.client.post('/api/sensor/batch/', json.dumps(body), content_type='application/json')
+            self.assertEqual(writer.flush(), 1)
+            # Sudah di-flush: duplikat terdeteksi dari database
+            late = self.client.post('/api/sensor/batch/', json.dumps(body), content_type='application/json')
+
+        self.assertEqual(first.json()['accepted'], 1)
+        self.assertEqual([r.json()['duplicates'] for r in (again, late)], [1, 1])
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(SensorData.objects.filter(device_id='esp32-buf').count(), 1)
+
+    def test_write_batch_counts_only_inserted_rows(self):
+        from unittest import mock
+
+        ts = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        reading = SensorData(timestamp=ts, temperature=20, humidity=50, status='LAYAK', device_id='esp32-i')
+        # bulk_create yang diam-diam melewatkan baris (seperti INSERT OR IGNORE)
+        with mock.patch.object(SensorData.objects, 'bulk_create', return_value=[]):
+            self.assertEqual(storage.write_batch([reading]), [])
+        self.assertEqual(retention.total_count(), 0)
+
+    def test_late_reading_does_not_replace_newer_state(self):
+        from . import devices
+
+        devices.cache_latest('esp32-late', {'suhu': 30}, ts=200)
+        devices.cache_latest('esp32-late', {'suhu': 20}, ts=100)
+        self.assertEqual(devices.get_cached_latest('esp32-late'), {'suhu': 30})
+
+        engine = alerts.AlertEngine(min_open=0, min_close=0, persist=False)
+        self.assertEqual(engine.evaluate('esp32-late', status='TIDAK LAYAK', now=200)['kind'], 'open')
+        # Reading backlog yang lebih tua tidak menutup alert
+        self.assertIsNone(engine.evaluate('esp32-late', status='LAYAK', now=100))
+        self.assertEqual(engine.state('esp32-late').level, alerts.TIDAK_LAYAK)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        from . import instrumentation
+        instrumentation.reset()
+
+    def test_histogram_quantiles_and_buckets(self):
+        from . import instrumentation
+
+        hist = instrumentation.Histogram(buckets=(0.01, 0.1))
+        for ms in range(1, 101):
+            hist.observe(ms / 1000)
+        q = hist.quantiles()
+        self.assertAlmostEqual(q[0.5], 0.051)
+        self.assertAlmostEqual(q[0.99], 0.1)
+        self.assertEqual(hist.cumulative(), [(0.01, 10), (0.1, 100), ('+Inf', 100)])
+
+    def test_server_timing_header_and_stage_histograms(self):
+        import json
+        from unittest import mock
+        from . import instrumentation, views
+
+        # Span dalam ingest batch tercatat dengan label endpoint URL
+        with mock.patch.object(views.batch, 'ingest', side_effect=self._fake_ingest):
+            response = self.client.post('/api/sensor/batch/', json.dumps([{'suhu': 1, 'kelembapan': 2}]),
+                                        content_type='application/json')
+        self.assertRegex(response['Server-Timing'], r'^validate;dur=[\d.]+, total;dur=[\d.]+$')
+        stats = instrumentation.snapshot()
+        self.assertEqual(stats[('sensor_batch', 'validate')]['count'], 1)
+        self.assertEqual(stats[('sensor_batch', 'total')]['count'], 1)
+
+    @staticmethod
+    def _fake_ingest(items, **kwargs):
+        from . import instrumentation
+
+        with instrumentation.span('validate'):
+            pass
+        return {'accepted': len(items), 'rejected': 0, 'duplicates': 0, 'influx': True, 'results': []}
+
+    def test_metrics_requires_token_or_staff(self):
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+        from . import instrumentation
+
+        instrumentation.observe('sensor_data', 'influx', 0.02)
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        with override_settings(METRICS_TOKEN='rahasia'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer salah').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer rahasia')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('smartfruit_stage_duration_seconds_bucket{endpoint="sensor_data",stage="influx",le="0.025"} 1', body)
+        self.assertIn('smartfruit_stage_duration_seconds_quantile{endpoint="sensor_data",stage="influx",quantile="0.99"}', body)
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class LoggingTests(TestCase):
+    def make_record(self, level, msg, *args, **extra):
+        import logging
+
+        record = logging.getLogger('monitoring.readings').makeRecord(
+            'monitoring.readings', level, __file__, 1, msg, args, None, extra=extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        import json
+        import logging
+        from . import logs
+
+        line = logs.JsonFormatter().format(self.make_record(logging.INFO, 'masuk %s', 'esp32-a', device_id='esp32-a'))
+        entry = json.loads(line)
+        self.assertEqual((entry['level'], entry['logger'], entry['msg']), ('INFO', 'monitoring.readings', 'masuk esp32-a'))
+        self.assertEqual(entry['device_id'], 'esp32-a')
+
+    def test_sampling_filter_keeps_one_in_n_debug_records(self):
+        import logging
+        from . import logs
+
+        sampler = logs.SamplingFilter(every=10)
+        kept = sum(sampler.filter(self.make_record(logging.DEBUG, 'reading')) for _ in range(100))
+        self.assertEqual(kept, 10)
+        self.assertTrue(all(sampler.filter(self.make_record(logging.WARNING, 'x')) for _ in range(5)))
+
+    def test_queue_handler_writes_from_listener_thread(self):
+        import io
+        import json
+        import logging
+        from unittest import mock
+        from . import logs
+
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out):
+            handler = logs.QueueLogHandler(fmt='json')
+        logger = logging.getLogger('monitoring.tests.queue')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            try:
+                raise ValueError('rusak')
+            except ValueError:
+                logger.error('gagal simpan %d reading', 3, exc_info=True)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        entry = json.loads(out.getvalue().strip())
+        self.assertEqual(entry['msg'], 'gagal simpan 3 reading')
+        self.assertIn('ValueError: rusak', entry['exc'])
+
+    def test_queue_handler_keeps_logging_after_fork(self):
+        import json
+        import logging
+        import os
+        import tempfile
+        from unittest import mock
+        from . import logs
+
+        if not hasattr(os, 'fork'):
+            self.skipTest('butuh os.fork')
+        with tempfile.TemporaryFile('w+') as out:
+            # Seperti gunicorn preload: handler dibuat di induk sebelum fork
+            with mock.patch('sys.stdout', out):
+                handler = logs.QueueLogHandler(fmt='json')
+            record = logging.LogRecord('monitoring.tests.fork', logging.INFO, __file__, 0, 'dari worker', None, None)
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    handler.handle(record)
+                    handler.stop()
+                    out.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            handler.close()
+            out.seek(0)
+            entries = [json.loads(line) for line in out if line.strip()]
+        self.assertEqual([e['msg'] for e in entries], ['dari worker'])
+
+
+class LoadTestHarnessTests(TestCase):
+    def test_device_profiles_follow_dataset_and_spoil(self):
+        import load_test
+
+        profiles = load_test.load_profiles()
+        self.assertEqual(sorted(profiles), ['Layak', 'Tidak Layak'])
+        device = load_test.VirtualDevice('d', profiles, status='Layak', spoil_steps=50,
+                                         rng=__import__('random').Random(1))
+        readings = [device.next_reading() for _ in range(200)]
+        early = sum(r['mq135'] for r in readings[:20]) / 20
+        late = sum(r['mq135'] for r in readings[-20:]) / 20
+        self.assertLess(early, profiles['Tidak Layak']['mq135'][0])
+        self.assertAlmostEqual(late, profiles['Tidak Layak']['mq135'][0], delta=3 * profiles['Tidak Layak']['mq135'][1])
+
+    def test_batch_readings_get_distinct_scheduled_timestamps(self):
+        import asyncio
+        import json
+        import load_test
+
+        class Pool:
+            bodies = []
+
+            async def post(self, path, body, content_type='application/json', headers=None):
+                self.bodies.append(json.loads(body))
+                return 200, b''
+
+            async def close(self):
+                pass
+
+        devices = load_test.make_devices(1, load_test.load_profiles(), seed=1)
+        asyncio.run(load_test.run_http(devices, ['batch'], rate=100, duration=0.3, pool=Pool(), batch_size=5))
+        ts = [r['ts'] for body in Pool.bodies for r in body['readings']]
+        self.assertGreater(len(ts), 5)
+        self.assertEqual(len(set(ts)), len(ts))
+        self.assertTrue(all(abs(b - a - 0.01) < 1e-3 for a, b in zip(ts, ts[1:])))
+
+    def test_http_run_reports_per_endpoint(self):
+        import asyncio
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import load_test
+
+        seen = []
+
+        class Stub(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                seen.append(self.path)
+                code = 503 if self.path == load_test.ENDPOINTS['batch'] else 200
+                self.send_response(code)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            devices = load_test.make_devices(10, load_test.load_profiles(), seed=1)
+
+            async def main():
+                pool = load_test.HttpPool(f'http://127.0.0.1:{server.server_address[1]}', size=4)
+                return await load_test.run_http(devices, ['data', 'batch'], rate=20, duration=0.5,
+                                                pool=pool, batch_size=5)
+            stats, elapsed = asyncio.run(main())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        data, batch = stats['data'].summary(elapsed), stats['batch'].summary(elapsed)
+        self.assertEqual(data['error_rate'], 0.0)
+        self.assertGreaterEqual(data['requests'], 40)
+        self.assertIsNotNone(data['latency_ms']['p99'])
+        self.assertEqual(batch['errors'], {'HTTP 503': batch['requests']})
+        self.assertEqual(len(seen), data['requests'] + batch['requests'])
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_compare_flags_regressions_beyond_threshold(self):
+        from . import benchmarks
+
+        report = benchmarks.compare(
+            {'a': {'median': 1.3}, 'b': {'median': 1.1}, 'c': {'median': 1.0}},
+            {'a': {'median': 1.0}, 'b': {'median': 1.0}}, threshold=0.2)
+        self.assertEqual([(r['name'], r['regressed']) for r in report], [('a', True), ('b', False), ('c', False)])
+        self.assertIsNone(report[2]['baseline'])
+
+    def test_command_fails_when_slower_than_baseline(self):
+        import io
+        import os
+        import tempfile
+        from django.core.management import CommandError, call_command
+        from . import benchmarks
+
+        name = 'views.calculate_overall_status'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            call_command('benchmark', name, rounds=50, baseline=path, save=True, stdout=io.StringIO())
+            self.assertIn(name, benchmarks.load_baseline(path))
+
+            benchmarks.save_baseline(path, {name: {'median': 1e-12}})
+            with self.assertRaisesRegex(CommandError, 'lebih lambat'):
+                call_command('benchmark', name, rounds=50, baseline=path, stdout=io.StringIO())
+
+            # Baseline tidak ada: gagal, bukan lolos diam-diam
+            missing = os.path.join(tmp, 'missing.json')
+            with self.assertRaisesRegex(CommandError, 'Belum ada baseline'):
+                call_command('benchmark', name, rounds=50, baseline=missing, stdout=io.StringIO())
+            call_command('benchmark', name, rounds=50, baseline=missing, allow_missing_baseline=True,
+                         stdout=io.StringIO())
+
+
+class FakeInfluxTests(TestCase):
+    def setUp(self):
+        from influxdb_client import InfluxDBClient
+        from .fake_influx import FakeInflux
+
+        self.server = FakeInflux().start()
+        self.addCleanup(self.server.stop)
+        self.client = InfluxDBClient(url=self.server.url, token='t', org='o')
+        self.addCleanup(self.client.close)
+        self.now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+
+    def _write(self, count=6, device='esp32-a'):
+        from influxdb_client import Point, WritePrecision
+        from influxdb_client.client.write_api import SYNCHRONOUS
+
+        write_api = self.client.write_api(write_options=SYNCHRONOUS)
+        write_api.write('bucket', 'o', [
+            Point('monitoring').tag('device', device).field('suhu', 20.0 + i).field('status', i % 3)
+            .time(self.now - timedelta(seconds=count - i), WritePrecision.NS)
+            for i in range(count)
+        ])
+
+    def test_health_and_write(self):
+        self.assertEqual(self.client.health().status, 'pass')
+        self._write()
+        self.assertEqual(self.server.store.count('bucket'), 12)
+
+    def test_filter_last_returns_latest_per_field(self):
+        self._write()
+        self._write(device='esp32-b', count=2)
+        tables = self.client.query_api().query(
+            'from(bucket: "bucket") |> range(start: -5m) '
+            '|> filter(fn: (r) => r["_measurement"] == "monitoring" and r.device == "esp32-a") |> last()')
+        values = {r.get_field(): r.get_value() for t in tables for r in t.records}
+        self.assertEqual(values, {'suhu': 25.0, 'status': 2})
+
+    def test_export_query_pivots_to_frame(self):
+        self._write()
+        query = influx_export.build_query(self.now - timedelta(minutes=1), self.now + timedelta(seconds=1),
+                                          ['suhu', 'status'], ['esp32-a'], 'monitoring', 'bucket')
+        frame = self.client.query_api().query_data_frame(query)
+        self.assertEqual(len(frame), 6)
+        self.assertEqual(list(frame['suhu']), [20.0, 21.0, 22.0, 23.0, 24.0, 25.0])
+        self.assertTrue(frame['_time'].is_monotonic_increasing)
+
+    def test_aggregate_window_mean(self):
+        self._write()
+        tables = self.client.query_api().query(
+            'from(bucket: "bucket") |> range(start: -1h) |> filter(fn: (r) => r._field == "suhu") '
+            '|> aggregateWindow(every: 1d, fn: mean, createEmpty: false)')
+        self.assertEqual([r.get_value() for t in tables for r in t.records], [22.5])
+
+    def test_unsupported_function_is_bad_request(self):
+        from influxdb_client.rest import ApiException
+
+        with self.assertRaises(ApiException) as ctx:
+            self.client.query_api().query('from(bucket: "bucket") |> range(start: -1h) |> map(fn: (r) => r)')
+        self.assertEqual(ctx.exception.status, 400)
+
+
+class LazyMLImportTests(TestCase):
+    # Batas waktu import URLconf di proses baru (detik); ML dimuat belakangan
+    STARTUP_BUDGET = 1.0
+    HEAVY = ('sklearn', 'pandas', 'joblib', 'ml_service')
+
+    def test_url_loading_skips_ml_stack(self):
+        from django.conf import settings
+        from .benchmarks import import_profile
+
+        profile = import_profile(
+            "import os, django; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartfruit.settings'); "
+            "django.setup(); import smartfruit.urls", cwd=settings.BASE_DIR)
+        self.assertIn('monitoring.views', profile)
+        self.assertEqual([m for m in self.HEAVY if m in profile], [])
+        self.assertLess(profile['smartfruit.urls'], self.STARTUP_BUDGET)
+
+    def test_ml_endpoints_load_on_first_use(self):
+        from rest_framework.test import APIClient
+        from . import ml_runtime
+
+        client = APIClient()
+        response = client.post('/api/ml/predict/', {'mq2': 100, 'mq3': 100, 'mq135': 100,
+                                                    'humidity': 60, 'temperature': 25}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.json()['status'], ('Layak', 'Tidak Layak'))
+        self.assertEqual(client.get('/api/ai/learning-info/').status_code, 200)
+        self.assertLessEqual({'ai_agent', 'ml_service'}, set(ml_runtime.loaded()))
+
+
+class ModelSharingTests(TestCase):
+    def test_artifact_cached_until_file_changes(self):
+        import os
+        import tempfile
+        from unittest import mock
+        import joblib
+        import numpy as np
+        from . import ml_runtime
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.joblib')
+            joblib.dump({'weights': np.arange(4.0)}, path)
+            with mock.patch.dict(ml_runtime.ARTIFACTS, {'test': path}):
+                first = ml_runtime.artifact('test')
+                self.assertIs(ml_runtime.artifact('test'), first)
+
+                joblib.dump({'weights': np.ones(2)}, path)
+                os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+                self.assertEqual(list(ml_runtime.artifact('test')['weights']), [1.0, 1.0])
+            ml_runtime._artifacts.pop('test', None)
+            with mock.patch.dict(ml_runtime.ARTIFACTS, {'missing': os.path.join(tmp, 'none.joblib')}):
+                self.assertIsNone(ml_runtime.artifact('missing'))
+
+    def test_memory_report_reads_smaps_rollup(self):
+        import io
+        import json
+        from django.core.management import call_command
+        from . import instrumentation
+
+        if not instrumentation.process_memory():
+            self.skipTest('smaps_rollup tidak tersedia')
+        out = io.StringIO()
+        call_command('memory_report', json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['processes'][0]['pss'], 0)
+        self.assertGreaterEqual(report['total']['rss'], report['total']['pss'])
+        self.assertIn('smartfruit_process_memory_bytes', instrumentation.render_prometheus())
+
+
+class InferencePipelineTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from . import inference
+
+        self.pipeline = inference.get_pipeline()
+        if self.pipeline is None:
+            self.skipTest('models/*.joblib tidak ada')
+        user = User.objects.create_user('ai', password='pw')
+        self.client.force_login(user)
+
+    def test_affine_scaler_matches_sklearn_pipeline(self):
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from . import inference, ml_runtime
+
+        model = joblib.load(ml_runtime.ARTIFACTS['fruit_quality_joblib'])
+        scaler = joblib.load(ml_runtime.ARTIFACTS['scaler'])
+        rng = np.random.default_rng(0)
+        X = rng.normal([28, 65, 50, 30, 40], [3, 10, 20, 10, 15], size=(200, 5))
+        # Scaler dilatih dengan DataFrame: transform dengan nama kolom yang sama (tanpa warning)
+        scaled = scaler.transform(pd.DataFrame(X, columns=scaler.feature_names_in_))
+        expected = model.predict_proba(scaled)
+        sklearn_pipeline = inference.QualityPipeline(model, scaler)
+        np.testing.assert_allclose(sklearn_pipeline.transform(X), scaled, rtol=1e-12)
+        np.testing.assert_allclose(sklearn_pipeline.predict_proba(X), expected)
+        # Pipeline yang dipakai endpoint (portabel atau sklearn) memberi hasil yang sama
+        np.testing.assert_allclose(self.pipeline.predict_proba(X), expected, atol=1e-6)
+        labels = [r['status'] for r in self.pipeline.predict(X)]
+        self.assertEqual(labels, list(model.predict(scaled)))
+
+    def test_single_and_batch_endpoints_agree(self):
+        import json
+
+        readings = [{'suhu': 27.5, 'kelembapan': 65, 'mq2': 45, 'mq3': 30, 'mq135': 40},
+                    {'suhu': 35, 'kelembapan': 90, 'mq2': 150, 'mq3': 80, 'mq135': 120}]
+        single = [self.client.post('/api/ai/predict/', json.dumps(r), content_type='application/json').json()
+                  for r in readings]
+        batch = self.client.post('/api/ai/predict/batch/', json.dumps({'readings': readings}),
+                                 content_type='application/json').json()
+        self.assertEqual(batch['count'], 2)
+        self.assertEqual(batch['results'], single)
+        self.assertEqual(set(single[0]['probabilities']), set(self.pipeline.classes))
+
+    def test_batch_rejects_invalid_reading(self):
+        response = self.client.post('/api/ai/predict/batch/', '[{"suhu": "panas"}]',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PredictionCacheTests(TestCase):
+    def setUp(self):
+        from . import ml_runtime
+
+        module = ml_runtime.ml_service()
+        if module is None:
+            self.skipTest('ml_service tidak tersedia')
+        self.module = module
+        self.service = module.MLService()
+
+    def test_lru_quantizes_and_evicts(self):
+        cache = self.module.PredictionCache(maxsize=2)
+        a = cache.key((29.721, 14.83, 22.75, 55.1, 34.6))
+        self.assertEqual(a, cache.key((29.7199, 14.83, 22.75, 55.1, 34.6)))
+        self.assertIsNone(cache.get(a, 1))
+        cache.put(a, 1, {'status': 'Layak'})
+        cache.put(cache.key((1, 1, 1, 1, 1)), 1, {'status': 'Layak'})
+        self.assertEqual(cache.get(a, 1), {'status': 'Layak'})
+        cache.put(cache.key((2, 2, 2, 2, 2)), 1, {'status': 'Layak'})
+        self.assertIsNone(cache.get(cache.key((1, 1, 1, 1, 1)), 1))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_repeated_state_hits_cache_until_model_changes(self):
+        from . import instrumentation, ml_runtime
+
+        first = self.service.predict_status(180.0, 1480.0, 590.0, 70.0, 27.5)
+        again = self.service.predict_status(180.001, 1480.0, 590.0, 70.02, 27.5)
+        self.assertEqual({k: again[k] for k in ('status', 'confidence', 'probabilities')},
+                         {k: first[k] for k in ('status', 'confidence', 'probabilities')})
+        stats = self.service.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+        self.service.model = self.service.model  # model baru (mis. setelah retrain)
+        self.service.predict_status(180.0, 1480.0, 590.0, 70.0, 27.5)
+        stats = self.service.cache.stats()
+        self.assertEqual((stats['misses'], stats['invalidations'], stats['size']), (2, 1, 1))
+
+        ml_runtime.ml_service()
+        self.assertIn('smartfruit_ml_cache_hit_ratio', instrumentation.render_prometheus())
+
+
+class PortableForestTests(TestCase):
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        from . import ml_runtime
+
+        self.portable = ml_runtime._load('portable_forest')
+        self.source = ml_runtime.ARTIFACTS['fruit_quality_joblib']
+        if self.portable is None or not os.path.exists(self.source):
+            self.skipTest('portable_forest / model joblib tidak ada')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_export_roundtrip_matches_sklearn(self):
+        import os
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from . import ml_runtime
+
+        model = joblib.load(self.source)
+        scaler = joblib.load(ml_runtime.ARTIFACTS['scaler'])
+        path = os.path.join(self.tmp, 'model.npz')
+        self.portable.export(model, path, scaler=scaler)
+        forest = self.portable.load(path)
+        X = np.random.default_rng(1).normal(scaler.mean_, scaler.scale_, size=(500, 5))
+        scaled = scaler.transform(pd.DataFrame(X, columns=scaler.feature_names_in_))
+        np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(scaled), atol=1e-6)
+        self.assertEqual(list(forest.predict(X)), list(model.predict(scaled)))
+        self.assertEqual(list(forest.classes_), list(model.classes_))
+
+    def test_auto_runtime_ignores_stale_export(self):
+        import os
+        import shutil
+        import joblib
+
+        source = os.path.join(self.tmp, 'model.pkl')
+        shutil.copy(self.source, source)
+        self.portable.export(joblib.load(source), self.portable.sibling(source), source_path=source)
+        self.assertEqual(self.portable.choose(source), self.portable.sibling(source))
+        self.assertIsNone(self.portable.choose(source, 'sklearn'))
+        with open(source, 'ab') as f:  # pickle dilatih ulang tanpa export
+            f.write(b'\0')
+        self.assertIsNone(self.portable.choose(source))
+        self.assertEqual(self.portable.choose(source, 'portable'), self.portable.sibling(source))
+
+    def test_auto_runtime_ignores_export_with_stale_scaler(self):
+        import os
+        import shutil
+        import joblib
+        from . import ml_runtime
+
+        source = os.path.join(self.tmp, 'model.joblib')
+        scaler = os.path.join(self.tmp, 'scaler.joblib')
+        shutil.copy(self.source, source)
+        shutil.copy(ml_runtime.ARTIFACTS['scaler'], scaler)
+        meta = self.portable.export(joblib.load(source), self.portable.sibling(source), scaler=joblib.load(scaler),
+                                    source_path=source, scaler_path=scaler)
+        self.assertIsNotNone(meta['scaler_sha256'])
+        self.assertEqual(self.portable.choose(source, scaler_path=scaler), self.portable.sibling(source))
+        with open(scaler, 'ab') as f:  # scaler dilatih ulang, model (pickle) tetap
+            f.write(b'\0')
+        self.assertIsNone(self.portable.choose(source, scaler_path=scaler))
+
+    def test_portable_predict_does_not_import_sklearn(self):
+        from django.conf import settings
+        from .benchmarks import import_profile
+
+        code = (
+            "import sys; sys.path.insert(0, 'ml'); import portable_forest as p; "
+            "m = p.load('models/fruit_quality_model.npz'); m.predict([[28, 65, 50, 30, 40]])"
+        )
+        self.assertNotIn('sklearn', import_profile(code, cwd=settings.BASE_DIR))
+
+
+class TuningTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from . import ml_runtime
+
+        self.tuning = ml_runtime._load('tuning')
+        if self.tuning is None:
+            self.skipTest('ml/tuning.py tidak bisa dimuat')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_search_caches_folds_by_dataset_and_params(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(40, 3))
+        y = np.where(X[:, 0] > 0, 'Layak', 'Tidak Layak')
+        grid = {'n_estimators': [3, 6], 'max_depth': [2]}
+        self.tuning.LATENCY_REPEAT = 5
+        self.addCleanup(setattr, self.tuning, 'LATENCY_REPEAT', 200)
+
+        first = self.tuning.search(X, y, grid=grid, n_splits=3, jobs=2, cache_dir=self.tmp.name)
+        self.assertEqual((first['stats']['trained'], first['stats']['cached']), (6, 0))
+        self.assertEqual(len(first['results']), 2)
+        self.assertGreater(first['results'][0]['accuracy'], 0.8)
+
+        grid['n_estimators'].append(9)
+        again = self.tuning.search(X, y, grid=grid, n_splits=3, jobs=2, cache_dir=self.tmp.name)
+        self.assertEqual((again['stats']['trained'], again['stats']['cached']), (3, 6))
+
+        X[0, 0] += 1  # dataset berubah = hash baru
+        changed = self.tuning.search(X, y, grid=grid, n_splits=3, jobs=2, cache_dir=self.tmp.name)
+        self.assertEqual(changed['stats']['cached'], 0)
+
+    def test_latency_repeat_read_at_call_time(self):
+        from unittest import mock
+
+        predict = mock.Mock()
+        self.tuning.LATENCY_REPEAT = 5
+        self.addCleanup(setattr, self.tuning, 'LATENCY_REPEAT', 200)
+        self.tuning._latency(predict, [[0.0]])
+        self.assertEqual(predict.call_count, 6)  # 1 pemanasan + LATENCY_REPEAT
+
+    def test_select_prefers_faster_model_within_tolerance(self):
+        results = [
+            {'params': {'n_estimators': 100}, 'accuracy': 0.95, 'latency_us': 90},
+            {'params': {'n_estimators': 25}, 'accuracy': 0.945, 'latency_us': 40},
+            {'params': {'n_estimators': 5}, 'accuracy': 0.80, 'latency_us': 20},
+            {'params': {'n_estimators': 50}, 'accuracy': 0.90, 'latency_us': 60},
+        ]
+        self.assertEqual(self.tuning.select(results)['params'], {'n_estimators': 25})
+        self.assertEqual(self.tuning.select(results, tolerance=0)['params'], {'n_estimators': 100})
+        self.assertEqual([r['latency_us'] for r in self.tuning.pareto(results)], [20, 40, 90])
+
+
+class FeatureSchemaTests(TestCase):
+    def test_records_accept_aliases_and_return_contiguous_float32(self):
+        import numpy as np
+        from ml import features
+
+        X = features.from_records([
+            {'suhu': '27.5', 'kelembapan': 65, 'MQ2': 45, 'mq3': 30},
+            {'temperature': 30, 'humidity': '', 'gas': 3, 'mq135': 12},
+        ], features.LAYOUTS['fruit'])
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(X.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(X, [[27.5, 65, 45, 30, 0], [30, 0, 3, 0, 12]])
+        np.testing.assert_array_equal(features.from_columns({'suhu': [27.5], 'mq2': [45]}), [[45, 0, 0, 0, 27.5]])
+        with self.assertRaisesMessage(ValueError, 'humidity'):
+            features.from_records([{'kelembapan': 140}])
+        with self.assertRaises(ValueError):
+            features.from_records([{'suhu': 'panas'}])
+
+    def test_frames_with_either_csv_header_give_same_arrays(self):
+        import numpy as np
+        import pandas as pd
+        from ml import features
+
+        upper = pd.DataFrame({'MQ2': [29.56], 'MQ3': [14.83], 'MQ135': [22.86], 'Humidity': [55.1],
+                              'Temperature': [34.6], 'Label': ['Layak']})
+        lower = pd.DataFrame({'temperature': [34.6], 'humidity': [55.1], 'mq2': [29.56], 'mq3': [14.83],
+                              'mq135': [22.86], 'status': ['Layak']})
+        np.testing.assert_array_equal(features.from_frame(upper), features.from_frame(lower))
+        self.assertEqual(list(features.labels(upper)), ['Layak'])
+        self.assertEqual(list(features.frame(upper).columns), [*features.FEATURES, 'status'])
+
+    def test_order_follows_model_feature_names(self):
+        import numpy as np
+        from ml import features
+
+        class Model:
+            n_features_in_ = 5
+            feature_names_in_ = np.array(['suhu', 'kelembapan', 'mq2', 'mq3', 'mq135'])
+
+        self.assertEqual(features.order_for(Model()), features.LAYOUTS['fruit'])
+        legacy = type('Legacy', (), {'n_features_in_': 3})()
+        self.assertEqual(features.order_for(legacy, default=features.LAYOUTS['fruit_legacy']),
+                         ('temperature', 'humidity', 'mq2'))
+        with self.assertRaises(ValueError):
+            features.order_for(legacy)
+
+    def test_ml_predict_accepts_aliases_and_rejects_out_of_range(self):
+        from . import ml_runtime
+
+        if ml_runtime.ml_service() is None:
+            self.skipTest('ml_service tidak tersedia')
+        canonical = self.client.post('/api/ml/predict/', {'mq2': 180, 'mq3': 1480, 'mq135': 590,
+                                                          'humidity': 70, 'temperature': 27.5}).json()
+        alias = self.client.post('/api/ml/predict/', {'MQ2': 180, 'MQ3': 1480, 'MQ135': 590,
+                                                      'kelembapan': 70, 'suhu': 27.5}).json()
+        self.assertEqual(alias['status'], canonical['status'])
+        self.assertEqual(alias['probabilities'], canonical['probabilities'])
+        response = self.client.post('/api/ml/predict/', {'mq2': 180, 'humidity': 250})
+        self.assertEqual(response.status_code, 400)
@@ -4,6 +4,8 @@ from django.contrib.auth import views as auth_views
 from monitoring import views
 from monitoring import views_auth
 from monitoring import views_admin
+from monitoring import views_ai
+from monitoring import instrumentation
 
 urlpatterns = [
     # Main pages
@@ -23,15 +25,20 @@ urlpatterns = [
     
     # Data export
     path('export/csv/', views.export_csv, name='export_csv'),
+    path('export/influx/', views.export_influx, name='export_influx'),
     
     # API URLs - Sensors & Data
     path('api/sensor/update/', views.update_sensor, name='update_sensor'),
     path('api/sensor/status/', views.get_latest_status, name='get_latest_status'),
     path('api/sensor/history/', views.get_sensor_history, name='get_sensor_history'),
     path('api/sensor/data/', views.sensor_data, name='sensor_data'),
+    path('api/sensor/batch/', views.sensor_batch, name='sensor_batch'),
     path('api/status/', views.api_status_influx, name='api_status'),
     path('api/register-token/', views.register_token, name='register_token'),
 
+    # Metrics Prometheus (token Bearer METRICS_TOKEN atau user staff)
+    path('metrics', instrumentation.metrics_view, name='metrics'),
+
     # API training status sensor
     path('api/train-status/', views.api_train_status, name='api_train_status'),
 
@@ -54,6 +61,11 @@ urlpatterns = [
     # API URLs - AI Agent
     path('api/ai/learning-info/', views.ai_learning_info, name='ai_learning_info'),
     path('api/ai/reset-learning/', views.ai_reset_learning, name='ai_reset_learning'),
+
+    # API URLs - Model kualitas buah (models/*.joblib)
+    path('api/ai/predict/', views_ai.predict_quality, name='ai_predict_quality'),
+    path('api/ai/predict/batch/', views_ai.predict_quality_batch, name='ai_predict_quality_batch'),
+    path('api/ai/model-info/', views_ai.model_info, name='ai_model_info'),
     
     # AJAX auth endpoints (for backward compatibility)
     path('api/ajax-register/', views_auth.ajax_register, name='ajax_register'),
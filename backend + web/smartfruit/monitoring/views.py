@@ -19,38 +19,38 @@ def landing_auth(request):
         return redirect('dashboard')
     return render(request, 'landing_auth.html')
 
+import math
 import os
-import csv
-import pickle
-import numpy as np
+import logging
 import json
 import requests
-from django.http import HttpResponse, JsonResponse
-from rest_framework.decorators import api_view
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from .models import SensorData, DeviceToken, ContactMessage
+from .parsers import SENSOR_PARSERS
 from .serializers import SensorDataSerializer
 from . import influx_client
+from . import export
+from . import influx_export
+from . import devices
+from . import storage
+from . import notifications
+from . import alerts
+from . import payloads
+from . import batch
+from . import instrumentation
+from . import ml_runtime
+from ml import features as schema
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from rest_framework import status
 
-# Import ML Service & AI Agent
-import sys
-ML_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ml')
-if ML_PATH not in sys.path:
-    sys.path.insert(0, ML_PATH)
+logger = logging.getLogger(__name__)
+# Log per reading; disampling lewat filter di settings.LOGGING
+reading_log = logging.getLogger('monitoring.readings')
 
-try:
-    from ml_service import predict_status as ml_predict, add_realtime_data as ml_add_data
-    from ai_agent import analyze_sensor_data as ai_analyze
-    ML_ENABLED = True
-    AI_ENABLED = True
-    print("✅ ML Service & AI Agent loaded successfully")
-except Exception as e:
-    ML_ENABLED = False
-    AI_ENABLED = False
-    print(f"⚠️ ML/AI Service not available: {e}")
+# ML Service & AI Agent dimuat lazy saat pertama dipakai (lihat ml_runtime)
 
 
 # ==========================================================
@@ -61,9 +61,9 @@ def register_token(request):
     token = request.data.get('token')
     if token:
         DeviceToken.objects.update_or_create(token=token)
-        print(f"DEBUG: Token device baru diregister = {token}")
+        logger.debug("Token device baru diregister: %s...", token[:16])
         return Response({'status': 'ok'})
-    print("WARNING: Tidak ada token di request")
+    logger.warning("Tidak ada token di request")
     return Response({'status': 'error', 'message': 'No token'}, status=400)
 
 
@@ -71,60 +71,57 @@ def register_token(request):
 # 🔔 Kirim Notifikasi FCM
 # ==========================================================
 def send_fcm_notification(token, title, body):
-    server_key = "YOUR_FCM_SERVER_KEY"  # ganti dengan server key FCM Anda
-    url = "https://fcm.googleapis.com/fcm/send"
-    headers = {
-        "Authorization": "key=" + server_key,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "to": token,
-        "notification": {
-            "title": title,
-            "body": body
-        }
-    }
-    try:
-        r = requests.post(url, json=payload, headers=headers)
-        print(f"DEBUG: FCM response = {r.status_code}, {r.text}")
-    except Exception as e:
-        print("ERROR: Gagal kirim FCM:", e)
+    """Kirim langsung ke satu token (sinkron). Untuk alert gunakan alerts.process()."""
+    result = notifications.send_multicast([token], title, body)
+    notifications.prune_tokens(result)
+    logger.debug("FCM response: %s sukses, %s gagal", result['success'], result['failure'])
 
 
 # ==========================================================
 # 📊 Export Data ke CSV
 # ==========================================================
 def export_csv(request):
-    qs = SensorData.objects.all()
-    date_str = request.GET.get('date')
-    time_str = request.GET.get('time')
-    status = request.GET.get('status')
-
-    if date_str:
-        qs = qs.filter(timestamp__date=date_str)
-    if time_str:
-        qs = qs.filter(timestamp__time=time_str)
-    if status:
-        qs = qs.filter(status=status)
-
-    print(f"DEBUG: Export {qs.count()} data ke CSV (filter: date={date_str}, time={time_str}, status={status})")
-
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename=\"sensor_data.csv\"'
-    writer = csv.writer(response)
-    writer.writerow(['Waktu', 'Suhu', 'Kelembapan', 'MQ2 (ppm)', 'MQ3 (ppm)', 'MQ135 (ppm)', 'Status'])
-
-    for row in qs.order_by('-timestamp'):
-        writer.writerow([
-            row.timestamp,
-            row.temperature,
-            row.humidity,
-            getattr(row, 'mq2', None),
-            getattr(row, 'mq3', None),
-            getattr(row, 'mq135', None),
-            row.status
-        ])
+    """
+    Export SensorData ke CSV secara streaming.
+
+    Query params: ``date``, ``start``, ``end``, ``time``, ``status``,
+    ``compress=gzip`` untuk file .csv.gz.
+    """
+    try:
+        qs = export.filter_queryset(SensorData.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    logger.info("Export CSV (filter: %s)", request.GET.dict())
+
+    chunks = export.iter_csv(qs.order_by('-timestamp'))
+    return export.streaming_csv_response(chunks, compress=export.wants_gzip(request.GET))
+
+
+# ==========================================================
+# 📊 Export Data dari InfluxDB (CSV / CSV.gz / Parquet / Arrow)
+# ==========================================================
+def export_influx(request):
+    """
+    Stream data historis InfluxDB.
 
+    Query params: ``start``, ``end``, ``format`` (csv, csv.gz, parquet, arrow),
+    ``columns``, ``device``, ``chunk_hours``. Untuk export sangat besar
+    gunakan ``python manage.py export_influx`` agar tidak membebani web worker.
+    """
+    try:
+        opts = influx_export.parse_params(request.GET)
+        frames = influx_export.iter_frames(
+            opts['start'], opts['stop'], columns=opts['columns'],
+            devices=opts['devices'], chunk=opts['chunk'],
+        )
+        chunks = influx_export.iter_export(frames, opts['format'], opts['columns'], opts['devices'])
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    content_type, ext = influx_export.FORMATS[opts['format']]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="sensor_influx.{ext}"'
     return response
 
 
@@ -132,10 +129,9 @@ def export_csv(request):
 # 📊 Dashboard View
 # ==========================================================
 @login_required
-@login_required
 def dashboard(request):
-    latest = SensorData.objects.last()
-    history = SensorData.objects.all().order_by('-timestamp')[:10]
+    history = list(SensorData.objects.order_by('-timestamp')[:10])
+    latest = history[0] if history else None
 
     context = {
         'title': 'Dashboard',
@@ -175,24 +171,18 @@ def dashboard(request):
 # 🤖 AI Model Loader
 # ==========================================================
 def load_model():
-    MODEL_PATH = os.path.join(os.path.dirname(__file__), "fruit_quality_model.pkl")
-    try:
-        with open(MODEL_PATH, "rb") as f:
-            model = pickle.load(f)
-        print("DEBUG: Model AI berhasil diload")
-        return model
-    except FileNotFoundError:
-        print("WARNING: Model AI tidak ditemukan")
-        return None
-    except Exception as e:
-        print("ERROR: Gagal load model AI:", e)
-        return None
+    # Dimuat sekali per proses (dibagi antar worker), lihat ml_runtime.artifact
+    model = ml_runtime.artifact('fruit_quality')
+    if model is None:
+        logger.warning("Model AI tidak tersedia")
+    return model
 
 
 # ==========================================================
 # 📡 API untuk Update Sensor
 # ==========================================================
 @api_view(['POST'])
+@parser_classes(SENSOR_PARSERS)
 def update_sensor(request):
     temperature = request.data.get("temperature")
     humidity = request.data.get("humidity")
@@ -218,20 +208,43 @@ def update_sensor(request):
         mq135 = float(mq135) if mq135 is not None else 0.0
     except (ValueError, TypeError):
         mq135 = 0.0
+    # Suhu & kelembapan wajib (kolom NOT NULL): tolak sekarang, bukan saat flush buffer
+    try:
+        temperature = float(temperature)
+        humidity = float(humidity)
+        if not (math.isfinite(temperature) and math.isfinite(humidity)):
+            raise ValueError
+    except (ValueError, TypeError):
+        return Response({'error': 'temperature dan humidity wajib diisi angka'}, status=400)
+    reading = {'temperature': temperature, 'humidity': humidity, 'mq2': mq2, 'mq3': mq3, 'mq135': mq135}
+    # Rentang fitur (ml/features.py) dicek di sini, sama seperti ml_predict / batch ingest:
+    # reading di luar rentang ditolak, bukan disimpan tanpa prediksi
+    try:
+        schema.from_records([reading])
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
 
-    print(f"DEBUG: Data sensor masuk => Suhu={temperature}, Hum={humidity}, MQ2={mq2}, MQ3={mq3}, MQ135={mq135}")
+    device_id = devices.resolve_device_id(request.data, request)
+    # Waktu ukur dari device (ts/sent_at) bila ada, selain itu waktu terima
+    measured_at = devices.reading_time(request.data, device_id)
 
-    # For model features keep previous shape; use mq2 as representative gas if available
-    features = np.array([[temperature, humidity, mq2]])
-    model = load_model()
+    reading_log.debug("Data sensor masuk => Device=%s, Suhu=%s, Hum=%s, MQ2=%s, MQ3=%s, MQ135=%s",
+                      device_id, temperature, humidity, mq2, mq3, mq135)
+
+    with instrumentation.span('model_load'):
+        model = load_model()
 
     jenis_buah = "UNKNOWN"
     status = "UNKNOWN"
 
     if model:
         try:
-            result = model.predict(features)
-            print("DEBUG: Hasil prediksi model =", result)
+            # Kolom sesuai model (model lama: suhu, kelembapan, mq2; lihat ml/features.py)
+            order = schema.order_for(model, default=schema.LAYOUTS['fruit_legacy'])
+            features = schema.from_records([reading], order, fill=None, check=False)
+            with instrumentation.span('model'):
+                result = model.predict(features)
+            reading_log.debug("Hasil prediksi model = %s", result)
 
             if isinstance(result[0], (list, tuple)) and len(result[0]) == 2:
                 status_pred, jenis_pred = result[0]
@@ -240,28 +253,32 @@ def update_sensor(request):
             else:
                 status = "LAYAK" if result[0] == 0 else "TIDAK LAYAK"
         except Exception as e:
-            print("ERROR: Gagal prediksi model AI:", e)
+            logger.error("Gagal prediksi model AI: %s", e)
 
-    data = SensorData.objects.create(
+    data = SensorData(
+        timestamp=measured_at,
         temperature=temperature,
         humidity=humidity,
         mq2=mq2,
         mq3=mq3,
         mq135=mq135,
         status=status,
-        jenis_buah=jenis_buah
+        jenis_buah=jenis_buah,
+        device_id=device_id
     )
+    with instrumentation.span('db'):
+        storage.save_readings([data])
+    devices.cache_latest(device_id, {
+        'suhu': temperature, 'kelembapan': humidity,
+        'mq2': mq2, 'mq3': mq3, 'mq135': mq135, 'device_id': device_id,
+    }, ts=measured_at.timestamp())
 
-    print(f"DEBUG: Data sensor tersimpan => ID={data.id}, Status={status}")
+    reading_log.debug("Data sensor tersimpan => device=%s, Status=%s", device_id, status)
 
-    if status == "TIDAK LAYAK":
-        tokens = DeviceToken.objects.values_list('token', flat=True)
-        for device_token in tokens:
-            send_fcm_notification(
-                device_token,
-                "Peringatan Kualitas Buah",
-                f"Status buah TIDAK LAYAK! Suhu: {temperature}°C, Kelembapan: {humidity}%"
-            )
+    # Notifikasi hanya saat alert device terbuka/tertutup (lihat monitoring/alerts.py)
+    alerts.process(device_id, values={
+        'suhu': temperature, 'kelembapan': humidity, 'mq2': mq2, 'mq3': mq3, 'mq135': mq135,
+    }, status=status, now=measured_at.timestamp())
 
     serializer = SensorDataSerializer(data)
     return Response(serializer.data)
@@ -293,26 +310,21 @@ def get_status(request):
                 'alasan': status_result['alasan'],
                 'timestamp': latest_point.get('time')
             }
-            print("DEBUG: Ambil status terakhir dari InfluxDB =", resp)
+            logger.debug("Ambil status terakhir dari InfluxDB = %s", resp)
             return Response(resp)
     except Exception as e:
-        print("WARNING: get_status - InfluxDB query failed:", e)
+        logger.warning("get_status - InfluxDB query failed: %s", e)
 
     # Fallback to Django DB
-    latest = SensorData.objects.last()
+    latest = SensorData.objects.latest_reading()
     if latest:
-        print("DEBUG: Ambil status terakhir dari DB =", latest)
+        logger.debug("Ambil status terakhir dari DB = %s", latest)
         serializer = SensorDataSerializer(latest)
         return Response(serializer.data)
-    print("WARNING: Tidak ada data sensor di DB")
+    logger.warning("Tidak ada data sensor di DB")
     return Response({"status": "error", "message": "No data"}, status=404)
 
-import json
-import os
-from ml.ai_agent import SensorAIAgent
-
 TRAIN_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'ml', 'train_data.json')
-ai_agent_instance = SensorAIAgent()
 
 @api_view(['POST'])
 def api_train_status(request):
@@ -345,12 +357,15 @@ def api_train_status(request):
         json.dump(train_data, f)
 
     # Update AI Agent (tambahkan ke buffer)
-    ai_agent_instance.history_buffer['suhu'].append(float(data['suhu']))
-    ai_agent_instance.history_buffer['kelembapan'].append(float(data['kelembapan']))
-    ai_agent_instance.history_buffer['mq2'].append(float(data['mq2']))
-    ai_agent_instance.history_buffer['mq3'].append(float(data['mq3']))
-    ai_agent_instance.history_buffer['mq135'].append(float(data['mq135']))
-    ai_agent_instance.total_readings += 1
+    ai = ml_runtime.ai_agent()
+    if ai is not None:
+        agent = ai.ai_agent
+        agent.history_buffer['suhu'].append(float(data['suhu']))
+        agent.history_buffer['kelembapan'].append(float(data['kelembapan']))
+        agent.history_buffer['mq2'].append(float(data['mq2']))
+        agent.history_buffer['mq3'].append(float(data['mq3']))
+        agent.history_buffer['mq135'].append(float(data['mq135']))
+        agent.total_readings += 1
 
     return Response({'status': 'ok', 'message': 'Data latih diterima dan AI Agent diupdate.'})
 # ==========================================================
@@ -373,26 +388,20 @@ def get_history(request):
                 'mq135': r.get('mq135'),
                 'status': None
             })
-        print(f"DEBUG: Ambil history dari InfluxDB, total={len(out)}")
+        logger.debug("Ambil history dari InfluxDB, total=%d", len(out))
         return Response(out)
     except Exception as e:
-        print("WARNING: get_history - InfluxDB query failed:", e)
-
-    # Fallback to Django DB
-    qs = SensorData.objects.all()
-    date_str = request.GET.get('date')
-    time_str = request.GET.get('time')
-    status = request.GET.get('status')
+        logger.warning("get_history - InfluxDB query failed: %s", e)
 
-    if date_str:
-        qs = qs.filter(timestamp__date=date_str)
-    if time_str:
-        qs = qs.filter(timestamp__time=time_str)
-    if status:
-        qs = qs.filter(status=status)
+    # Fallback to Django DB (filter tanggal sebagai range supaya index timestamp terpakai)
+    try:
+        qs = export.filter_queryset(
+            SensorData.objects.for_device(devices.requested_device(request)), request.GET)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
 
-    history = qs.order_by('-timestamp')[:50]
-    print(f"DEBUG: Ambil history (filter: date={date_str}, time={time_str}, status={status}), total={history.count()}")
+    history = list(qs.order_by('-timestamp')[:50])
+    logger.debug("Ambil history (filter: %s), total=%d", request.GET.dict(), len(history))
 
     serializer = SensorDataSerializer(history, many=True)
     return Response(serializer.data)
@@ -407,85 +416,123 @@ from django.views.decorators.csrf import csrf_exempt
 def sensor_data(request):
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            # JSON, frame biner, CBOR atau MessagePack (sesuai Content-Type)
+            with instrumentation.span('parse'):
+                data = payloads.decode(request.body, request.content_type)
+                device_id = devices.resolve_device_id(data, request)
+                data['device_id'] = device_id
+                measured_at = devices.reading_time(data, device_id)
             
             # Save to InfluxDB
-            try:
-                from influxdb_client import InfluxDBClient, Point, WritePrecision
-                from influxdb_client.client.write_api import SYNCHRONOUS
-                from datetime import datetime
+            with instrumentation.span('influx'):
+                try:
+                    from influxdb_client import InfluxDBClient, Point, WritePrecision
+                    from influxdb_client.client.write_api import SYNCHRONOUS
                 
-                # Get InfluxDB configuration
-                url = os.environ.get('INFLUX_URL', 'http://103.151.63.80:8086')
-                token = os.environ.get('INFLUX_TOKEN', 'Wv4fUOXPpqTi7FFQDVskdQjrLVEaweO0wh00QYNKOdM1_wpQArozJdxz7esh7j-B0V24P3CcSa-aXogVSco9Yg==')
-                org = os.environ.get('INFLUX_ORG', 'polinela')
-                bucket = os.environ.get('INFLUX_BUCKET', 'datamonitoring')
+                    # Get InfluxDB configuration
+                    url = os.environ.get('INFLUX_URL', 'http://103.151.63.80:8086')
+                    token = os.environ.get('INFLUX_TOKEN', 'Wv4fUOXPpqTi7FFQDVskdQjrLVEaweO0wh00QYNKOdM1_wpQArozJdxz7esh7j-B0V24P3CcSa-aXogVSco9Yg==')
+                    org = os.environ.get('INFLUX_ORG', 'polinela')
+                    bucket = os.environ.get('INFLUX_BUCKET', 'datamonitoring')
                 
-                # Create InfluxDB client
-                client = InfluxDBClient(url=url, token=token, org=org)
-                write_api = client.write_api(write_options=SYNCHRONOUS)
+                    # Create InfluxDB client
+                    client = InfluxDBClient(url=url, token=token, org=org)
+                    write_api = client.write_api(write_options=SYNCHRONOUS)
                 
-                # Create point with sensor data
-                point = Point("sensordata")
-                point.field("suhu", float(data.get('suhu', 0)))
-                point.field("kelembapan", float(data.get('kelembapan', 0)))
-                point.field("mq2", float(data.get('mq2', 0)))
-                point.field("mq3", float(data.get('mq3', 0)))
-                point.field("mq135", float(data.get('mq135', 0)))
+                    # Create point with sensor data
+                    point = Point("sensordata")
+                    point.tag(devices.DEVICE_TAG, device_id)
+                    point.field("suhu", float(data.get('suhu', 0)))
+                    point.field("kelembapan", float(data.get('kelembapan', 0)))
+                    point.field("mq2", float(data.get('mq2', 0)))
+                    point.field("mq3", float(data.get('mq3', 0)))
+                    point.field("mq135", float(data.get('mq135', 0)))
                 
-                # Add status only if present
-                if 'status' in data and data['status'] is not None:
-                    point.field("status", int(data['status']))
+                    # Add status only if present
+                    if 'status' in data and data['status'] is not None:
+                        point.field("status", int(data['status']))
                 
-                point.field("skorTotal", float(data.get('skorTotal', 0)))
-                point.time(datetime.utcnow(), WritePrecision.NS)
+                    point.field("skorTotal", float(data.get('skorTotal', 0)))
+                    # Waktu ukur sebenarnya; kirim ulang dengan ts sama menimpa point yang sama
+                    point.time(measured_at, WritePrecision.NS)
                 
-                # Write to InfluxDB
-                write_api.write(bucket=bucket, org=org, record=point)
-                client.close()
+                    # Write to InfluxDB
+                    write_api.write(bucket=bucket, org=org, record=point)
+                    client.close()
                 
-                print(f"✅ Data saved to InfluxDB: {data}")
+                    reading_log.debug("✅ Data saved to InfluxDB: %s", data)
                 
-            except Exception as influx_error:
-                print(f"❌ Failed to save to InfluxDB: {influx_error}")
+                except Exception as influx_error:
+                    logger.error("❌ Failed to save to InfluxDB: %s", influx_error)
             
             # Add data to ML dataset untuk continual learning
-            if ML_ENABLED:
-                try:
-                    mq2 = float(data.get('mq2', 0))
-                    mq3 = float(data.get('mq3', 0))
-                    mq135 = float(data.get('mq135', 0))
-                    humidity = float(data.get('kelembapan', 0))
-                    temperature = float(data.get('suhu', 0))
+            with instrumentation.span('ml_dataset'):
+                ml = ml_runtime.ml_service()
+                if ml is not None:
+                    try:
+                        mq2 = float(data.get('mq2', 0))
+                        mq3 = float(data.get('mq3', 0))
+                        mq135 = float(data.get('mq135', 0))
+                        humidity = float(data.get('kelembapan', 0))
+                        temperature = float(data.get('suhu', 0))
                     
-                    # Convert status (0/1) ke Layak/Tidak Layak
-                    sensor_status = data.get('status')
-                    if sensor_status is not None:
-                        ml_status = 'Layak' if int(sensor_status) == 1 else 'Tidak Layak'
-                        ml_add_data(mq2, mq3, mq135, humidity, temperature, ml_status)
-                        print(f"📝 Data added to ML dataset: Status={ml_status}")
-                except Exception as ml_error:
-                    print(f"⚠️ ML add data error: {ml_error}")
+                        # Convert status (0/1) ke Layak/Tidak Layak
+                        sensor_status = data.get('status')
+                        if sensor_status is not None:
+                            ml_status = 'Layak' if int(sensor_status) == 1 else 'Tidak Layak'
+                            ml.add_realtime_data(mq2, mq3, mq135, humidity, temperature, ml_status)
+                            reading_log.debug("📝 Data added to ML dataset: Status=%s", ml_status)
+                    except Exception as ml_error:
+                        logger.warning("⚠️ ML add data error: %s", ml_error)
             
+            with instrumentation.span('alerts'):
+                devices.cache_latest(device_id, data, ts=measured_at.timestamp())
+                alerts.process(device_id, values=data, now=measured_at.timestamp())
+
             # Broadcast to WebSocket
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                "sensor_data",
-                {"type": "send_sensor_data", "data": data}
-            )
+            with instrumentation.span('broadcast'):
+                channel_layer = get_channel_layer()
+                async_to_sync(channel_layer.group_send)(
+                    "sensor_data",
+                    {"type": "send_sensor_data", "data": data}
+                )
             return JsonResponse({"status": "success"}, status=200)
         except Exception as e:
             return JsonResponse({"status": "error", "message": str(e)}, status=400)
     return JsonResponse({"status": "error", "message": "Invalid request"}, status=400)
 
 
+# ==========================================================
+# 📦 API batch ingest: banyak reading per request (JSON array / NDJSON)
+# ==========================================================
+@csrf_exempt
+def sensor_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({"status": "error", "message": "Invalid request"}, status=405)
+    try:
+        items, envelope = batch.parse_body(request.body, request.content_type)
+        result = batch.ingest(
+            items,
+            default_device=envelope.get('device_id'),
+            sent_at=envelope.get('sent_at') or request.headers.get('X-Sent-At'),
+            request=request,
+        )
+    except batch.BatchError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    logger.info("Batch ingest: %d diterima, %d ditolak, %d duplikat",
+                result['accepted'], result['rejected'], result['duplicates'])
+    ok = result['accepted'] or result['duplicates']
+    return JsonResponse({"status": "success" if ok else "error", **result}, status=200 if ok else 400)
+
+
 # ==========================================================
 # 📡 API endpoint: get the latest sensor data
 # ==========================================================
 def get_latest_status(request):
-    latest_data = SensorData.objects.last()
+    latest_data = SensorData.objects.for_device(devices.requested_device(request)).latest_reading()
     if latest_data:
         return JsonResponse({
+            "device_id": latest_data.device_id,
             "timestamp": latest_data.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
             "temperature": latest_data.temperature,
             "humidity": latest_data.humidity,
@@ -502,9 +549,10 @@ def get_latest_status(request):
 # ==========================================================
 def get_sensor_history(request):
     """Get realtime sensor history from InfluxDB. Falls back to database if InfluxDB unavailable."""
+    device = devices.requested_device(request)
     try:
         # Try to get data from InfluxDB first
-        history_data = influx_client.get_history_data(limit=50)
+        history_data = influx_client.get_history_data(limit=50, device=device)
         
         if history_data and len(history_data) > 0:
             # InfluxDB data available
@@ -536,13 +584,13 @@ def get_sensor_history(request):
             return JsonResponse(data, safe=False)
         else:
             # Fallback to database
-            print("WARNING: InfluxDB history data unavailable, falling back to database")
+            logger.warning("InfluxDB history data unavailable, falling back to database")
             raise Exception("No InfluxDB data")
             
     except Exception as e:
-        print(f"ERROR getting InfluxDB history: {e}")
+        logger.warning("Error getting InfluxDB history: %s", e)
         # Fallback to database
-        history = SensorData.objects.order_by('-timestamp')[:50]
+        history = SensorData.objects.for_device(device).order_by('-timestamp')[:50]
         data = [
             {
                 "timestamp": entry.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
@@ -560,15 +608,20 @@ def get_sensor_history(request):
 
 @api_view(['GET'])
 def api_status_influx(request):
-    print("DEBUG: /api/status dipanggil")
     """Return latest sensor data from InfluxDB (realtime). Falls back to DB."""
+    device = devices.requested_device(request)
     try:
-        data = influx_client.get_latest_data()
-        print(f"[INFLUXDB] Data terbaru: {data}")
-        if isinstance(data, dict) and data.get('error'):
-            # log and fallback
-            print(f"WARNING: Influx get_latest_data error: {data.get('error')}")
-            raise Exception(data.get('error'))
+        # Data terbaru per device dari cache (diisi saat ingest), baru ke InfluxDB
+        with instrumentation.span('cache'):
+            data = devices.get_cached_latest(device)
+        if data is None:
+            with instrumentation.span('influx'):
+                data = influx_client.get_latest_data(device=device)
+            if isinstance(data, dict) and data.get('error'):
+                # log and fallback
+                logger.warning("Influx get_latest_data error: %s", data.get('error'))
+                raise Exception(data.get('error'))
+            devices.cache_latest(device, data, include_all=False)
 
         # ensure numeric values
         suhu = float(data.get('suhu', 0))
@@ -588,9 +641,11 @@ def api_status_influx(request):
         
         # AI Agent Analysis (analisis realtime tanpa mengubah data sensor)
         ai_analysis = None
-        if AI_ENABLED:
+        ai = ml_runtime.ai_agent()
+        if ai is not None:
             try:
-                ai_result = ai_analyze(suhu, kelembapan, mq2, mq3, mq135)
+                with instrumentation.span('ai'):
+                    ai_result = ai.analyze_sensor_data(suhu, kelembapan, mq2, mq3, mq135)
                 ai_analysis = {
                     'final_status': ai_result.get('final_status'),
                     'explanation': ai_result.get('explanation'),
@@ -598,23 +653,25 @@ def api_status_influx(request):
                     'sensor_status': ai_result.get('sensor_status'),
                     'adaptive_learning': ai_result.get('adaptive_learning')
                 }
-                print(f"🤖 AI Analysis: {ai_analysis['final_status']} - {ai_analysis['explanation']}")
+                reading_log.debug("🤖 AI Analysis: %s - %s", ai_analysis['final_status'], ai_analysis['explanation'])
             except Exception as e:
-                print(f"⚠️ AI Analysis error: {e}")
+                logger.warning("⚠️ AI Analysis error: %s", e)
         
         # ML Prediction (tanpa mengubah status realtime)
         ml_prediction = None
-        if ML_ENABLED:
+        ml = ml_runtime.ml_service()
+        if ml is not None:
             try:
-                ml_result = ml_predict(mq2, mq3, mq135, kelembapan, suhu)
+                with instrumentation.span('ml'):
+                    ml_result = ml.predict_status(mq2, mq3, mq135, kelembapan, suhu)
                 ml_prediction = {
                     'status': ml_result.get('status'),
                     'confidence': ml_result.get('confidence'),
                     'timestamp': ml_result.get('timestamp')
                 }
-                print(f"🤖 ML Prediction: {ml_prediction}")
+                reading_log.debug("🤖 ML Prediction: %s", ml_prediction)
             except Exception as e:
-                print(f"⚠️ ML Prediction error: {e}")
+                logger.warning("⚠️ ML Prediction error: %s", e)
         
         payload = {
             'suhu': suhu,
@@ -631,9 +688,10 @@ def api_status_influx(request):
 
 
     except Exception as e:
-        print(f"INFO: api_status_influx - falling back to DB due to: {e}")
+        logger.info("api_status_influx - falling back to DB due to: %s", e)
         # fallback to local DB
-        latest = SensorData.objects.last()
+        with instrumentation.span('db'):
+            latest = SensorData.objects.for_device(device).latest_reading()
         if latest:
             suhu = latest.temperature or 0
             kelembapan = latest.humidity or 0
@@ -656,41 +714,10 @@ def api_status_influx(request):
 
 
 def calculate_overall_status(suhu, kelembapan, mq2, mq3, mq135):
-    """Calculate overall status based on all sensor readings."""
-    # Thresholds
-    DANGER_THRESHOLDS = {
-        'suhu': 35,
-        'kelembapan': 90,
-        'mq2': 200,
-        'mq3': 300,
-        'mq135': 150
-    }
-    
-    WARNING_THRESHOLDS = {
-        'suhu': 30,
-        'kelembapan': 80,
-        'mq2': 100,
-        'mq3': 150,
-        'mq135': 80
-    }
-    
-    # Check for danger conditions
-    if (suhu >= DANGER_THRESHOLDS['suhu'] or
-        kelembapan >= DANGER_THRESHOLDS['kelembapan'] or
-        mq2 >= DANGER_THRESHOLDS['mq2'] or
-        mq3 >= DANGER_THRESHOLDS['mq3'] or
-        mq135 >= DANGER_THRESHOLDS['mq135']):
-        return 'TIDAK LAYAK'
-    
-    # Check for warning conditions
-    if (suhu >= WARNING_THRESHOLDS['suhu'] or
-        kelembapan >= WARNING_THRESHOLDS['kelembapan'] or
-        mq2 >= WARNING_THRESHOLDS['mq2'] or
-        mq3 >= WARNING_THRESHOLDS['mq3'] or
-        mq135 >= WARNING_THRESHOLDS['mq135']):
-        return 'PERINGATAN'
-    
-    return 'LAYAK'
+    """Calculate overall status based on all sensor readings (threshold di monitoring/alerts.py)."""
+    return alerts.LEVELS[alerts.classify({
+        'suhu': suhu, 'kelembapan': kelembapan, 'mq2': mq2, 'mq3': mq3, 'mq135': mq135,
+    })]
 
 
 def contact_person(request):
@@ -714,9 +741,9 @@ def contact_person(request):
                 phone=phone,
                 message=message
             )
-            print(f"DEBUG: ContactMessage saved from {name or phone}")
+            logger.info("ContactMessage saved from %s", name or phone)
         except Exception as e:
-            print("ERROR: Failed saving ContactMessage:", e)
+            logger.error("Failed saving ContactMessage: %s", e)
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
             return render(request, 'monitoring/contact_person.html', {'error': 'Gagal menyimpan pesan'})
@@ -735,12 +762,12 @@ def contact_person(request):
 @api_view(['POST'])
 def ml_retrain(request):
     """API untuk retrain model ML"""
-    if not ML_ENABLED:
+    ml = ml_runtime.ml_service()
+    if ml is None:
         return Response({'error': 'ML service not available'}, status=503)
     
     try:
-        from ml_service import retrain_model
-        success = retrain_model()
+        success = ml.retrain_model()
         if success:
             return Response({'status': 'success', 'message': 'Model retrained successfully'})
         else:
@@ -752,12 +779,12 @@ def ml_retrain(request):
 @api_view(['GET'])
 def ml_dataset_info(request):
     """API untuk mendapatkan info dataset ML"""
-    if not ML_ENABLED:
+    ml = ml_runtime.ml_service()
+    if ml is None:
         return Response({'error': 'ML service not available'}, status=503)
     
     try:
-        from ml_service import get_dataset_info
-        info = get_dataset_info()
+        info = ml.get_dataset_info()
         return Response(info)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -766,19 +793,17 @@ def ml_dataset_info(request):
 @api_view(['POST'])
 def ml_predict(request):
     """API untuk prediksi manual"""
-    if not ML_ENABLED:
+    ml = ml_runtime.ml_service()
+    if ml is None:
         return Response({'error': 'ML service not available'}, status=503)
     
     try:
-        data = request.data
-        mq2 = float(data.get('mq2', 0))
-        mq3 = float(data.get('mq3', 0))
-        mq135 = float(data.get('mq135', 0))
-        humidity = float(data.get('humidity', 0))
-        temperature = float(data.get('temperature', 0))
-        
-        from ml_service import predict_status as ml_predict_func
-        result = ml_predict_func(mq2, mq3, mq135, humidity, temperature)
+        # Nama kanonik atau alias (suhu, kelembapan, MQ2, ...), field kosong = 0
+        values = schema.from_records([request.data], schema.FEATURES)[0]
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    try:
+        result = ml.predict_status(*(float(v) for v in values))
         return Response(result)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -790,12 +815,12 @@ def ml_predict(request):
 @api_view(['GET'])
 def ai_learning_info(request):
     """API untuk mendapatkan info adaptive learning AI Agent"""
-    if not AI_ENABLED:
+    ai = ml_runtime.ai_agent()
+    if ai is None:
         return Response({'error': 'AI Agent not available'}, status=503)
     
     try:
-        from ai_agent import get_ai_learning_info
-        info = get_ai_learning_info()
+        info = ai.get_ai_info()
         return Response(info)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -804,12 +829,12 @@ def ai_learning_info(request):
 @api_view(['POST'])
 def ai_reset_learning(request):
     """API untuk reset adaptive learning AI Agent"""
-    if not AI_ENABLED:
+    ai = ml_runtime.ai_agent()
+    if ai is None:
         return Response({'error': 'AI Agent not available'}, status=503)
     
     try:
-        from ai_agent import reset_adaptive_learning
-        result = reset_adaptive_learning()
+        result = ai.reset_ai_agent()
         return Response(result)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -3,11 +3,16 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
 from .models import SensorData, DeviceToken
+from .export import filter_queryset
+from . import retention
 from django.conf import settings
 import influxdb_client
 from django.contrib import messages
 import json
 from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -21,19 +26,20 @@ def data_history(request):
     # Get base queryset
     history = SensorData.objects.all().order_by('-timestamp')
     
-    # Apply filters if provided
+    # Apply filters if provided (tanggal sebagai range supaya index timestamp terpakai)
+    day = None
     if date_filter:
         try:
-            date = datetime.strptime(date_filter, '%Y-%m-%d')
-            history = history.filter(timestamp__date=date)
+            history = filter_queryset(history, {'date': date_filter})
+            day = datetime.strptime(date_filter, '%Y-%m-%d').date()
         except ValueError:
             pass
             
     if status_filter:
-        history = history.filter(jenis_buah=status_filter)
+        history = history.filter(status=status_filter)
     
     # Provide both 'data' (used for emptiness check) and 'history' (used for iteration)
-    limited = history[:100]
+    limited = list(history[:100])
     
     # Prepare chart data for JavaScript
     if limited:
@@ -58,7 +64,8 @@ def data_history(request):
         'history': limited,  # used by template to iterate rows
         'date_filter': date_filter,
         'status_filter': status_filter,
-        'total_records': history.count(),
+        # Dari tabel ringkasan, bukan COUNT(*) atas seluruh SensorData
+        'total_records': retention.total_count(day=day, status=status_filter),
         'labels_js': labels,
         'temp_js': temp_data,
         'hum_js': hum_data,
@@ -274,7 +281,7 @@ def sensor_detail(request, sensor_type):
             values = [last_value]
             
     except Exception as e:
-        print(f"ERROR getting sensor detail data: {e}")
+        logger.error("Error getting sensor detail data: %s", e)
         last_value = 0.0
         status = 'Unknown'
         labels = [datetime.now().strftime('%H:%M')]
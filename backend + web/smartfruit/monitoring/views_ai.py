@@ -1,75 +1,83 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-import joblib
-import os
 from .models import AIModel
-import numpy as np
+from . import inference
+from . import instrumentation
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_NOT_FOUND = {'error': 'Model not found. Please train the model first.'}
+
 
 def load_latest_model():
-    """Load the latest trained model and scaler"""
-    model_path = 'models/fruit_quality_model.joblib'
-    scaler_path = 'models/scaler.joblib'
-    
-    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-        return None, None
-        
-    try:
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
-        return model, scaler
-    except Exception as e:
-        print(f"Error loading model: {e}")
+    """Load the latest trained model and scaler (cached per proses, lihat ml_runtime)"""
+    pipeline = inference.get_pipeline()
+    if pipeline is None:
         return None, None
+    return pipeline.model, pipeline.scaler
 
 @login_required
 @require_http_methods(["POST"])
 def predict_quality(request):
     """API endpoint for fruit quality prediction"""
     try:
-        # Load model
-        model, scaler = load_latest_model()
-        if not model or not scaler:
-            return JsonResponse({
-                'error': 'Model not found. Please train the model first.'
-            }, status=404)
+        # Pipeline (scaler + model) di-cache per proses
+        pipeline = inference.get_pipeline()
+        if pipeline is None:
+            return JsonResponse(MODEL_NOT_FOUND, status=404)
             
         # Get sensor data from request
         data = json.loads(request.body)
-        suhu = float(data.get('suhu', 0))
-        kelembapan = float(data.get('kelembapan', 0))
-        mq2 = float(data.get('mq2', 0))
-        mq3 = float(data.get('mq3', 0))
-        mq135 = float(data.get('mq135', 0))
-        
-        # Format input
-        X = np.array([[suhu, kelembapan, mq2, mq3, mq135]])
-        
-        # Scale input
-        X_scaled = scaler.transform(X)
-        
-        # Make prediction
-        prediction = model.predict(X_scaled)[0]
-        probabilities = model.predict_proba(X_scaled)[0]
-        
-        return JsonResponse({
-            'status': prediction,
-            'confidence': float(max(probabilities)),
-            'probabilities': {
-                'LAYAK': float(probabilities[list(model.classes_).index('LAYAK')]),
-                'WARNING': float(probabilities[list(model.classes_).index('WARNING')]),
-                'TIDAK_LAYAK': float(probabilities[list(model.classes_).index('TIDAK_LAYAK')])
-            }
-        })
+        X = pipeline.matrix([data])
+
+        # Satu pemanggilan vektor: scaling affine + predict_proba
+        with instrumentation.span('model'):
+            result = pipeline.predict(X)[0]
+        return JsonResponse(result)
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
+
+@login_required
+@require_http_methods(["POST"])
+def predict_quality_batch(request):
+    """
+    Prediksi banyak reading sekaligus.
+
+    Body: ``[{suhu, kelembapan, mq2, mq3, mq135}, ...]`` atau
+    ``{"readings": [...]}``; response ``{"count", "results"}`` berurutan
+    sama dengan input.
+    """
+    pipeline = inference.get_pipeline()
+    if pipeline is None:
+        return JsonResponse(MODEL_NOT_FOUND, status=404)
+    try:
+        data = json.loads(request.body)
+        readings = data.get('readings') if isinstance(data, dict) else data
+        if not isinstance(readings, list) or not readings:
+            raise ValueError("Body harus berupa array reading atau objek {'readings': [...]}")
+        limit = getattr(settings, 'AI_BATCH_MAX_ITEMS', 1000)
+        if len(readings) > limit:
+            return JsonResponse({'error': f'Maksimal {limit} reading per request'}, status=413)
+        X = pipeline.matrix(readings)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    with instrumentation.span('model'):
+        results = pipeline.predict(X)
+    return JsonResponse({'count': len(results), 'results': results})
+
+
 @login_required
 def model_info(request):
     """Get information about the current AI model"""
-    model, _ = load_latest_model()
-    if not model:
+    pipeline = inference.get_pipeline()
+    if pipeline is None:
         return JsonResponse({
             'status': 'No model found',
             'features': None,
@@ -78,6 +86,6 @@ def model_info(request):
         
     return JsonResponse({
         'status': 'Model loaded',
-        'features': ['suhu', 'kelembapan', 'mq2', 'mq3', 'mq135'],
-        'classes': list(model.classes_)
-    })
\ No newline at end of file
+        'features': list(pipeline.features),
+        'classes': pipeline.classes
+    })
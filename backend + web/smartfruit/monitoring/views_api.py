@@ -4,12 +4,19 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 import json
 from . import influx_client
+from . import devices
+from . import storage
+from . import alerts
+from . import payloads
+import logging
+
+logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
 def get_sensor_status(request):
     """Get latest sensor readings for dashboard"""
     try:
-        latest = SensorData.objects.last()
+        latest = SensorData.objects.latest_reading()
         if latest:
             data = {
                 'temperature': latest.temperature,
@@ -31,7 +38,7 @@ def get_sensor_status(request):
             'timestamp': None
         })
     except Exception as e:
-        print(f"Error getting sensor status: {e}")
+        logger.error("Error getting sensor status: %s", e)
         return Response({'error': str(e)}, status=500)
 
 @api_view(['GET'])
@@ -56,7 +63,7 @@ def get_sensor_history(request):
             
         return Response(data)
     except Exception as e:
-        print(f"Error getting sensor history: {e}")
+        logger.error("Error getting sensor history: %s", e)
         return Response({'error': str(e)}, status=500)
 
 @api_view(['GET'])
@@ -84,9 +91,9 @@ def api_status(request):
             return Response(payload)
         except Exception as ie:
             # Influx failed -> fallback to DB
-            print(f"Influx fetch failed, falling back to DB: {ie}")
+            logger.warning("Influx fetch failed, falling back to DB: %s", ie)
 
-        latest = SensorData.objects.last()
+        latest = SensorData.objects.latest_reading()
         if latest:
             data = {
                 'suhu': latest.temperature,
@@ -109,21 +116,25 @@ def api_status(request):
             'timestamp': None
         })
     except Exception as e:
-        print(f"Error getting api_status: {e}")
+        logger.error("Error getting api_status: %s", e)
         return Response({'error': str(e)}, status=500)
 @api_view(['POST'])
 def update_sensor_data(request):
     """Update sensor readings from hardware"""
     try:
-        data = json.loads(request.body)
+        data = payloads.decode(request.body, request.content_type)
         
+        device_id = devices.resolve_device_id(data, request)
+
         # Create new sensor reading
         sensor_data = SensorData(
+            timestamp=devices.reading_time(data, device_id),
             temperature=float(data.get('temperature', 0)),
             humidity=float(data.get('humidity', 0)),
             mq2=float(data.get('mq2', 0)),
             mq3=float(data.get('mq3', 0)),
-            mq135=float(data.get('mq135', 0))
+            mq135=float(data.get('mq135', 0)),
+            device_id=device_id
         )
 
         # Determine status based on thresholds
@@ -143,7 +154,9 @@ def update_sensor_data(request):
         else:
             sensor_data.status = "LAYAK"
 
-        sensor_data.save()
+        storage.save_readings([sensor_data])
+        alerts.process(sensor_data.device_id, values=alerts.values_of(sensor_data), status=sensor_data.status,
+                       now=sensor_data.timestamp.timestamp())
 
         # Broadcast to WebSocket
         channel_layer = get_channel_layer()
@@ -152,6 +165,7 @@ def update_sensor_data(request):
             {
                 "type": "sensor_update",
                 "data": {
+                    'device_id': sensor_data.device_id,
                     'temperature': sensor_data.temperature,
                     'humidity': sensor_data.humidity,
                     'mq2': sensor_data.mq2,
@@ -165,5 +179,5 @@ def update_sensor_data(request):
 
         return Response({'status': 'success'})
     except Exception as e:
-        print(f"Error updating sensor data: {e}")
+        logger.error("Error updating sensor data: %s", e)
         return Response({'error': str(e)}, status=500)
\ No newline at end of file
@@ -1,139 +1,368 @@
 """
 MQTT to InfluxDB Bridge
 Menerima data sensor dari MQTT dan menyimpan ke InfluxDB
+
+Alur:
+    paho network thread --(on_message: hanya enqueue)--> Queue
+        --> worker pool (parse + validasi) --> batching write_api InfluxDB
+
+- Callback MQTT tidak pernah menunggu (enqueue non-blocking), jadi network
+  thread paho tetap melayani keepalive; jika antrean penuh pesan dibuang
+  dan dihitung sebagai ``dropped``.
+- QoS 1 + persistent session (clean_session=False, client id tetap) +
+  manual ack: PUBACK dikirim setelah worker menyerahkan point ke writer
+  InfluxDB, jadi pesan yang masih di antrean saat bridge mati dikirim ulang
+  broker saat reconnect.
+- Write ke InfluxDB di-batch (ukuran / interval flush) dengan retry.
+- Metrics throughput, kedalaman antrean dan lag dicetak berkala.
+
+Semua konfigurasi bisa diganti lewat environment variable.
 """
-import json
-import paho.mqtt.client as mqtt
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
-from datetime import datetime
+import functools
+import logging
+import os
+import queue
+import signal
+import threading
 import time
+from datetime import datetime, timezone
+
+import paho.mqtt.client as mqtt
+from influxdb_client import InfluxDBClient, Point, WritePrecision, WriteOptions
+
+# JSON (orjson jika ada), frame biner, CBOR & MessagePack; format dikenali dari byte pertama
+from monitoring.payloads import PayloadError, decode as decode_payload
+# Waktu ukur device (ts / sent_at) dan koreksi jam device
+from monitoring import clock
+# Log JSON lewat antrean + listener, sama seperti Django (monitoring/logs.py)
+from monitoring import logs
 
 # MQTT Configuration
-MQTT_BROKER = "broker.hivemq.com"  # Broker MQTT publik - ganti jika pakai broker sendiri
-MQTT_PORT = 1883
+MQTT_BROKER = os.getenv("MQTT_BROKER", "broker.hivemq.com")  # Broker MQTT publik - ganti jika pakai broker sendiri
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
 MQTT_TOPIC = "annas/esp32/sensor"  # Topic MQTT dari ESP32 Anda
+# Topic per device: annas/esp32/<device_id>/sensor
+MQTT_DEVICE_TOPIC = "annas/esp32/+/sensor"
+# Daftar topic (boleh wildcard + / #), dipisah koma
+MQTT_TOPICS = [t.strip() for t in os.getenv("MQTT_TOPICS", f"{MQTT_TOPIC},{MQTT_DEVICE_TOPIC}").split(",") if t.strip()]
+MQTT_QOS = int(os.getenv("MQTT_QOS", "1"))
+# Client id tetap diperlukan agar persistent session dikenali broker
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "smartfruit-ingest")
+MQTT_KEEPALIVE = 60
+DEFAULT_DEVICE_ID = os.getenv("DEFAULT_DEVICE_ID", "default")
 
 # InfluxDB Configuration
-INFLUX_URL = "http://103.151.63.80:8086"
-INFLUX_TOKEN = "Wv4fUOXPpqTi7FFQDVskdQjrLVEaweO0wh00QYNKOdM1_wpQArozJdxz7esh7j-B0V24P3CcSa-aXogVSco9Yg=="
-INFLUX_ORG = "polinela"
-INFLUX_BUCKET = "datamonitoring"
+INFLUX_URL = os.getenv("INFLUX_URL", "http://103.151.63.80:8086")
+INFLUX_TOKEN = os.getenv("INFLUX_TOKEN", "Wv4fUOXPpqTi7FFQDVskdQjrLVEaweO0wh00QYNKOdM1_wpQArozJdxz7esh7j-B0V24P3CcSa-aXogVSco9Yg==")
+INFLUX_ORG = os.getenv("INFLUX_ORG", "polinela")
+INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "datamonitoring")
 MEASUREMENT = "sensordata"
 
+# Ingestion
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+INFLUX_BATCH_SIZE = int(os.getenv("INFLUX_BATCH_SIZE", "500"))
+INFLUX_FLUSH_MS = int(os.getenv("INFLUX_FLUSH_MS", "1000"))
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "10"))
+CLOCK_TOLERANCE = float(os.getenv("SENSOR_CLOCK_TOLERANCE", str(clock.DEFAULT_TOLERANCE)))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+logger = logging.getLogger("mqtt_to_influx")
+
+FLOAT_FIELDS = ("suhu", "kelembapan", "mq2", "mq3", "mq135", "skorTotal")
+
 # Global InfluxDB client
 influx_client = None
 write_api = None
 
+
+def device_from_message(topic, data):
+    """Device id dari payload (device_id/device) atau dari topic per device"""
+    device = data.get('device_id') or data.get('device')
+    if not device:
+        parts = topic.split('/')
+        if len(parts) == 4 and parts[:2] == ['annas', 'esp32'] and parts[3] == 'sensor':
+            device = parts[2]
+    return str(device) if device else DEFAULT_DEVICE_ID
+
+
+# ----------------------------------------------------------
+# Metrics
+# ----------------------------------------------------------
+class IngestMetrics:
+    """Counter thread-safe + lag antrean (waktu terima MQTT -> diproses worker)."""
+
+    COUNTERS = ("received", "processed", "invalid", "dropped", "written", "write_errors", "retries")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.COUNTERS, 0)
+            self._lag_total = 0.0
+            self._lag_max = 0.0
+            self._lag_n = 0
+            self._since = time.monotonic()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def observe_lag(self, seconds):
+        with self._lock:
+            self._lag_total += seconds
+            self._lag_n += 1
+            if seconds > self._lag_max:
+                self._lag_max = seconds
+
+    def snapshot(self, queue_size=0, reset=True):
+        with self._lock:
+            elapsed = max(time.monotonic() - self._since, 1e-9)
+            snap = dict(self.counts)
+            snap.update({
+                'elapsed': elapsed,
+                'rate_in': self.counts['received'] / elapsed,
+                'rate_written': self.counts['written'] / elapsed,
+                'lag_avg_ms': (self._lag_total / self._lag_n * 1000) if self._lag_n else 0.0,
+                'lag_max_ms': self._lag_max * 1000,
+                'queue': queue_size,
+            })
+        if reset:
+            self.reset()
+        return snap
+
+
+metrics = IngestMetrics()
+messages = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+_stop = threading.Event()
+
+
+# ----------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------
+# Offset jam terakhir per device (dari sent_at), dipakai pesan tanpa sent_at
+clock_offsets = {}
+
+
+def build_point(topic, payload, received_at):
+    """
+    Parse + validasi satu pesan. Return Point, atau None jika tidak valid.
+    Field numerik yang hilang diisi 0.0 (sama seperti bridge sebelumnya).
+    Waktu point = ``ts`` device (dikoreksi dengan ``sent_at`` jika ada), atau
+    waktu terima; pesan yang dikirim ulang broker menghasilkan point yang sama.
+    """
+    try:
+        data = decode_payload(payload)
+    except PayloadError:
+        return None
+
+    device_id = device_from_message(topic, data)
+    sent_at = clock.parse_epoch(data.get('sent_at'))
+    if sent_at is not None:
+        clock_offsets[device_id] = received_at.timestamp() - sent_at
+    epoch, _, _ = clock.correct(
+        clock.measured_at(data), received_at.timestamp(),
+        offset=clock_offsets.get(device_id), tolerance=CLOCK_TOLERANCE)
+
+    point = Point(MEASUREMENT).tag("device", device_id)
+    try:
+        for name in FLOAT_FIELDS:
+            point.field(name, float(data.get(name) or 0.0))
+        status = data.get('status')  # 0 atau 1
+        if status is not None:
+            point.field("status", int(status))
+    except (TypeError, ValueError):
+        return None
+    return point.time(clock.to_datetime(epoch), WritePrecision.NS)
+
+
+# ----------------------------------------------------------
+# InfluxDB
+# ----------------------------------------------------------
+def _batch_size(data):
+    if isinstance(data, (bytes, str)):
+        return data.count(b"\n" if isinstance(data, bytes) else "\n") + 1
+    return 1
+
+
+def _on_write_success(conf, data):
+    metrics.incr("written", _batch_size(data))
+
+
+def _on_write_error(conf, data, exception):
+    metrics.incr("write_errors", _batch_size(data))
+    logger.error("❌ InfluxDB write failed (%d points): %s", _batch_size(data), exception)
+
+
+def _on_write_retry(conf, data, exception):
+    metrics.incr("retries")
+
+
 def init_influx():
-    """Initialize InfluxDB client"""
+    """Initialize InfluxDB client dengan batching writer"""
     global influx_client, write_api
     try:
         influx_client = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
-        write_api = influx_client.write_api(write_options=SYNCHRONOUS)
-        print("✅ InfluxDB client initialized")
+        write_api = influx_client.write_api(
+            write_options=WriteOptions(
+                batch_size=INFLUX_BATCH_SIZE,
+                flush_interval=INFLUX_FLUSH_MS,
+                jitter_interval=0,
+                retry_interval=5_000,
+                max_retries=5,
+                max_retry_delay=30_000,
+                exponential_base=2,
+            ),
+            success_callback=_on_write_success,
+            error_callback=_on_write_error,
+            retry_callback=_on_write_retry,
+        )
+        logger.info("✅ InfluxDB client initialized (batch=%d, flush=%dms)", INFLUX_BATCH_SIZE, INFLUX_FLUSH_MS)
         return True
     except Exception as e:
-        print(f"❌ Failed to initialize InfluxDB: {e}")
+        logger.error("❌ Failed to initialize InfluxDB: %s", e)
         return False
 
-def on_connect(client, userdata, flags, rc):
+
+# ----------------------------------------------------------
+# Worker pool
+# ----------------------------------------------------------
+def worker():
+    while True:
+        item = messages.get()
+        if item is None:
+            messages.task_done()
+            break
+        topic, payload, received_at, enqueued, ack = item
+        try:
+            metrics.observe_lag(time.monotonic() - enqueued)
+            point = build_point(topic, payload, received_at)
+            if point is None:
+                metrics.incr("invalid")
+                ack()
+                continue
+            write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+            metrics.incr("processed")
+            ack()
+        except Exception as e:
+            # Tanpa ack: broker mengirim ulang pesan ini setelah reconnect
+            logger.exception("❌ Error processing message: %s", e)
+        finally:
+            messages.task_done()
+
+
+def report_metrics():
+    while not _stop.wait(METRICS_INTERVAL):
+        m = metrics.snapshot(queue_size=messages.qsize())
+        logger.info("📊 in=%.1f/s written=%.1f/s queue=%s lag avg=%.1fms max=%.1fms "
+                    "invalid=%s dropped=%s errors=%s retries=%s",
+                    m['rate_in'], m['rate_written'], m['queue'], m['lag_avg_ms'], m['lag_max_ms'],
+                    m['invalid'], m['dropped'], m['write_errors'], m['retries'], extra={'metrics': m})
+
+
+# ----------------------------------------------------------
+# MQTT callbacks (paho callback API v2)
+# ----------------------------------------------------------
+def on_connect(client, userdata, flags, reason_code, properties=None):
     """Callback ketika terhubung ke MQTT broker"""
-    if rc == 0:
-        print(f"✅ Connected to MQTT Broker: {MQTT_BROKER}")
-        client.subscribe(MQTT_TOPIC)
-        print(f"📡 Subscribed to topic: {MQTT_TOPIC}")
+    if reason_code == 0:
+        logger.info("✅ Connected to MQTT Broker: %s (session present: %s)", MQTT_BROKER, flags.session_present)
+        client.subscribe([(topic, MQTT_QOS) for topic in MQTT_TOPICS])
+        logger.info("📡 Subscribed to topic: %s (QoS %d)", ', '.join(MQTT_TOPICS), MQTT_QOS)
     else:
-        print(f"❌ Failed to connect to MQTT Broker, return code: {rc}")
+        logger.error("❌ Failed to connect to MQTT Broker, return code: %s", reason_code)
+
 
 def on_message(client, userdata, msg):
-    """Callback ketika menerima pesan dari MQTT"""
+    """Callback ketika menerima pesan dari MQTT: hanya masuk antrean (tidak pernah menunggu)"""
+    metrics.incr("received")
+    ack = functools.partial(client.ack, msg.mid, msg.qos)
+    item = (msg.topic, msg.payload, datetime.now(timezone.utc), time.monotonic(), ack)
     try:
-        # Parse JSON data
-        payload = msg.payload.decode('utf-8')
-        data = json.loads(payload)
-        
-        print(f"\n📩 Received data from MQTT:")
-        print(f"   Topic: {msg.topic}")
-        print(f"   Data: {json.dumps(data, indent=2)}")
-        
-        # Extract sensor values
-        suhu = data.get('suhu', 0.0)
-        kelembapan = data.get('kelembapan', 0.0)
-        mq2 = data.get('mq2', 0.0)
-        mq3 = data.get('mq3', 0.0)
-        mq135 = data.get('mq135', 0.0)
-        status = data.get('status')  # 0 atau 1
-        skorTotal = data.get('skorTotal', 0.0)
-        
-        # Create InfluxDB point
-        point = Point(MEASUREMENT)
-        point.field("suhu", float(suhu))
-        point.field("kelembapan", float(kelembapan))
-        point.field("mq2", float(mq2))
-        point.field("mq3", float(mq3))
-        point.field("mq135", float(mq135))
-        
-        # Only add status if it's not None
-        if status is not None:
-            point.field("status", int(status))
-        
-        point.field("skorTotal", float(skorTotal))
-        point.time(datetime.utcnow(), WritePrecision.NS)
-        
-        # Write to InfluxDB
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
-        
-        print(f"✅ Data saved to InfluxDB:")
-        print(f"   Suhu: {suhu}°C, Kelembapan: {kelembapan}%")
-        print(f"   MQ2: {mq2}, MQ3: {mq3}, MQ135: {mq135}")
-        print(f"   Status: {status}, Skor Total: {skorTotal}")
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON decode error: {e}")
-        print(f"   Raw payload: {msg.payload}")
-    except Exception as e:
-        print(f"❌ Error processing message: {e}")
+        messages.put_nowait(item)
+    except queue.Full:
+        metrics.incr("dropped")
+        # Tetap di-ack supaya pesan yang tidak di-ack tidak menahan pengiriman broker
+        ack()
 
-def on_disconnect(client, userdata, rc):
+
+def on_disconnect(client, userdata, flags, reason_code, properties=None):
     """Callback ketika terputus dari MQTT broker"""
-    if rc != 0:
-        print(f"⚠️ Unexpected disconnection. Reconnecting...")
+    if reason_code != 0:
+        logger.warning("⚠️ Unexpected disconnection (%s). Reconnecting...", reason_code)
+
+
+def create_mqtt_client():
+    mqtt_client = mqtt.Client(
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        client_id=MQTT_CLIENT_ID,
+        clean_session=False,
+        # PUBACK dikirim worker (ack()) setelah pesan diproses, bukan saat diterima
+        manual_ack=True,
+    )
+    mqtt_client.on_connect = on_connect
+    mqtt_client.on_message = on_message
+    mqtt_client.on_disconnect = on_disconnect
+    mqtt_client.reconnect_delay_set(min_delay=1, max_delay=30)
+    # Batasi pesan QoS 1 yang sedang diproses agar broker tidak membanjiri antrean
+    mqtt_client.max_inflight_messages_set(100)
+    return mqtt_client
+
+
+def shutdown(mqtt_client, threads):
+    """Berhenti menerima pesan, habiskan antrean, flush batch InfluxDB."""
+    _stop.set()
+    mqtt_client.disconnect()
+    mqtt_client.loop_stop()
+    for _ in threads:
+        messages.put(None)
+    for t in threads:
+        t.join(timeout=30)
+    if write_api:
+        write_api.close()
+    if influx_client:
+        influx_client.close()
+
 
 def main():
     """Main function"""
-    print("=" * 60)
-    print("🚀 Starting MQTT to InfluxDB Bridge")
-    print("=" * 60)
-    
+    log_handler = logs.configure(LOG_LEVEL, LOG_FORMAT)
+    logger.info("🚀 Starting MQTT to InfluxDB Bridge")
+
     # Initialize InfluxDB
     if not init_influx():
-        print("❌ Cannot start without InfluxDB connection")
+        logger.error("❌ Cannot start without InfluxDB connection")
+        log_handler.stop()
         return
-    
-    # Create MQTT client
-    mqtt_client = mqtt.Client()
-    mqtt_client.on_connect = on_connect
-    mqtt_client.on_message = on_message
-    mqtt_client.on_disconnect = on_disconnect
-    
-    # Connect to MQTT broker
+
+    threads = [threading.Thread(target=worker, name=f"ingest-{i}", daemon=True) for i in range(INGEST_WORKERS)]
+    for t in threads:
+        t.start()
+    threading.Thread(target=report_metrics, name="ingest-metrics", daemon=True).start()
+
+    mqtt_client = create_mqtt_client()
+    signal.signal(signal.SIGTERM, lambda *_: _stop.set())
+
     try:
-        print(f"🔌 Connecting to MQTT Broker: {MQTT_BROKER}:{MQTT_PORT}")
-        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        
-        # Start the loop
-        print("🔄 Starting MQTT loop...")
-        mqtt_client.loop_forever()
-        
+        logger.info("🔌 Connecting to MQTT Broker: %s:%s as %s", MQTT_BROKER, MQTT_PORT, MQTT_CLIENT_ID)
+        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE)
+        logger.info("🔄 Starting MQTT loop (%d workers)...", INGEST_WORKERS)
+        mqtt_client.loop_start()
+        while not _stop.wait(1):
+            pass
     except KeyboardInterrupt:
-        print("\n⏹️ Stopping MQTT to InfluxDB Bridge...")
-        mqtt_client.disconnect()
-        if influx_client:
-            influx_client.close()
-        print("👋 Goodbye!")
+        pass
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("❌ Error: %s", e)
+    finally:
+        logger.info("⏹️ Stopping MQTT to InfluxDB Bridge...")
+        shutdown(mqtt_client, threads)
+        logger.info("👋 Goodbye!")
+        log_handler.stop()
+
 
 if __name__ == "__main__":
     main()
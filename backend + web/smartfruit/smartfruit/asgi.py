@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
@@ -24,3 +25,8 @@ application = ProtocolTypeRouter({
         )
     ),
 })
+
+# Settings baru terbaca setelah get_asgi_application() (django.setup)
+if settings.ML_WARMUP:
+    from monitoring import ml_runtime
+    ml_runtime.warm_up(background=True)
@@ -30,6 +30,7 @@ SECRET_KEY = 'django-insecure-8e1(=q%qbo*$3vfxbh*jgx71&ub$pv3kfopow^8ydjiab4$n2b
 
 # SECURITY WARNING: don't run with debug turned on in production!
 import os
+import json
 DEBUG = True
 
 ALLOWED_HOSTS = ['*', '.herokuapp.com']
@@ -41,6 +42,67 @@ INFLUXDB_TOKEN = os.getenv('INFLUXDB_TOKEN', 'your-token-here')
 INFLUXDB_ORG = os.getenv('INFLUXDB_ORG', 'your-org')
 INFLUXDB_BUCKET = os.getenv('INFLUXDB_BUCKET', 'sensor_data')
 
+# Device identity (multi ESP32)
+DEFAULT_DEVICE_ID = os.getenv('DEFAULT_DEVICE_ID', 'default')
+# Mapping token device -> device id, JSON string, contoh: {"abc123": "esp32-01"}
+DEVICE_TOKENS = json.loads(os.getenv('DEVICE_TOKENS', '{}'))
+MQTT_DEVICE_TOPIC_PATTERN = os.getenv('MQTT_DEVICE_TOPIC_PATTERN', 'annas/esp32/{device}/sensor')
+
+# MQTT consumer Django (python manage.py run_mqtt_consumer)
+MQTT_BROKER = os.getenv('MQTT_BROKER', '103.151.63.80')
+MQTT_PORT = int(os.getenv('MQTT_PORT', '1883'))
+MQTT_TOPICS = os.getenv('MQTT_TOPICS', 'annas/esp32/sensor,annas/esp32/+/sensor').split(',')
+MQTT_CLIENT_ID = os.getenv('MQTT_CLIENT_ID', 'smartfruit-django')
+MQTT_QUEUE_SIZE = int(os.getenv('MQTT_QUEUE_SIZE', '10000'))
+MQTT_BATCH_SIZE = int(os.getenv('MQTT_BATCH_SIZE', '200'))
+MQTT_FLUSH_INTERVAL = float(os.getenv('MQTT_FLUSH_INTERVAL', '1.0'))
+# Retry simpan batch consumer saat database gagal sebelum batch ke dead-letter
+MQTT_WRITE_RETRIES = int(os.getenv('MQTT_WRITE_RETRIES', '3'))
+# Lama cache data terbaru per device (detik)
+SENSOR_CACHE_TTL = int(os.getenv('SENSOR_CACHE_TTL', '5'))
+# Batch ingest (/api/sensor/batch/): jumlah reading maksimal per request
+SENSOR_BATCH_MAX_ITEMS = int(os.getenv('SENSOR_BATCH_MAX_ITEMS', '5000'))
+# Toleransi jam device lebih cepat dari server (detik)
+SENSOR_MAX_CLOCK_SKEW = int(os.getenv('SENSOR_MAX_CLOCK_SKEW', '300'))
+# Selisih jam device-server di bawah ini diabaikan (latensi jaringan), detik
+SENSOR_CLOCK_TOLERANCE = float(os.getenv('SENSOR_CLOCK_TOLERANCE', '2'))
+# Lama offset jam per device (dari sent_at) disimpan di cache, detik
+SENSOR_CLOCK_OFFSET_TTL = int(os.getenv('SENSOR_CLOCK_OFFSET_TTL', '3600'))
+
+# Instrumentasi: token Bearer untuk /metrics (kosong = hanya user staff)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', '1') == '1'
+# manage.py benchmark: file baseline dan batas kenaikan median (0.2 = 20%)
+BENCHMARK_BASELINE = os.getenv('BENCHMARK_BASELINE', str(BASE_DIR / 'benchmarks' / 'baseline.json'))
+BENCHMARK_THRESHOLD = float(os.getenv('BENCHMARK_THRESHOLD', '0.2'))
+# Muat model ML setelah worker boot (gunicorn post_worker_init / asgi.py),
+# bukan saat request pertama. Lihat monitoring/ml_runtime.py
+ML_WARMUP = os.getenv('ML_WARMUP', '0') == '1'
+# Runtime model: auto = file .npz portabel (ml/portable_forest.py) jika cocok
+# dengan pickle-nya, portable = selalu .npz, sklearn = selalu pickle
+ML_RUNTIME = os.getenv('ML_RUNTIME', 'auto')
+# /api/ai/predict/batch/: jumlah reading maksimal per request
+AI_BATCH_MAX_ITEMS = int(os.getenv('AI_BATCH_MAX_ITEMS', '1000'))
+
+# Retensi data mentah SensorData (lihat monitoring/retention.py)
+SENSORDATA_RETENTION_DAYS = int(os.getenv('SENSORDATA_RETENTION_DAYS', '30'))
+SENSORDATA_ARCHIVE_DIR = os.getenv('SENSORDATA_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'sensordata'))
+SENSORDATA_PRUNE_BATCH = int(os.getenv('SENSORDATA_PRUNE_BATCH', '5000'))
+
+# Notifikasi push FCM (lihat monitoring/notifications.py)
+FCM_SERVER_KEY = os.getenv('FCM_SERVER_KEY', 'YOUR_FCM_SERVER_KEY')
+FCM_URL = os.getenv('FCM_URL', 'https://fcm.googleapis.com/fcm/send')
+FCM_BATCH_SIZE = int(os.getenv('FCM_BATCH_SIZE', '1000'))
+FCM_TIMEOUT = (3.05, 10)
+# Alert yang sama (device + kondisi) hanya dikirim sekali per periode ini (detik)
+NOTIFY_COOLDOWN = int(os.getenv('NOTIFY_COOLDOWN', '300'))
+NOTIFY_ASYNC = os.getenv('NOTIFY_ASYNC', '1') == '1'
+NOTIFY_QUEUE_SIZE = 1000
+
+# Alert engine (monitoring/alerts.py): lama kondisi harus bertahan sebelum alert dibuka / ditutup (detik)
+ALERT_MIN_OPEN_SECONDS = int(os.getenv('ALERT_MIN_OPEN_SECONDS', '10'))
+ALERT_MIN_CLOSE_SECONDS = int(os.getenv('ALERT_MIN_CLOSE_SECONDS', '30'))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -57,6 +119,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Server-Timing + histogram per endpoint (monitoring/instrumentation.py); paling luar agar total lengkap
+    'monitoring.instrumentation.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -92,12 +156,41 @@ ASGI_APPLICATION = 'smartfruit.asgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PostgreSQL / TimescaleDB dipakai jika POSTGRES_DB di-set, selain itu SQLite
+# (SQLite otomatis memakai WAL + pragma di monitoring/signals.py)
+if os.getenv('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', '60')),
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Tunggu lock writer lain (detik) daripada langsung "database is locked"
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Jadikan tabel SensorData hypertable TimescaleDB (hanya untuk PostgreSQL + ekstensi timescaledb)
+SENSORDATA_TIMESCALE = os.getenv('SENSORDATA_TIMESCALE', '0') == '1'
+
+# Buffer penulisan SensorData (monitoring/storage.py); 0 = tulis langsung
+SENSORDATA_FLUSH_INTERVAL = float(os.getenv('SENSORDATA_FLUSH_INTERVAL', '1.0'))
+SENSORDATA_FLUSH_BATCH = int(os.getenv('SENSORDATA_FLUSH_BATCH', '500'))
+# Reading yang gagal disimpan (JSON Lines), lihat monitoring/storage.py
+SENSORDATA_DEAD_LETTER = os.getenv('SENSORDATA_DEAD_LETTER', str(BASE_DIR / 'archive' / 'dead_letter' / 'sensordata.jsonl'))
 
 
 # Password validation
@@ -160,3 +253,28 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080",
     "http://127.0.0.1:8080",
 ]
+
+# Logging terstruktur via antrean + listener (monitoring/logs.py)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json / text
+# Log per reading (logger monitoring.readings) di bawah INFO: hanya 1 dari N ditulis
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sample_readings': {'()': 'monitoring.logs.SamplingFilter', 'every': LOG_SAMPLE_EVERY},
+    },
+    'handlers': {
+        'queue': {'class': 'monitoring.logs.QueueLogHandler', 'fmt': LOG_FORMAT},
+    },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'level': os.getenv('LOG_LEVEL_DJANGO', 'INFO')},
+        'monitoring': {'level': LOG_LEVEL},
+        'monitoring.readings': {'level': os.getenv('LOG_LEVEL_READINGS', 'DEBUG'), 'filters': ['sample_readings']},
+        'monitoring.influx_client': {'level': os.getenv('LOG_LEVEL_INFLUX', 'INFO')},
+        'ML_Service': {'level': os.getenv('LOG_LEVEL_ML', 'INFO')},
+    },
+}
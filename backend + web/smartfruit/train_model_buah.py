@@ -4,10 +4,14 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+from ml import features as schema
+from ml.portable_forest import export as export_portable
 import os
+import sys
+DEFAULT_PARAMS = {'n_estimators': 100}
 
-def train_model():
-    # 1. Load data (contoh data, sesuaikan dengan data sensor Anda)
+def load_data():
+    """Data sensor dari data_sensor.csv (dibuat synthetic jika belum ada)"""
     try:
         data = pd.read_csv('data_sensor.csv')
     except FileNotFoundError:
@@ -15,13 +19,13 @@ def train_model():
         np.random.seed(42)
         n_samples = 1000
         
-        # Generate synthetic data
+        # Generate synthetic data (gas dan kelembapan dipotong ke rentang sensor)
         data = pd.DataFrame({
             'suhu': np.random.normal(28, 3, n_samples),  # suhu normal ~28°C
-            'kelembapan': np.random.normal(65, 10, n_samples),  # kelembapan normal ~65%
-            'mq2': np.random.normal(50, 20, n_samples),  # gas umum
-            'mq3': np.random.normal(30, 10, n_samples),  # alkohol/VOC
-            'mq135': np.random.normal(40, 15, n_samples),  # amonia/CO2
+            'kelembapan': np.random.normal(65, 10, n_samples).clip(0, 100),  # kelembapan normal ~65%
+            'mq2': np.random.normal(50, 20, n_samples).clip(0),  # gas umum
+            'mq3': np.random.normal(30, 10, n_samples).clip(0),  # alkohol/VOC
+            'mq135': np.random.normal(40, 15, n_samples).clip(0),  # amonia/CO2
         })
         
         # Buat label berdasarkan rules sederhana
@@ -45,10 +49,26 @@ def train_model():
         # Simpan data synthetic untuk referensi
         data.to_csv('data_sensor.csv', index=False)
         print("Created synthetic dataset in data_sensor.csv")
+    return data
+
+def search_params(data):
+    """Hyperparameter search paralel (ml/tuning.py), return parameter pilihan"""
+    from ml import tuning
+
+    result = tuning.search(schema.from_frame(data), schema.labels(data))
+    print(tuning.report(result, limit=10))
+    return tuning.select(result['results'])['params']
+
+def train_model(data=None, params=None):
+    # 1. Load data (contoh data, sesuaikan dengan data sensor Anda)
+    if data is None:
+        data = load_data()
 
     # 2. Prepare features dan target
-    X = data[['suhu', 'kelembapan', 'mq2', 'mq3', 'mq135']]
-    y = data['status']
+    # Kolom kanonik ml/features.py (suhu -> temperature, ...); scaler menyimpan
+    # nama fiturnya, jadi server tahu urutan kolom model
+    X = schema.frame(data)[list(schema.FEATURES)]
+    y = schema.labels(data)
 
     # 3. Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -59,7 +79,7 @@ def train_model():
     X_test_scaled = scaler.transform(X_test)
 
     # 5. Train model
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(random_state=42, **(params or DEFAULT_PARAMS))
     model.fit(X_train_scaled, y_train)
 
     # 6. Evaluate model
@@ -74,13 +94,19 @@ def train_model():
     joblib.dump(scaler, 'models/scaler.joblib')
     print("Model saved as 'models/fruit_quality_model.joblib'")
     print("Scaler saved as 'models/scaler.joblib'")
+    # Format portabel (scaler dilipat ke model), dimuat tanpa scikit-learn
+    export_portable(model, 'models/fruit_quality_model.npz', scaler=scaler,
+                    source_path='models/fruit_quality_model.joblib', scaler_path='models/scaler.joblib')
+    print("Portable model saved as 'models/fruit_quality_model.npz'")
 
     return model, scaler
 
 def predict_quality(model, scaler, suhu, kelembapan, mq2, mq3, mq135):
     """Predict fruit quality from sensor data"""
-    # Format input data
-    X = np.array([[suhu, kelembapan, mq2, mq3, mq135]])
+    # Format input data (urutan kolom skema)
+    X = pd.DataFrame(schema.from_records([{
+        'suhu': suhu, 'kelembapan': kelembapan, 'mq2': mq2, 'mq3': mq3, 'mq135': mq135,
+    }]), columns=schema.FEATURES)
     
     # Scale input
     X_scaled = scaler.transform(X)
@@ -100,8 +126,10 @@ def predict_quality(model, scaler, suhu, kelembapan, mq2, mq3, mq135):
     }
 
 if __name__ == '__main__':
-    # Train model
-    model, scaler = train_model()
+    # Train model (--search: pilih parameter dengan hyperparameter search dulu)
+    data = load_data()
+    params = search_params(data) if '--search' in sys.argv else None
+    model, scaler = train_model(data, params)
     
     # Test prediction
     test_data = {
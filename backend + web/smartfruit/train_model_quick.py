@@ -4,21 +4,24 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+from ml import features as schema
+from ml.portable_forest import export as export_portable
 import os
+import sys
 
-def train_model_quick():
-    """Versi cepat untuk testing dengan data lebih sedikit"""
+def make_data():
+    """Data synthetic (100 sampel) dengan label dari rules sederhana"""
     # Buat contoh data lebih sedikit
     np.random.seed(42)
     n_samples = 100  # dikurangi dari 1000 jadi 100 samples
     
-    # Generate synthetic data
+    # Generate synthetic data (gas dan kelembapan dipotong ke rentang sensor)
     data = pd.DataFrame({
         'suhu': np.random.normal(28, 3, n_samples),
-        'kelembapan': np.random.normal(65, 10, n_samples),
-        'mq2': np.random.normal(50, 20, n_samples),
-        'mq3': np.random.normal(30, 10, n_samples),
-        'mq135': np.random.normal(40, 15, n_samples),
+        'kelembapan': np.random.normal(65, 10, n_samples).clip(0, 100),
+        'mq2': np.random.normal(50, 20, n_samples).clip(0),
+        'mq3': np.random.normal(30, 10, n_samples).clip(0),
+        'mq135': np.random.normal(40, 15, n_samples).clip(0),
     })
     
     # Rules sederhana untuk klasifikasi
@@ -36,10 +39,17 @@ def train_model_quick():
     ]
     choices = ['LAYAK', 'WARNING', 'TIDAK_LAYAK']
     data['status'] = np.select(conditions, choices[:2], default=choices[2])
+    return data
+
+def train_model_quick(params=None):
+    """Versi cepat untuk testing dengan data lebih sedikit"""
+    data = make_data()
 
     # Prepare features dan target
-    X = data[['suhu', 'kelembapan', 'mq2', 'mq3', 'mq135']]
-    y = data['status']
+    # Kolom kanonik ml/features.py (suhu -> temperature, ...); scaler menyimpan
+    # nama fiturnya, jadi server tahu urutan kolom model
+    X = schema.frame(data)[list(schema.FEATURES)]
+    y = schema.labels(data)
 
     # Train dengan data lebih sedikit
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -50,7 +60,7 @@ def train_model_quick():
     X_test_scaled = scaler.transform(X_test)
 
     # Model lebih sederhana (10 trees instead of 100)
-    model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model = RandomForestClassifier(random_state=42, **(params or {'n_estimators': 10}))
     model.fit(X_train_scaled, y_train)
 
     # Evaluate
@@ -65,6 +75,10 @@ def train_model_quick():
     joblib.dump(scaler, 'models/scaler.joblib')
     print("Model saved as 'models/fruit_quality_model.joblib'")
     print("Scaler saved as 'models/scaler.joblib'")
+    # Format portabel (scaler dilipat ke model), dimuat tanpa scikit-learn
+    export_portable(model, 'models/fruit_quality_model.npz', scaler=scaler,
+                    source_path='models/fruit_quality_model.joblib', scaler_path='models/scaler.joblib')
+    print("Portable model saved as 'models/fruit_quality_model.npz'")
 
     return model, scaler
 
@@ -99,13 +113,7 @@ def test_prediction(model, scaler):
     
     print("\nTest Predictions:")
     for case in test_cases:
-        X = np.array([[
-            case['suhu'],
-            case['kelembapan'],
-            case['mq2'],
-            case['mq3'],
-            case['mq135']
-        ]])
+        X = pd.DataFrame(schema.from_records([case]), columns=schema.FEATURES)
         X_scaled = scaler.transform(X)
         prediction = model.predict(X_scaled)[0]
         probabilities = model.predict_proba(X_scaled)[0]
@@ -115,6 +123,16 @@ def test_prediction(model, scaler):
         print(f"Confidence: {max(probabilities):.2%}")
 
 if __name__ == '__main__':
+    params = None
+    if '--search' in sys.argv:
+        # Hyperparameter search paralel (ml/tuning.py), grid kecil supaya tetap cepat
+        from ml import tuning
+
+        data = make_data()
+        result = tuning.search(schema.from_frame(data), schema.labels(data),
+                               grid={'n_estimators': [5, 10, 25], 'max_depth': [None, 4]})
+        print(tuning.report(result))
+        params = tuning.select(result['results'])['params']
     print("Training quick model...")
-    model, scaler = train_model_quick()
+    model, scaler = train_model_quick(params)
     test_prediction(model, scaler)
\ No newline at end of file